@@ -0,0 +1,127 @@
+"""
+/search load benchmark against the FastAPI app, served in-process through
+httpx's ASGI transport, with a fixed-latency fake embedder and in-memory Qdrant.
+
+Run through run.py, or directly: python benchmarks/api_bench.py
+"""
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from harness import use_service, metric, latency_metrics, emit, fake_vector, FakeEmbedder
+from corpus import VOCABULARY
+
+use_service("api")
+import httpx
+from qdrant_client import AsyncQdrantClient, models
+from core.vector_db import VectorDB, chunk_point_id
+from core.doc_store import DocumentStore
+from core.cache import LRUCache
+from core.admission import AdmissionController
+import app.main as api
+
+DOCUMENTS = 200
+CHUNKS_PER_DOCUMENT = 10
+REQUESTS = 300
+# Grouping is computed in Python by the in-memory Qdrant, so the grouped leg runs fewer requests
+GROUPED_REQUESTS = 20
+CONCURRENCY = 16
+
+def write_docs_table(db_path):
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute(
+            "CREATE TABLE docs (doc_id TEXT PRIMARY KEY, title TEXT, authors TEXT, year INTEGER, tags TEXT, "
+            "filename TEXT, source_path TEXT, total_chunks INTEGER, metadata TEXT, ingested_at REAL)"
+        )
+        conn.executemany(
+            "INSERT INTO docs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (f"doc{d}", f"Paper {d}", json.dumps(["Author"]), 2000 + d % 25, json.dumps([]),
+                 f"paper{d}.pdf", None, CHUNKS_PER_DOCUMENT, json.dumps({}), 0.0)
+                for d in range(DOCUMENTS)
+            ]
+        )
+    conn.close()
+
+async def seed_collection(client):
+    await client.create_collection(
+        collection_name="papers",
+        vectors_config=models.VectorParams(size=384, distance=models.Distance.COSINE)
+    )
+    points = []
+    for d in range(DOCUMENTS):
+        for c in range(CHUNKS_PER_DOCUMENT):
+            text = f"chunk {c} of doc {d} " * 40
+            # The preview the worker stores next to the text
+            points.append(models.PointStruct(
+                id=chunk_point_id(f"doc{d}", c),
+                vector=fake_vector(f"doc{d}:{c}"),
+                payload={"doc_id": f"doc{d}", "chunk_index": c, "text": text, "preview": text[:api.PREVIEW_CHARS] + "...",
+                         "year": 2000 + d % 25, "authors": ["Author"], "tags": []}
+            ))
+    await client.upsert(collection_name="papers", points=points)
+
+async def run_load(client, path, make_body, requests=REQUESTS):
+    latencies = []
+    queue = list(range(requests))
+
+    async def worker():
+        while queue:
+            i = queue.pop()
+            started = time.perf_counter()
+            response = await client.post(path, json=make_body(i))
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    return latencies, time.perf_counter() - started
+
+async def bench_search(results, workdir):
+    qdrant = AsyncQdrantClient(location=":memory:")
+    await seed_collection(qdrant)
+    db_path = os.path.join(workdir, "docs.sqlite")
+    write_docs_table(db_path)
+
+    # The lifespan would connect to real services, so resources are wired up directly
+    api.resources.update(
+        embedder=FakeEmbedder(latency_s=0.002),
+        vector_db=VectorDB(client=qdrant),
+        doc_store=DocumentStore(db_path),
+        similar_cache=LRUCache(maxsize=1024),
+        # Throughput is measured without shedding, local grouped queries take seconds each
+        search_admission=AdmissionController("search", max_concurrency=CONCURRENCY, deadline_s=60),
+        search_grouped_admission=AdmissionController("search_grouped", max_concurrency=CONCURRENCY, deadline_s=60),
+    )
+
+    rng = random.Random(7)
+    queries = [" ".join(rng.choice(VOCABULARY) for _ in range(6)) for _ in range(REQUESTS)]
+
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        latencies, elapsed = await run_load(client, "/search", lambda i: {"query": queries[i], "top_k": 20})
+        results["search.qps"] = metric(len(latencies) / elapsed, "req/s", True)
+        results.update(latency_metrics("search", latencies))
+
+        latencies, elapsed = await run_load(client, "/search/grouped", lambda i: {"query": queries[i], "top_k": 10}, GROUPED_REQUESTS)
+        results["search_grouped.qps"] = metric(len(latencies) / elapsed, "req/s", True)
+        results.update(latency_metrics("search_grouped", latencies))
+
+def main():
+    # The local Qdrant mode warns that payload indexes have no effect
+    warnings.simplefilter("ignore")
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        asyncio.run(bench_search(results, workdir))
+    emit(results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Deterministic synthetic corpus for benchmarks.
+
+Text is built from a fixed vocabulary with a seeded RNG, so every run sees
+the same documents. PDFs are written by hand (Helvetica text objects), so no
+PDF authoring library is needed to produce files pypdf can extract.
+"""
+import os
+import random
+from typing import List
+
+VOCABULARY = (
+    "model data learning neural network transformer attention embedding vector graph "
+    "protein sequence climate simulation dataset training inference gradient optimization "
+    "bayesian posterior sampling kernel spectral cluster topology manifold retrieval index "
+    "query latency throughput memory benchmark experiment baseline ablation evaluation metric "
+    "the of and to in a is that for on with as by we this are be from at an which our results"
+).split()
+
+def generate_text(seed: int, paragraphs: int = 40, sentences_per_paragraph: int = 6) -> str:
+    """Returns a paper-like text of `paragraphs` paragraphs separated by blank lines."""
+    rng = random.Random(seed)
+    out = []
+    for _ in range(paragraphs):
+        sentences = []
+        for _ in range(sentences_per_paragraph):
+            words = [rng.choice(VOCABULARY) for _ in range(rng.randint(8, 24))]
+            sentences.append(" ".join(words).capitalize() + ".")
+        out.append(" ".join(sentences))
+    return "\n\n".join(out)
+
+def generate_corpus(count: int, seed: int = 0, paragraphs: int = 40) -> List[str]:
+    return [generate_text(seed * 100003 + i, paragraphs=paragraphs) for i in range(count)]
+
+def _escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def _wrap(text: str, width: int = 90) -> List[str]:
+    lines = []
+    for paragraph in text.split("\n\n"):
+        current = ""
+        for word in paragraph.split():
+            if current and len(current) + 1 + len(word) > width:
+                lines.append(current)
+                current = word
+            else:
+                current = f"{current} {word}" if current else word
+        lines.append(current)
+        lines.append("")
+    return lines
+
+def make_pdf(text: str, lines_per_page: int = 60) -> bytes:
+    """Renders `text` into a minimal multi-page PDF."""
+    lines = _wrap(text)
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+    # Object numbers: 1 catalog, 2 page tree, 3 font, then a page and a content stream per page
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    kids = []
+    for index, page_lines in enumerate(pages):
+        page_num = 4 + index * 2
+        content_num = page_num + 1
+        kids.append(f"{page_num} 0 R")
+        body = "BT /F1 10 Tf 12 TL 50 760 Td " + " ".join(f"({_escape(line)}) Tj T*" for line in page_lines) + " ET"
+        stream = body.encode("latin-1")
+        objects[page_num] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_num} 0 R >>"
+        ).encode()
+        objects[content_num] = b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(pages)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for num in sorted(objects):
+        offsets[num] = len(out)
+        out += b"%d 0 obj\n" % num + objects[num] + b"\nendobj\n"
+    xref_at = len(out)
+    size = max(objects) + 1
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % size
+    for num in range(1, size):
+        out += b"%010d 00000 n \n" % offsets[num]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref_at)
+    return bytes(out)
+
+def write_pdf_corpus(directory: str, count: int, seed: int = 0, paragraphs: int = 40) -> List[str]:
+    """Writes `count` PDFs into `directory` and returns their paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i, text in enumerate(generate_corpus(count, seed=seed, paragraphs=paragraphs)):
+        path = os.path.join(directory, f"synthetic_{seed}_{i:04d}.pdf")
+        with open(path, "wb") as f:
+            f.write(make_pdf(text))
+        paths.append(path)
+    return paths
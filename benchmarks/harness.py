@@ -0,0 +1,72 @@
+"""
+Small helpers shared by the benchmark suites.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+def use_service(name: str) -> None:
+    """
+    Puts services/<name> on sys.path. Each service has its own top-level `core`
+    package, so a process may only load one of them.
+    """
+    sys.path.insert(0, os.path.join(REPO_ROOT, "services", name))
+
+def metric(value: float, unit: str, higher_is_better: bool) -> Dict:
+    return {"value": round(value, 6), "unit": unit, "higher_is_better": higher_is_better}
+
+def best_of(fn: Callable[[], None], repeat: int = 5) -> float:
+    """Best wall time of `repeat` runs, in seconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def latency_metrics(prefix: str, samples: List[float]) -> Dict[str, Dict]:
+    return {
+        f"{prefix}.p50_ms": metric(statistics.median(samples) * 1000, "ms", False),
+        f"{prefix}.p95_ms": metric(percentile(samples, 95) * 1000, "ms", False),
+    }
+
+def fake_vector(text: str, dim: int = 384) -> List[float]:
+    """Deterministic unit vector derived from the text."""
+    seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+class FakeEmbedder:
+    """
+    Stand-in for the embeddings service: fixed latency per call, deterministic vectors.
+    Implements both the worker's EmbedderProto and the API's EmbeddingClient methods.
+    """
+    def __init__(self, latency_s: float = 0.002, dim: int = 384):
+        self.latency_s = latency_s
+        self.dim = dim
+
+    async def get_embedding(self, text: str, timeout: float = None) -> List[float]:
+        await asyncio.sleep(self.latency_s)
+        return fake_vector(text, self.dim)
+
+    async def get_embeddings(self, texts: List[str], timeout: float = None) -> List[List[float]]:
+        await asyncio.sleep(self.latency_s)
+        return [fake_vector(text, self.dim) for text in texts]
+
+def emit(results: Dict[str, Dict]) -> None:
+    """Suites print their results as one JSON object on stdout for run.py to collect."""
+    print(json.dumps(results))
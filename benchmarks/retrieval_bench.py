@@ -0,0 +1,144 @@
+"""
+Recall@k and latency of two-stage search (prefix candidates rescored on the
+full vector) against single-stage search on the full vector, through the API's
+VectorDB. Recall is measured against exact top-k computed with numpy.
+
+Vectors come from a `snapshot.py export` of the real library, or are synthetic
+clustered unit vectors. Only the export tells how well the embedding model's
+leading dimensions rank on their own, so prefer it when choosing prefix_dim:
+    python benchmarks/retrieval_bench.py --export data/exports/<name> --host localhost
+    python benchmarks/retrieval_bench.py --points 20000 --prefix-dims 64,128 --oversampling 2,4,8
+
+Without --host Qdrant runs in-memory, which searches exhaustively, so only the
+recall numbers are meaningful there. Latencies need a server with HNSW indexes.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from harness import metric, latency_metrics, emit, use_service
+
+use_service("api")
+from qdrant_client import AsyncQdrantClient, models
+from core.vector_db import VectorDB, FULL_VECTOR, PREFIX_VECTOR
+
+COLLECTION = "retrieval_bench"
+UPSERT_BATCH = 256
+CLUSTERS = 200
+
+def synthetic_vectors(count: int, dim: int, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((CLUSTERS, dim))
+    vectors = centers[rng.integers(0, CLUSTERS, count)] + 0.6 * rng.standard_normal((count, dim))
+    return normalize(vectors.astype(np.float32))
+
+def exported_vectors(export_dir: str) -> np.ndarray:
+    with open(os.path.join(export_dir, "manifest.json")) as f:
+        manifest = json.load(f)
+    name = FULL_VECTOR if FULL_VECTOR in manifest["vectors"] else ""
+    spec = manifest["vectors"][name]
+    matrix = np.asarray(np.load(os.path.join(export_dir, spec["file"]), mmap_mode="r")[:manifest["points"]], dtype=np.float32)
+    if "missing_file" in spec:
+        # Points without the vector were exported as zero rows
+        matrix = matrix[~np.load(os.path.join(export_dir, spec["missing_file"]))]
+    return normalize(matrix)
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def make_queries(vectors: np.ndarray, count: int, seed: int = 11) -> np.ndarray:
+    # Perturbed corpus vectors, close to some chunks without being any of them
+    rng = np.random.default_rng(seed)
+    picked = vectors[rng.choice(len(vectors), size=count, replace=False)]
+    return normalize(picked + 0.3 * rng.standard_normal(picked.shape).astype(np.float32) / np.sqrt(vectors.shape[1]))
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> list:
+    scores = queries @ vectors.T
+    return [set(np.argsort(-row)[:k].tolist()) for row in scores]
+
+async def load_collection(client: AsyncQdrantClient, vectors: np.ndarray, prefix_dim: int):
+    if await client.collection_exists(COLLECTION):
+        await client.delete_collection(COLLECTION)
+    dim = vectors.shape[1]
+    await client.create_collection(collection_name=COLLECTION, vectors_config={
+        FULL_VECTOR: models.VectorParams(size=dim, distance=models.Distance.COSINE),
+        PREFIX_VECTOR: models.VectorParams(size=prefix_dim, distance=models.Distance.COSINE),
+    })
+    prefixes = normalize(vectors[:, :prefix_dim])
+    for start in range(0, len(vectors), UPSERT_BATCH):
+        await client.upsert(collection_name=COLLECTION, wait=True, points=[
+            models.PointStruct(id=i, vector={FULL_VECTOR: vectors[i].tolist(), PREFIX_VECTOR: prefixes[i].tolist()})
+            for i in range(start, min(start + UPSERT_BATCH, len(vectors)))
+        ])
+
+async def measure(vector_db: VectorDB, queries: np.ndarray, truth: list, k: int, two_stage: bool):
+    hits = 0
+    latencies = []
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        points = await vector_db.search(COLLECTION, query.tolist(), limit=k, with_payload=False, two_stage=two_stage)
+        latencies.append(time.perf_counter() - started)
+        hits += len(expected & {point.id for point in points})
+    return hits / (k * len(queries)), latencies
+
+async def run(args):
+    vectors = exported_vectors(args.export) if args.export else synthetic_vectors(args.points, args.dim)
+    queries = make_queries(vectors, args.queries)
+    truth = exact_top_k(vectors, queries, args.k)
+
+    if args.host:
+        client = AsyncQdrantClient(host=args.host, port=args.port, timeout=60)
+    else:
+        client = AsyncQdrantClient(location=":memory:")
+    results = {}
+    try:
+        for prefix_dim in args.prefix_dims:
+            await load_collection(client, vectors, prefix_dim)
+
+            vector_db = VectorDB(client=client)
+            recall, latencies = await measure(vector_db, queries, truth, args.k, two_stage=False)
+            if f"single.recall_at_{args.k}" not in results:
+                results[f"single.recall_at_{args.k}"] = metric(recall, "ratio", True)
+                results.update(latency_metrics("single", latencies))
+
+            for oversampling in args.oversampling:
+                vector_db = VectorDB(client=client, oversampling=oversampling)
+                recall, latencies = await measure(vector_db, queries, truth, args.k, two_stage=True)
+                name = f"two_stage.prefix_{prefix_dim}.x{oversampling:g}"
+                results[f"{name}.recall_at_{args.k}"] = metric(recall, "ratio", True)
+                results.update(latency_metrics(name, latencies))
+        await client.delete_collection(COLLECTION)
+    finally:
+        await client.close()
+    return results
+
+def int_list(value: str) -> list:
+    return [int(v) for v in value.split(",")]
+
+def float_list(value: str) -> list:
+    return [float(v) for v in value.split(",")]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--export", help="directory written by snapshot.py export")
+    parser.add_argument("--host", help="Qdrant server, in-memory when omitted")
+    parser.add_argument("--port", type=int, default=6333)
+    parser.add_argument("--points", type=int, default=20000, help="synthetic corpus size")
+    parser.add_argument("--dim", type=int, default=384, help="synthetic vector size")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--prefix-dims", type=int_list, default=[64, 128])
+    parser.add_argument("--oversampling", type=float_list, default=[2.0, 4.0, 8.0])
+    results = asyncio.run(run(parser.parse_args()))
+    for name, value in sorted(results.items()):
+        print(f"{name:<40}{value['value']:>12.3f}  {value['unit']}", file=sys.stderr)
+    emit(results)
+
+if __name__ == "__main__":
+    main()
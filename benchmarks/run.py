@@ -0,0 +1,101 @@
+"""
+Runs the offline benchmark suites, writes the results as JSON and compares
+them against a stored baseline.
+
+    python benchmarks/run.py                    # run all suites, compare to baseline.json
+    python benchmarks/run.py --suite worker     # one suite only
+    python benchmarks/run.py --update-baseline  # accept the current numbers
+
+Exits with status 1 when any metric is worse than the baseline by more than
+the threshold. Everything runs offline on CPU: embeddings are faked with a
+fixed latency and Qdrant runs in qdrant_client's in-memory mode.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Each suite runs in its own process, since the services' `core` packages share a name
+SUITES = {
+    "worker": "worker_bench.py",
+    "api": "api_bench.py",
+}
+
+def run_suite(name: str) -> dict:
+    script = os.path.join(BENCH_DIR, SUITES[name])
+    completed = subprocess.run([sys.executable, script], capture_output=True, text=True)
+    if completed.returncode != 0:
+        sys.stderr.write(completed.stderr)
+        raise SystemExit(f"Benchmark suite '{name}' failed")
+    # The suite's JSON is the last line of stdout, anything before it is log output
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Returns (name, baseline, current, change) for every metric that regressed past the threshold."""
+    regressions = []
+    for name, current in sorted(results.items()):
+        if name not in baseline:
+            continue
+        before = baseline[name]["value"]
+        if before == 0:
+            continue
+        change = (current["value"] - before) / before
+        worse = -change if current["higher_is_better"] else change
+        if worse > threshold:
+            regressions.append((name, before, current["value"], change))
+    return regressions
+
+def write_json(path: str, data: dict) -> None:
+    # Sorted with a trailing newline, so baseline updates diff cleanly
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+def print_report(results: dict, baseline: dict) -> None:
+    print(f"{'metric':<28}{'baseline':>14}{'current':>14}{'change':>10}")
+    for name, current in sorted(results.items()):
+        before = baseline.get(name, {}).get("value")
+        change = f"{(current['value'] - before) / before:+.1%}" if before else "n/a"
+        before_text = f"{before:.3f}" if before is not None else "-"
+        print(f"{name:<28}{before_text:>14}{current['value']:>14.3f}{change:>10}  {current['unit']}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suite", choices=sorted(SUITES), action="append", help="Suite to run, repeatable. Defaults to all.")
+    parser.add_argument("--output", default=os.path.join(BENCH_DIR, "results.json"), help="Where to write the results JSON.")
+    parser.add_argument("--baseline", default=os.path.join(BENCH_DIR, "baseline.json"), help="Baseline JSON to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative regression, e.g. 0.25 for 25%%.")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results to the baseline file.")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.suite or sorted(SUITES):
+        print(f"Running {name} benchmarks...", file=sys.stderr)
+        results.update(run_suite(name))
+
+    write_json(args.output, results)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print_report(results, baseline)
+
+    if args.update_baseline:
+        baseline.update(results)
+        write_json(args.baseline, baseline)
+        print(f"Baseline updated: {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.threshold)
+    for name, before, after, change in regressions:
+        print(f"REGRESSION {name}: {before:.3f} -> {after:.3f} ({change:+.1%})")
+    if regressions:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+REST vs gRPC transport benchmark for the Qdrant client: batched upsert
+throughput and concurrent search QPS against a running Qdrant server.
+
+Unlike the other suites this needs a server, so it is not part of run.py:
+    docker compose up -d qdrant
+    python benchmarks/transport_bench.py [--host localhost] [--points 20000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from harness import metric, latency_metrics, emit, fake_vector
+
+from qdrant_client import AsyncQdrantClient, models
+
+COLLECTION = "transport_bench"
+DIM = 384
+UPSERT_BATCH = 256
+SEARCH_REQUESTS = 2000
+CONCURRENCY = 16
+
+def make_points(count: int):
+    return [
+        models.PointStruct(id=i, vector=fake_vector(f"point {i}", DIM), payload={"doc_id": f"doc{i // 20}", "chunk_index": i % 20})
+        for i in range(count)
+    ]
+
+async def bench_transport(name: str, client: AsyncQdrantClient, points, queries, results):
+    if await client.collection_exists(COLLECTION):
+        await client.delete_collection(COLLECTION)
+    await client.create_collection(
+        collection_name=COLLECTION,
+        vectors_config=models.VectorParams(size=DIM, distance=models.Distance.COSINE)
+    )
+
+    started = time.perf_counter()
+    for start in range(0, len(points), UPSERT_BATCH):
+        await client.upsert(collection_name=COLLECTION, points=points[start:start + UPSERT_BATCH], wait=True)
+    elapsed = time.perf_counter() - started
+    results[f"{name}.upsert_points_per_s"] = metric(len(points) / elapsed, "points/s", True)
+
+    latencies = []
+    pending = list(range(len(queries)))
+
+    async def worker():
+        while pending:
+            query = queries[pending.pop()]
+            query_started = time.perf_counter()
+            await client.query_points(collection_name=COLLECTION, query=query, limit=10, with_payload=True)
+            latencies.append(time.perf_counter() - query_started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    elapsed = time.perf_counter() - started
+    results[f"{name}.search_qps"] = metric(len(latencies) / elapsed, "req/s", True)
+    results.update(latency_metrics(f"{name}.search", latencies))
+
+    await client.delete_collection(COLLECTION)
+
+async def run(args):
+    points = make_points(args.points)
+    queries = [fake_vector(f"query {i}", DIM) for i in range(SEARCH_REQUESTS)]
+    results = {}
+    for name, prefer_grpc in (("rest", False), ("grpc", True)):
+        client = AsyncQdrantClient(host=args.host, port=args.port, grpc_port=args.grpc_port, prefer_grpc=prefer_grpc, timeout=60)
+        try:
+            await bench_transport(name, client, points, queries, results)
+        finally:
+            await client.close()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=6333)
+    parser.add_argument("--grpc-port", type=int, default=6334)
+    parser.add_argument("--points", type=int, default=20000)
+    results = asyncio.run(run(parser.parse_args()))
+    for name, value in sorted(results.items()):
+        print(f"{name:<28}{value['value']:>14.3f}  {value['unit']}", file=sys.stderr)
+    emit(results)
+
+if __name__ == "__main__":
+    main()
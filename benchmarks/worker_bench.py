@@ -0,0 +1,76 @@
+"""
+Worker benchmarks: chunker and parser micro-benchmarks, plus an end-to-end
+WorkerPipeline run against a fixed-latency fake embedder and in-memory Qdrant.
+
+Run through run.py, or directly: python benchmarks/worker_bench.py
+"""
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from harness import use_service, metric, best_of, emit, FakeEmbedder
+from corpus import generate_corpus, write_pdf_corpus
+
+use_service("worker")
+from qdrant_client import AsyncQdrantClient, models
+from core.chunker import RecursiveCharacterTextSplitter
+from core.pdf_parser import PDFParser
+from core.pipeline import WorkerPipeline
+from core.store import QdrantStore
+
+def bench_chunker(results):
+    texts = generate_corpus(20, seed=1)
+    total_chars = sum(len(text) for text in texts)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    elapsed = best_of(lambda: [splitter.split_text(text) for text in texts])
+    results["chunker.mb_per_s"] = metric(total_chars / elapsed / 1e6, "MB/s", True)
+
+def bench_parser(results, workdir):
+    paths = write_pdf_corpus(os.path.join(workdir, "parser"), 10, seed=2)
+    parser = PDFParser()
+    elapsed = best_of(lambda: [parser.parse(path) for path in paths], repeat=7)
+    results["parser.pages_per_s"] = metric(sum(len(_pages(p)) for p in paths) / elapsed, "pages/s", True)
+
+def _pages(path):
+    from pypdf import PdfReader
+    return PdfReader(path).pages
+
+async def bench_pipeline(results, workdir):
+    paths = write_pdf_corpus(os.path.join(workdir, "inbox"), 5, seed=3)
+
+    client = AsyncQdrantClient(location=":memory:")
+    await client.create_collection(
+        collection_name="papers",
+        vectors_config=models.VectorParams(size=384, distance=models.Distance.COSINE)
+    )
+    pipeline = WorkerPipeline(
+        parser=PDFParser(),
+        embedder=FakeEmbedder(latency_s=0.002),
+        store=QdrantStore(client=client),
+        chunker=RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    )
+
+    started = time.perf_counter()
+    for path in paths:
+        await pipeline.process_file(path)
+    elapsed = time.perf_counter() - started
+
+    chunks = (await client.count(collection_name="papers")).count
+    results["pipeline.chunks_per_s"] = metric(chunks / elapsed, "chunks/s", True)
+    results["pipeline.docs_per_s"] = metric(len(paths) / elapsed, "docs/s", True)
+
+def main():
+    logging.disable(logging.INFO)
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        bench_chunker(results)
+        bench_parser(results, workdir)
+        asyncio.run(bench_pipeline(results, workdir))
+    emit(results)
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,110 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from contextlib import asynccontextmanager
-from models.schemas import SearchRequest, SearchResponse, DocumentResponse, LibraryMapResponse, ConnectionsResponse, GapsResponse, DocumentMetadata, SearchResult, DocumentResult
+from typing import List, Optional
+import orjson
+import os
+import time
+import uuid
+from prometheus_client import make_asgi_app
+from models.schemas import SearchRequest, SearchResponse, GroupedSearchRequest, GroupedSearchResponse, DocumentResponse, LibraryMapResponse, ConnectionsResponse, GapsResponse, DocumentMetadata, DocumentResult, SearchFilters, SimilarDocumentsResponse
 from core.embedding_client import EmbeddingClient
-from core.vector_db import VectorDB
+from core.vector_db import VectorDB, chunk_point_id
+from core.qdrant import get_client, settings_from_env, close_clients
+from core.filters import build_search_filter, exclude_document
+from core.doc_store import DocumentStore
+from core.cache import LRUCache
+from core.admission import AdmissionController, Overloaded, DeadlineExceeded
+from core.instrumentation import TRACE_HEADER, SEARCH_STAGE_SECONDS, REQUEST_SECONDS, current_trace_id, new_trace_id
+
+DOCS_DB_PATH = os.getenv("DOCS_DB_PATH", "/app/metadata/docs.sqlite")
+
+# Payload fields each endpoint needs from Qdrant, doc-level fields are joined from the docs table.
+# The worker stores the first PREVIEW_CHARS of each chunk as `preview`, so search never fetches
+# the whole chunk text, only grouped search returns it.
+SEARCH_PAYLOAD_FIELDS = ["doc_id", "chunk_index", "preview", "title", "authors", "year", "tags"]
+GROUPED_PAYLOAD_FIELDS = SEARCH_PAYLOAD_FIELDS + ["text"]
+PREVIEW_CHARS = 300
+
+CHUNK_PAYLOAD_FIELDS = ["chunk_index", "text"]
+CHUNK_PAGE_SIZE = 64
+
+# Number of chunk vectors averaged into the query for "similar documents"
+SIMILAR_EXAMPLE_CHUNKS = 8
+
+# Admission control for the search endpoints
+SEARCH_MAX_CONCURRENCY = int(os.getenv("SEARCH_MAX_CONCURRENCY", "8"))
+SEARCH_DEADLINE_MS = int(os.getenv("SEARCH_DEADLINE_MS", "2000"))
+# Clients can ask for a tighter deadline than the endpoint's, never a longer one
+DEADLINE_HEADER = "X-Deadline-Ms"
+
+# Two-stage retrieval, keep VECTOR_PREFIX_DIM equal to retrieval.prefix_dim in config.yaml
+VECTOR_PREFIX_DIM = int(os.getenv("VECTOR_PREFIX_DIM", "128"))
+SEARCH_TWO_STAGE = os.getenv("SEARCH_TWO_STAGE", "false").lower() in ("1", "true", "yes")
+SEARCH_OVERSAMPLING = float(os.getenv("SEARCH_OVERSAMPLING", "4"))
 
 # We store the models and clients in a dictionary 
 resources = {}
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Clients set before startup are kept, the embedded deployment passes in-process ones
     # Initialize Embedding Client
-    resources["embedder"] = EmbeddingClient(base_url="http://embeddings:8001")
+    if "embedder" not in resources:
+        resources["embedder"] = EmbeddingClient(base_url="http://embeddings:8001")
     
     # Initialize Vector DB client
-    print("Connecting to Qdrant...")
-    resources["vector_db"] = VectorDB(host="qdrant")
+    if "vector_db" not in resources:
+        print("Connecting to Qdrant...")
+        resources["vector_db"] = VectorDB(
+            client=get_client(**settings_from_env()),
+            prefix_dim=VECTOR_PREFIX_DIM,
+            two_stage=SEARCH_TWO_STAGE,
+            oversampling=SEARCH_OVERSAMPLING
+        )
     
     # Ensure collection exists
     print("Ensuring collection 'papers' exists...")
     await resources["vector_db"].ensure_collection(collection_name="papers")
     
+    # Doc-level metadata written by the worker
+    resources["doc_store"] = DocumentStore(DOCS_DB_PATH)
+    resources["similar_cache"] = LRUCache(maxsize=1024)
+    
+    # One limiter per endpoint, so slow grouped searches cannot starve plain ones
+    for endpoint in ("search", "search_grouped"):
+        resources.setdefault(f"{endpoint}_admission", AdmissionController(
+            endpoint, max_concurrency=SEARCH_MAX_CONCURRENCY, deadline_s=SEARCH_DEADLINE_MS / 1000
+        ))
+    
     yield
     # Clean up
+    resources["doc_store"].close()
     resources.clear()
+    await close_clients()
 
 app = FastAPI(lifespan=lifespan)
+app.mount("/metrics", make_asgi_app())
+
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    # Every request gets a trace ID that is forwarded to the embeddings service
+    trace_id = request.headers.get(TRACE_HEADER) or new_trace_id()
+    current_trace_id.set(trace_id)
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    REQUEST_SECONDS.labels(method=request.method, route=route.path if route else "unmatched").observe(time.perf_counter() - started)
+    response.headers[TRACE_HEADER] = trace_id
+    return response
+
+@app.exception_handler(Overloaded)
+async def shed_request(request: Request, exc: Overloaded):
+    return json_response({"detail": str(exc)}, status_code=503, headers={"Retry-After": str(exc.retry_after)})
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded(request: Request, exc: DeadlineExceeded):
+    return json_response({"detail": str(exc)}, status_code=504)
 
 def get_embedder():
     return resources["embedder"]
@@ -32,68 +112,297 @@ def get_embedder():
 def get_vector_db():
     return resources["vector_db"]
 
-def map_payload_to_metadata(payload: dict) -> DocumentMetadata:
-    pdf_meta = payload.get("metadata", {})
+def get_doc_store():
+    return resources["doc_store"]
+
+def get_similar_cache():
+    return resources["similar_cache"]
+
+def get_search_admission():
+    return resources["search_admission"]
+
+def get_search_grouped_admission():
+    return resources["search_grouped_admission"]
+
+def requested_deadline(request: Request) -> Optional[float]:
+    value = request.headers.get(DEADLINE_HEADER)
+    return int(value) / 1000 if value and value.isdigit() and int(value) > 0 else None
+
+def build_metadata(payload: dict, doc: Optional[dict] = None, include_raw: bool = True) -> dict:
+    """
+    Builds the DocumentMetadata fields as a plain dict, so hot paths can serialize it without model validation.
+    """
+    # Doc-level fields come from the docs table, points ingested before it existed still carry them
+    doc = doc or {}
+    pdf_meta = doc.get("metadata") or payload.get("metadata", {})
     
     title = (
+        doc.get("title") or 
         payload.get("title") or 
         pdf_meta.get("Title") or 
         payload.get("filename") or 
         "Unknown"
     )
     
-    authors_val = payload.get("authors")
+    authors_val = doc.get("authors") or payload.get("authors")
     if not authors_val:
         author = pdf_meta.get("Author")
         authors_val = [author] if author else []
         
-    abstract = payload.get("abstract")
+    abstract = payload.get("abstract") or payload.get("preview")
     if not abstract and "text" in payload:
         text = payload["text"]
-        abstract = text[:300] + "..." if len(text) > 300 else text
-
-    return DocumentMetadata(
-        title=title,
-        authors=authors_val,
-        year=payload.get("year"),
-        abstract=abstract,
-        tags=payload.get("tags", []),
-        raw_metadata=pdf_meta if pdf_meta else None
-    )
+        abstract = text[:PREVIEW_CHARS] + "..." if len(text) > PREVIEW_CHARS else text
+
+    return {
+        "title": title,
+        "authors": authors_val,
+        "year": doc.get("year") or payload.get("year"),
+        "abstract": abstract,
+        "tags": doc.get("tags") or payload.get("tags", []),
+        "raw_metadata": pdf_meta if pdf_meta and include_raw else None
+    }
+
+def map_payload_to_metadata(payload: dict, doc: Optional[dict] = None) -> DocumentMetadata:
+    return DocumentMetadata(**build_metadata(payload, doc))
+
+def lookup_documents(doc_store: DocumentStore, payloads: list) -> dict:
+    doc_ids = [payload["doc_id"] for payload in payloads if payload.get("doc_id")]
+    return doc_store.get_documents(doc_ids)
+
+async def fill_missing_previews(vector_db: VectorDB, points: list) -> None:
+    """
+    Points ingested before chunks carried a `preview` get their text fetched, only for
+    those hits, so their preview is cut from it. A rebuild adds the field to all of them.
+    """
+    missing = [point for point in points if point.payload is not None and "preview" not in point.payload]
+    if not missing:
+        return
+    texts = {point.id: (point.payload or {}).get("text") for point in await vector_db.get_points("papers", [point.id for point in missing], with_payload=["text"])}
+    for point in missing:
+        if texts.get(point.id) is not None:
+            point.payload["text"] = texts[point.id]
+
+def json_response(content: dict, status_code: int = 200, headers: Optional[dict] = None) -> Response:
+    # Encodes with orjson directly, skipping FastAPI's response_model validation
+    return Response(content=orjson.dumps(content), status_code=status_code, headers=headers, media_type="application/json")
+
+def is_point_id(value: str) -> bool:
+    if value.isdigit():
+        return True
+    try:
+        uuid.UUID(value)
+        return True
+    except ValueError:
+        return False
 
 @app.get("/")
 def read_root():
     return {"status": "ok", "message": "Vector Search API is running"}
 
+# Search responses are built as plain dicts and encoded with orjson, response_model only documents the shape
 @app.post("/search", response_model=SearchResponse)
-async def search(request: SearchRequest, embedder: EmbeddingClient = Depends(get_embedder), vector_db: VectorDB = Depends(get_vector_db)):
-    # 1. Generate embedding for the query
-    query_vector = await embedder.get_embedding(request.query)
-    
-    # 2. Query Qdrant
-    results = await vector_db.search(
-        collection_name="papers", 
-        query_vector=query_vector, 
-        limit=request.top_k
-    )
+async def search(request: SearchRequest, http_request: Request, embedder: EmbeddingClient = Depends(get_embedder), vector_db: VectorDB = Depends(get_vector_db), doc_store: DocumentStore = Depends(get_doc_store), admission: AdmissionController = Depends(get_search_admission)):
+    """
+    Top-k chunks for the query. Each result's `metadata.abstract` is a preview of the
+    matched chunk, cut at 300 characters with a trailing "...", not the full chunk text.
+    """
+    async with admission.admit(requested_deadline(http_request)) as deadline:
+        # 1. Generate embedding for the query
+        with SEARCH_STAGE_SECONDS.labels(endpoint="search", stage="embed").time():
+            query_vector = await embedder.get_embedding(request.query, timeout=deadline.remaining())
+        
+        # 2. Query Qdrant
+        with SEARCH_STAGE_SECONDS.labels(endpoint="search", stage="qdrant").time():
+            results = await vector_db.search(
+                collection_name="papers", 
+                query_vector=query_vector, 
+                limit=request.top_k,
+                query_filter=build_search_filter(request.filters),
+                with_payload=SEARCH_PAYLOAD_FIELDS,
+                timeout=deadline.remaining()
+            )
+            await fill_missing_previews(vector_db, results)
     
-    # 3. Formulate SearchResponse
-    search_results = []
-    for res in results:
-        metadata = map_payload_to_metadata(res.payload or {})
-        search_results.append(SearchResult(id=str(res.id), score=res.score, metadata=metadata))
+    # 3. Join against the docs table and formulate SearchResponse
+    with SEARCH_STAGE_SECONDS.labels(endpoint="search", stage="serialize").time():
+        docs = lookup_documents(doc_store, [res.payload or {} for res in results])
+        search_results = []
+        for res in results:
+            payload = res.payload or {}
+            metadata = build_metadata(payload, docs.get(payload.get("doc_id")), include_raw=False)
+            search_results.append({"id": str(res.id), "score": res.score, "metadata": metadata})
+        
+        return json_response({"results": search_results})
+
+@app.post("/search/grouped", response_model=GroupedSearchResponse)
+async def search_grouped(request: GroupedSearchRequest, http_request: Request, embedder: EmbeddingClient = Depends(get_embedder), vector_db: VectorDB = Depends(get_vector_db), doc_store: DocumentStore = Depends(get_doc_store), admission: AdmissionController = Depends(get_search_grouped_admission)):
+    async with admission.admit(requested_deadline(http_request)) as deadline:
+        # 1. Generate embedding for the query
+        with SEARCH_STAGE_SECONDS.labels(endpoint="search_grouped", stage="embed").time():
+            query_vector = await embedder.get_embedding(request.query, timeout=deadline.remaining())
+        
+        # 2. Query Qdrant, grouping chunks by their parent document
+        with SEARCH_STAGE_SECONDS.labels(endpoint="search_grouped", stage="qdrant").time():
+            groups = await vector_db.search_groups(
+                collection_name="papers",
+                query_vector=query_vector,
+                limit=request.top_k,
+                group_size=request.chunks_per_document,
+                query_filter=build_search_filter(request.filters),
+                with_payload=GROUPED_PAYLOAD_FIELDS,
+                timeout=deadline.remaining()
+            )
     
-    return SearchResponse(results=search_results)
+    # 3. Formulate GroupedSearchResponse, hits within a group are already sorted by score
+    with SEARCH_STAGE_SECONDS.labels(endpoint="search_grouped", stage="serialize").time():
+        docs = doc_store.get_documents(str(group.id) for group in groups)
+        grouped_results = []
+        for group in groups:
+            if not group.hits:
+                continue
+            best = group.hits[0]
+            chunks = [
+                {
+                    "id": str(hit.id),
+                    "score": hit.score,
+                    "chunk_index": (hit.payload or {}).get("chunk_index"),
+                    "text": (hit.payload or {}).get("text")
+                }
+                for hit in group.hits
+            ]
+            grouped_results.append({
+                "document_id": str(group.id),
+                "score": best.score,
+                "metadata": build_metadata(best.payload or {}, docs.get(str(group.id)), include_raw=False),
+                "chunks": chunks
+            })
+    
+        return json_response({"results": grouped_results})
 
 @app.get("/documents/{document_id}", response_model=DocumentResponse)
-async def get_document(document_id: str, vector_db: VectorDB = Depends(get_vector_db)):
+async def get_document(document_id: str, vector_db: VectorDB = Depends(get_vector_db), doc_store: DocumentStore = Depends(get_doc_store)):
+    doc = doc_store.get_document(document_id)
+    if doc:
+        return DocumentResponse(result=DocumentResult(id=doc["doc_id"], metadata=map_payload_to_metadata({}, doc)))
+    
+    # Fall back to looking up a single chunk by its point ID
+    if not is_point_id(document_id):
+        raise HTTPException(status_code=404, detail="Document not found")
     res = await vector_db.get_point(collection_name="papers", point_id=document_id)
     if not res:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    metadata = map_payload_to_metadata(res.payload or {})
+    payload = res.payload or {}
+    metadata = map_payload_to_metadata(payload, lookup_documents(doc_store, [payload]).get(payload.get("doc_id")))
     return DocumentResponse(result=DocumentResult(id=str(res.id), metadata=metadata))
 
+@app.get("/documents/{document_id}/similar", response_model=SimilarDocumentsResponse)
+async def get_similar_documents(
+    document_id: str,
+    top_k: int = 10,
+    authors: Optional[List[str]] = Query(None),
+    year_min: Optional[int] = None,
+    year_max: Optional[int] = None,
+    tags: Optional[List[str]] = Query(None),
+    vector_db: VectorDB = Depends(get_vector_db),
+    doc_store: DocumentStore = Depends(get_doc_store),
+    cache: LRUCache = Depends(get_similar_cache)
+):
+    filters = SearchFilters(authors=authors, year_min=year_min, year_max=year_max, tags=tags)
+    
+    # Any commit to the docs table means the collection changed, so it is part of the cache key
+    cache_key = (document_id, top_k, filters.model_dump_json(), doc_store.generation())
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return json_response(cached)
+    
+    # 1. Pick stored chunk vectors of the document to use as examples
+    doc = doc_store.get_document(document_id)
+    if doc and doc["total_chunks"]:
+        doc_id = doc["doc_id"]
+        step = max(1, doc["total_chunks"] // SIMILAR_EXAMPLE_CHUNKS)
+        example_ids = [chunk_point_id(doc_id, i) for i in range(0, doc["total_chunks"], step)][:SIMILAR_EXAMPLE_CHUNKS]
+        # Recommending from an ID that has no point fails the whole query, e.g. chunks deleted
+        # by hand or a docs row left behind by an interrupted ingestion
+        existing = await vector_db.get_points(collection_name="papers", point_ids=example_ids, with_payload=False)
+        example_ids = [point.id for point in existing]
+        if not example_ids:
+            raise HTTPException(status_code=404, detail="Document not found")
+    elif is_point_id(document_id):
+        res = await vector_db.get_point(collection_name="papers", point_id=document_id)
+        if not res:
+            raise HTTPException(status_code=404, detail="Document not found")
+        doc_id = (res.payload or {}).get("doc_id")
+        example_ids = [res.id]
+    else:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    # 2. Query Qdrant by example, one hit per document, excluding the document itself
+    query_filter = build_search_filter(filters)
+    if doc_id:
+        query_filter = exclude_document(query_filter, doc_id)
+    groups = await vector_db.recommend_groups(
+        collection_name="papers",
+        example_ids=example_ids,
+        limit=top_k,
+        query_filter=query_filter,
+        with_payload=SEARCH_PAYLOAD_FIELDS
+    )
+    await fill_missing_previews(vector_db, [group.hits[0] for group in groups if group.hits])
+    
+    # 3. Join against the docs table
+    docs = doc_store.get_documents(str(group.id) for group in groups)
+    similar = [
+        {
+            "document_id": str(group.id),
+            "score": group.hits[0].score,
+            "metadata": build_metadata(group.hits[0].payload or {}, docs.get(str(group.id)), include_raw=False)
+        }
+        for group in groups if group.hits
+    ]
+    
+    content = {"results": similar}
+    cache.put(cache_key, content)
+    return json_response(content)
+
+@app.get("/documents/{document_id}/chunks")
+async def stream_document_chunks(
+    document_id: str,
+    cursor: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    vector_db: VectorDB = Depends(get_vector_db),
+    doc_store: DocumentStore = Depends(get_doc_store)
+):
+    """
+    Streams the document's chunks as NDJSON in chunk_index order, starting at `cursor`.
+    To resume, pass the last received chunk_index + 1 as the next cursor.
+    """
+    doc = doc_store.get_document(document_id)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    async def ndjson_lines():
+        sent = 0
+        async for point in vector_db.scroll_chunks(
+            collection_name="papers",
+            doc_id=doc["doc_id"],
+            start_index=cursor,
+            page_size=CHUNK_PAGE_SIZE if limit is None else min(limit, CHUNK_PAGE_SIZE),
+            with_payload=CHUNK_PAYLOAD_FIELDS
+        ):
+            payload = point.payload or {}
+            yield orjson.dumps({"id": str(point.id), "chunk_index": payload.get("chunk_index"), "text": payload.get("text")}) + b"\n"
+            sent += 1
+            if limit is not None and sent >= limit:
+                return
+    
+    return StreamingResponse(
+        ndjson_lines(),
+        media_type="application/x-ndjson",
+        headers={"X-Total-Chunks": str(doc["total_chunks"])}
+    )
+
 @app.get("/library/map")
 async def get_library_map():
     return LibraryMapResponse(points=[], clusters=[])
@@ -0,0 +1,112 @@
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+from core.instrumentation import SHED_REQUESTS, TIMED_OUT_REQUESTS, ADMISSION_WAITING
+
+class Overloaded(Exception):
+    """The request would not finish within its deadline, rejected before doing any work."""
+    def __init__(self, retry_after: int):
+        super().__init__(f"Overloaded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+class DeadlineExceeded(Exception):
+    pass
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """Seconds left, to pass as the timeout of the next downstream call."""
+        remaining = self.expires_at - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded("Deadline exceeded")
+        return remaining
+
+class AdmissionController:
+    """
+    Concurrency limit and deadline for one endpoint.
+
+    At most `max_concurrency` requests run at once, the rest wait in line. A request
+    is shed up front when the expected wait, the number of requests ahead of it
+    times the recent service time spread over the concurrency slots, would not
+    leave enough of its deadline to be served.
+    """
+    def __init__(self, endpoint: str, max_concurrency: int = 8, deadline_s: float = 2.0, ewma_alpha: float = 0.2, initial_service_s: float = 0.05):
+        self.endpoint = endpoint
+        self.max_concurrency = max_concurrency
+        self.deadline_s = deadline_s
+        self.ewma_alpha = ewma_alpha
+        # Exponentially weighted moving average of the time a request holds a slot
+        self.service_time_s = initial_service_s
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def estimated_wait(self) -> float:
+        return self.waiting * self.service_time_s / self.max_concurrency
+
+    def _record_service_time(self, seconds: float):
+        self.service_time_s += self.ewma_alpha * (seconds - self.service_time_s)
+
+    async def _acquire(self, deadline: Deadline):
+        """
+        Waits for a slot until the deadline. Not asyncio.wait_for(acquire()), which on
+        older Pythons can lose a slot acquired just as the request is cancelled, and on
+        newer ones swallows the cancellation instead.
+        """
+        if not self._semaphore.locked():
+            # A free slot is taken without suspending, so there is nothing to cancel
+            await self._semaphore.acquire()
+            return
+        acquire = asyncio.ensure_future(self._semaphore.acquire())
+        try:
+            await asyncio.wait({acquire}, timeout=deadline.remaining())
+        except BaseException:
+            # Cancelled, e.g. the client went away, or the deadline had already passed
+            self._abandon(acquire)
+            raise
+        if not acquire.done():
+            self._abandon(acquire)
+            raise DeadlineExceeded("Deadline exceeded while queued")
+
+    def _abandon(self, acquire: asyncio.Future):
+        """Leaves the queue, handing the slot straight back if it was acquired in the meantime."""
+        acquire.add_done_callback(lambda done: done.cancelled() or self._semaphore.release())
+        acquire.cancel()
+
+    @asynccontextmanager
+    async def admit(self, deadline_s: Optional[float] = None):
+        """
+        Yields the request's Deadline once a slot is free. Raises Overloaded when the
+        queue is too long for the deadline and DeadlineExceeded when it runs out.
+        """
+        deadline_s = min(deadline_s or self.deadline_s, self.deadline_s)
+        estimated_wait = self.estimated_wait()
+        if estimated_wait + self.service_time_s > deadline_s:
+            SHED_REQUESTS.labels(endpoint=self.endpoint).inc()
+            raise Overloaded(retry_after=max(1, math.ceil(estimated_wait)))
+
+        deadline = Deadline(deadline_s)
+        self.waiting += 1
+        ADMISSION_WAITING.labels(endpoint=self.endpoint).inc()
+        try:
+            await self._acquire(deadline)
+        except DeadlineExceeded:
+            TIMED_OUT_REQUESTS.labels(endpoint=self.endpoint, stage="queue").inc()
+            raise DeadlineExceeded("Deadline exceeded while queued")
+        finally:
+            self.waiting -= 1
+            ADMISSION_WAITING.labels(endpoint=self.endpoint).dec()
+
+        started = time.monotonic()
+        try:
+            yield deadline
+        except (asyncio.TimeoutError, DeadlineExceeded):
+            TIMED_OUT_REQUESTS.labels(endpoint=self.endpoint, stage="execute").inc()
+            raise DeadlineExceeded("Deadline exceeded")
+        finally:
+            self._semaphore.release()
+            # Timed-out requests count too, otherwise a stalled backend would look fast
+            self._record_service_time(time.monotonic() - started)
@@ -0,0 +1,79 @@
+import json
+import os
+import sqlite3
+from typing import Any, Dict, Iterable, Optional
+from core.cache import LRUCache
+
+class DocumentStore:
+    """
+    Read-only view of the docs table written by the worker, with an LRU cache in front.
+    The cache is dropped whenever another connection commits to the database.
+    """
+    def __init__(self, db_path: str, cache_size: int = 4096):
+        self.db_path = db_path
+        self.cache = LRUCache(maxsize=cache_size)
+        self._conn = None
+        self._data_version = None
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        # The worker creates the database on its first ingest, so connect lazily
+        if self._conn is None:
+            if not os.path.exists(self.db_path):
+                return None
+            self._conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+        return self._conn
+
+    def generation(self) -> Optional[int]:
+        """
+        Changes whenever the worker commits to the docs table, None if there is no table yet.
+        """
+        conn = self._connect()
+        if conn is None:
+            return None
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self._data_version = version
+            self.cache.clear()
+        return version
+
+    def get_documents(self, doc_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns the records for the given doc_ids, skipping unknown ones.
+        Cache misses are fetched with a single query.
+        """
+        if self.generation() is None:
+            return {}
+
+        found = {}
+        missing = []
+        for doc_id in dict.fromkeys(doc_ids):
+            record = self.cache.get(doc_id)
+            if record is None:
+                missing.append(doc_id)
+            else:
+                found[doc_id] = record
+
+        if missing:
+            placeholders = ",".join("?" for _ in missing)
+            try:
+                rows = self._conn.execute(f"SELECT * FROM docs WHERE doc_id IN ({placeholders})", missing).fetchall()
+            except sqlite3.OperationalError:
+                # Table not created yet
+                rows = []
+            for row in rows:
+                record = dict(row)
+                for key in ("authors", "tags", "metadata"):
+                    record[key] = json.loads(record[key])
+                self.cache.put(record["doc_id"], record)
+                found[record["doc_id"]] = record
+
+        return found
+
+    def get_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        return self.get_documents([doc_id]).get(doc_id)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -1,18 +1,30 @@
+import asyncio
 import httpx
-from typing import List, Union
+from typing import List, Optional
+from core.instrumentation import trace_headers
+
+# Tells the embeddings service the request is interactive, so it is not queued behind ingestion
+PRIORITY_HEADER = "X-Priority"
 
 class EmbeddingClient:
     def __init__(self, base_url: str = "http://embeddings:8001"):
         self.base_url = base_url
 
-    async def get_embedding(self, text: str) -> List[float]:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f"{self.base_url}/embed", json={"text": text})
-            response.raise_for_status()
-            return response.json()["vector"]
+    def _headers(self) -> dict:
+        return {**trace_headers(), PRIORITY_HEADER: "interactive"}
 
-    async def get_embeddings(self, texts: List[str]) -> List[List[float]]:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f"{self.base_url}/embed", json={"text": texts})
+    async def _embed(self, text, timeout: Optional[float]):
+        # httpx's default is 5 seconds, a deadline replaces it for the whole call
+        async with httpx.AsyncClient(timeout=timeout if timeout is not None else httpx.Timeout(5.0)) as client:
+            try:
+                response = await client.post(f"{self.base_url}/embed", json={"text": text}, headers=self._headers())
+            except httpx.TimeoutException as e:
+                raise asyncio.TimeoutError() from e
             response.raise_for_status()
             return response.json()["vector"]
+
+    async def get_embedding(self, text: str, timeout: Optional[float] = None) -> List[float]:
+        return await self._embed(text, timeout)
+
+    async def get_embeddings(self, texts: List[str], timeout: Optional[float] = None) -> List[List[float]]:
+        return await self._embed(texts, timeout)
@@ -0,0 +1,35 @@
+from typing import Optional
+from qdrant_client import models
+from models.schemas import SearchFilters
+
+def build_search_filter(filters: Optional[SearchFilters]) -> Optional[models.Filter]:
+    """
+    Translates the API search filters into a Qdrant payload filter.
+    Returns None when no filter applies so Qdrant can skip filtering entirely.
+    """
+    if filters is None:
+        return None
+
+    conditions = []
+    if filters.authors:
+        conditions.append(models.FieldCondition(key="authors", match=models.MatchAny(any=filters.authors)))
+    if filters.tags:
+        conditions.append(models.FieldCondition(key="tags", match=models.MatchAny(any=filters.tags)))
+    if filters.year_min is not None or filters.year_max is not None:
+        conditions.append(models.FieldCondition(
+            key="year",
+            range=models.Range(gte=filters.year_min, lte=filters.year_max)
+        ))
+
+    if not conditions:
+        return None
+    return models.Filter(must=conditions)
+
+def exclude_document(query_filter: Optional[models.Filter], doc_id: str) -> models.Filter:
+    """
+    Adds a condition dropping all chunks of `doc_id` to an existing filter.
+    """
+    query_filter = query_filter or models.Filter()
+    exclusion = models.FieldCondition(key="doc_id", match=models.MatchValue(value=doc_id))
+    query_filter.must_not = (query_filter.must_not or []) + [exclusion]
+    return query_filter
@@ -0,0 +1,54 @@
+import contextvars
+import uuid
+from prometheus_client import Counter, Gauge, Histogram
+
+# --- Tracing ---
+# Each service is its own Docker build context, so this block is copied verbatim into
+# api, embeddings and worker core/instrumentation.py. Keep the three copies identical.
+
+# Header carrying the trace ID between services
+TRACE_HEADER = "X-Trace-Id"
+
+# Trace ID of the request or document being handled, picked up by outgoing HTTP calls
+current_trace_id = contextvars.ContextVar("current_trace_id", default=None)
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+def trace_headers() -> dict:
+    trace_id = current_trace_id.get()
+    return {TRACE_HEADER: trace_id} if trace_id else {}
+
+# --- Metrics ---
+
+SEARCH_STAGE_SECONDS = Histogram(
+    "api_search_stage_seconds",
+    "Time spent in each stage of a search request",
+    ["endpoint", "stage"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+REQUEST_SECONDS = Histogram(
+    "api_request_seconds",
+    "End-to-end request latency",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+SHED_REQUESTS = Counter(
+    "api_shed_requests_total",
+    "Requests rejected with 503 because the queue would not clear before their deadline",
+    ["endpoint"],
+)
+
+TIMED_OUT_REQUESTS = Counter(
+    "api_timed_out_requests_total",
+    "Admitted requests that ran out of deadline, while queued or while executing",
+    ["endpoint", "stage"],
+)
+
+ADMISSION_WAITING = Gauge(
+    "api_admission_waiting",
+    "Requests waiting for a concurrency slot",
+    ["endpoint"],
+)
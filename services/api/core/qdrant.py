@@ -0,0 +1,42 @@
+# The API and worker are separate Docker build contexts, so this module is copied
+# verbatim into both core/qdrant.py. Keep the two copies identical.
+import os
+import httpx
+from qdrant_client import AsyncQdrantClient
+
+def settings_from_env() -> dict:
+    """
+    Connection settings for the Qdrant server, same variables for the API and worker.
+    gRPC sends vectors as packed floats instead of JSON and is worth enabling
+    for bulk upserts and high-QPS search.
+    """
+    return {
+        "host": os.getenv("QDRANT_HOST", "qdrant"),
+        "port": int(os.getenv("QDRANT_PORT", "6333")),
+        "grpc_port": int(os.getenv("QDRANT_GRPC_PORT", "6334")),
+        "prefer_grpc": os.getenv("QDRANT_PREFER_GRPC", "false").lower() in ("1", "true", "yes"),
+        "timeout": int(os.getenv("QDRANT_TIMEOUT", "10")),
+        "pool_size": int(os.getenv("QDRANT_POOL_SIZE", "32")),
+    }
+
+# One client per process and settings, its connection pool is shared by every caller
+_clients = {}
+
+def get_client(host: str = "qdrant", port: int = 6333, grpc_port: int = 6334, prefer_grpc: bool = False, timeout: int = 10, pool_size: int = 32) -> AsyncQdrantClient:
+    key = (host, port, grpc_port, prefer_grpc, timeout, pool_size)
+    if key not in _clients:
+        _clients[key] = AsyncQdrantClient(
+            host=host,
+            port=port,
+            grpc_port=grpc_port,
+            prefer_grpc=prefer_grpc,
+            timeout=timeout,
+            # Keep-alive connections for REST, gRPC multiplexes over a single channel
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+    return _clients[key]
+
+async def close_clients():
+    for client in _clients.values():
+        await client.close()
+    _clients.clear()
@@ -1,25 +1,208 @@
 from qdrant_client import AsyncQdrantClient, models
+import asyncio
+import math
 import os
+import uuid
+
+# Payload field every chunk carries to identify its parent document
+DOCUMENT_ID_FIELD = "doc_id"
+
+# Payload fields we filter or group on, with the index type Qdrant should build
+PAYLOAD_INDEXES = {
+    DOCUMENT_ID_FIELD: models.PayloadSchemaType.KEYWORD,
+    "chunk_index": models.PayloadSchemaType.INTEGER,
+    "year": models.PayloadSchemaType.INTEGER,
+    "authors": models.PayloadSchemaType.KEYWORD,
+    "tags": models.PayloadSchemaType.KEYWORD,
+}
+
+# Named vectors of a two-stage collection, keep in sync with the worker's QdrantStore.
+# Collections created before have a single unnamed vector and no prefix.
+FULL_VECTOR = "full"
+PREFIX_VECTOR = "prefix"
+
+def prefix_vector(vector: list[float], dim: int) -> list[float]:
+    """First `dim` components scaled back to unit length, as the worker stores them."""
+    prefix = vector[:dim]
+    norm = math.sqrt(sum(x * x for x in prefix))
+    return [x / norm for x in prefix] if norm else list(prefix)
+
+def chunk_point_id(doc_id: str, chunk_index: int) -> str:
+    """
+    Point ID the worker assigns to a chunk, keep in sync with the worker's QdrantStore.
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{doc_id}:{chunk_index}"))
+
+def deadline_kwargs(timeout: float = None) -> dict:
+    # Qdrant takes whole seconds, so it stops the search server-side at roughly the same deadline
+    return {"timeout": max(1, math.ceil(timeout))} if timeout is not None else {}
 
 class VectorDB:
-    def __init__(self, host: str = "qdrant", port: int = 6333):
-        self.client = AsyncQdrantClient(host=host, port=port)
-    
+    """
+    `prefix_dim` is the size of the prefix vector in collections this creates.
+    With `two_stage`, searches on a collection that has a prefix vector fetch
+    `oversampling` times the requested candidates on the prefix, then rescore
+    only those against the full vectors.
+    """
+    def __init__(self, host: str = "qdrant", port: int = 6333, client: AsyncQdrantClient = None, prefix_dim: int = 128, two_stage: bool = False, oversampling: float = 4.0):
+        # An existing client can be passed in, e.g. an in-memory one for benchmarks
+        self.client = client or AsyncQdrantClient(host=host, port=port)
+        self.prefix_dim = prefix_dim
+        self.two_stage = two_stage
+        self.oversampling = oversampling
+        # Per collection: (name of the full vector or None when unnamed, prefix size or 0)
+        self._layouts = {}
+
     async def ensure_collection(self, collection_name: str, vector_size: int = 384):
-        if not await self.client.collection_exists(collection_name=collection_name):
-            await self.client.create_collection(
+        # After a rebuild `collection_name` is an alias of the live collection, it must not be created again
+        aliases = (await self.client.get_aliases()).aliases
+        is_alias = any(alias.alias_name == collection_name for alias in aliases)
+        if not is_alias and not await self.client.collection_exists(collection_name=collection_name):
+            if self.prefix_dim:
+                vectors_config = {
+                    FULL_VECTOR: models.VectorParams(size=vector_size, distance=models.Distance.COSINE),
+                    PREFIX_VECTOR: models.VectorParams(size=min(self.prefix_dim, vector_size), distance=models.Distance.COSINE),
+                }
+            else:
+                vectors_config = models.VectorParams(size=vector_size, distance=models.Distance.COSINE)
+            await self.client.create_collection(collection_name=collection_name, vectors_config=vectors_config)
+
+        # Creating an index that already exists is a no-op, so this also upgrades older collections
+        for field_name, field_schema in PAYLOAD_INDEXES.items():
+            await self.client.create_payload_index(
                 collection_name=collection_name,
-                vectors_config=models.VectorParams(size=vector_size, distance=models.Distance.COSINE)
+                field_name=field_name,
+                field_schema=field_schema
             )
 
-    async def search(self, collection_name: str, query_vector: list[float], limit: int = 10):
-        result = await self.client.query_points(
+    async def vector_layout(self, collection_name: str) -> tuple:
+        """
+        Name of the full vector (None for an unnamed one) and the prefix size (0 without a prefix).
+        Looked up once per collection and dropped again when a query fails, since a
+        rebuild may have moved the alias to a collection with another layout.
+        """
+        if collection_name not in self._layouts:
+            info = await self.client.get_collection(collection_name=collection_name)
+            vectors = info.config.params.vectors
+            if isinstance(vectors, dict):
+                prefix = vectors.get(PREFIX_VECTOR)
+                self._layouts[collection_name] = (FULL_VECTOR, prefix.size if prefix else 0)
+            else:
+                self._layouts[collection_name] = (None, 0)
+        return self._layouts[collection_name]
+
+    async def _query(self, collection_name: str, call, timeout: float = None):
+        try:
+            return await asyncio.wait_for(call, timeout=timeout)
+        except Exception:
+            self._layouts.pop(collection_name, None)
+            raise
+
+    async def query_kwargs(self, collection_name: str, query_vector: list[float], candidates: int, query_filter: models.Filter = None, two_stage: bool = None) -> dict:
+        """
+        Query arguments for a search that ends with `candidates` scored points.
+        Two-stage: an HNSW search on the small prefix vector over-fetches candidates,
+        and Qdrant rescores only those on the full vector, so the large full-vector
+        index is never traversed.
+        """
+        using, prefix_dim = await self.vector_layout(collection_name)
+        two_stage = self.two_stage if two_stage is None else two_stage
+        if not (two_stage and prefix_dim):
+            return {"query": query_vector, "using": using, "query_filter": query_filter}
+        return {
+            "prefetch": models.Prefetch(
+                query=prefix_vector(query_vector, prefix_dim),
+                using=PREFIX_VECTOR,
+                filter=query_filter,
+                limit=math.ceil(candidates * self.oversampling)
+            ),
+            "query": query_vector,
+            "using": using,
+        }
+
+    async def search(self, collection_name: str, query_vector: list[float], limit: int = 10, query_filter: models.Filter = None, with_payload=True, timeout: float = None, two_stage: bool = None):
+        """
+        `with_payload` can be a list of field names so Qdrant only returns what the caller needs.
+        `timeout` is the seconds left of the request's deadline, asyncio.TimeoutError once it passes.
+        `two_stage` overrides the instance setting, it only applies to collections with a prefix vector.
+        """
+        query = await self.query_kwargs(collection_name, query_vector, limit, query_filter, two_stage)
+        result = await self._query(collection_name, self.client.query_points(
             collection_name=collection_name,
-            query=query_vector,
             limit=limit,
-            with_payload=True
-        )
+            with_payload=with_payload,
+            **query,
+            **deadline_kwargs(timeout)
+        ), timeout=timeout)
         return result.points
+
+    async def search_groups(self, collection_name: str, query_vector: list[float], limit: int = 10, group_size: int = 3, query_filter: models.Filter = None, group_by: str = DOCUMENT_ID_FIELD, with_payload=True, timeout: float = None, two_stage: bool = None):
+        """
+        Returns the best `limit` documents, each with up to `group_size` of its best chunks.
+        Grouping happens inside Qdrant, so a single long paper cannot crowd out the rest.
+        """
+        query = await self.query_kwargs(collection_name, query_vector, limit * group_size, query_filter, two_stage)
+        result = await self._query(collection_name, self.client.query_points_groups(
+            collection_name=collection_name,
+            group_by=group_by,
+            limit=limit,
+            group_size=group_size,
+            with_payload=with_payload,
+            **query,
+            **deadline_kwargs(timeout)
+        ), timeout=timeout)
+        return result.groups
+
+    async def recommend_groups(self, collection_name: str, example_ids: list, limit: int = 10, group_size: int = 1, query_filter: models.Filter = None, group_by: str = DOCUMENT_ID_FIELD, with_payload=True):
+        """
+        Finds the documents closest to the stored vectors of `example_ids`, without re-embedding anything.
+        """
+        using, _ = await self.vector_layout(collection_name)
+        result = await self._query(collection_name, self.client.query_points_groups(
+            collection_name=collection_name,
+            query=models.RecommendQuery(recommend=models.RecommendInput(
+                positive=example_ids,
+                strategy=models.RecommendStrategy.AVERAGE_VECTOR
+            )),
+            using=using,
+            group_by=group_by,
+            query_filter=query_filter,
+            limit=limit,
+            group_size=group_size,
+            with_payload=with_payload
+        ))
+        return result.groups
+
+    async def scroll_chunks(self, collection_name: str, doc_id: str, start_index: int = 0, page_size: int = 64, with_payload=True):
+        """
+        Yields the chunks of one document in chunk_index order, one page in memory at a time.
+        Pages are keyed on chunk_index rather than a scroll offset, since ordered scrolls return no offset.
+        """
+        cursor = start_index
+        while True:
+            points, _ = await self.client.scroll(
+                collection_name=collection_name,
+                scroll_filter=models.Filter(must=[
+                    models.FieldCondition(key=DOCUMENT_ID_FIELD, match=models.MatchValue(value=doc_id)),
+                    models.FieldCondition(key="chunk_index", range=models.Range(gte=cursor)),
+                ]),
+                order_by=models.OrderBy(key="chunk_index", direction=models.Direction.ASC),
+                limit=page_size,
+                with_payload=with_payload
+            )
+            for point in points:
+                yield point
+            if len(points) < page_size:
+                return
+            cursor = points[-1].payload["chunk_index"] + 1
+
+    async def get_points(self, collection_name: str, point_ids: list, with_payload=True) -> list:
+        return await self.client.retrieve(
+            collection_name=collection_name,
+            ids=point_ids,
+            with_payload=with_payload
+        )
+
     async def get_point(self, collection_name: str, point_id: str):
         result = await self.client.retrieve(
             collection_name=collection_name,
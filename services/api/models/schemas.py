@@ -7,6 +7,7 @@ class DocumentMetadata(BaseModel):
     title: str
     authors: List[str] = Field(default_factory=list)
     year: Optional[int] = None
+    # In search results, the first 300 characters of the matched chunk, with "..." when cut
     abstract: Optional[str] = None
     tags: List[str] = Field(default_factory=list)
     raw_metadata: Optional[Dict[str, Any]] = None
@@ -33,6 +34,29 @@ class SearchResult(BaseModel):
 class SearchResponse(BaseModel):
     results: List[SearchResult]
 
+# --- Grouped Search API ---
+
+class GroupedSearchRequest(BaseModel):
+    query: str
+    top_k: int = 10
+    chunks_per_document: int = 3
+    filters: Optional[SearchFilters] = None
+
+class ChunkHit(BaseModel):
+    id: str
+    score: float
+    chunk_index: Optional[int] = None
+    text: Optional[str] = None
+
+class DocumentGroup(BaseModel):
+    document_id: str
+    score: float
+    metadata: DocumentMetadata
+    chunks: List[ChunkHit]
+
+class GroupedSearchResponse(BaseModel):
+    results: List[DocumentGroup]
+
 # --- Document API ---
 
 class DocumentResult(BaseModel):
@@ -42,6 +66,14 @@ class DocumentResult(BaseModel):
 class DocumentResponse(BaseModel):
     result: DocumentResult
 
+class SimilarDocument(BaseModel):
+    document_id: str
+    score: float
+    metadata: DocumentMetadata
+
+class SimilarDocumentsResponse(BaseModel):
+    results: List[SimilarDocument]
+
 # --- Library Map API ---
 
 class MapPoint(BaseModel):
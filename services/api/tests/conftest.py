@@ -0,0 +1,121 @@
+import asyncio
+import hashlib
+import importlib.util
+import os
+import sys
+import httpx
+import numpy as np
+import pytest_asyncio
+from qdrant_client import AsyncQdrantClient, models
+
+# Add the parent directory to sys.path to allow importing from core
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.vector_db import VectorDB, chunk_point_id
+from core.doc_store import DocumentStore
+from core.cache import LRUCache
+from core.admission import AdmissionController
+import app.main as api
+
+def load_worker_doc_store():
+    """
+    The worker owns the docs table, test rows are written through its DocumentStore
+    so they always have the schema the API reads in production.
+    """
+    path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "worker", "core", "doc_store.py"))
+    spec = importlib.util.spec_from_file_location("worker_doc_store", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+worker_doc_store = load_worker_doc_store()
+
+def document_record(doc_id, title, authors=(), year=None, tags=(), total_chunks=0):
+    record = worker_doc_store.document_record_from_parsed(
+        {"doc_id": doc_id, "metadata": {}, "filename": f"{doc_id}.pdf"}, total_chunks=total_chunks
+    )
+    record.update(title=title, authors=list(authors), year=year, tags=list(tags))
+    return record
+
+def write_documents(db_path, records):
+    store = worker_doc_store.DocumentStore(db_path)
+    for record in records:
+        store.upsert_document(record)
+    store.close()
+
+# Same wiring as benchmarks/api_bench.py: the app served in-process over httpx's ASGI
+# transport, with a fake embedder and in-memory Qdrant instead of the real services
+DIM = 16
+CHUNKS_PER_DOCUMENT = 5
+# doc_id -> (year, tags, author)
+DOCUMENTS = {
+    "doc0": (2020, ["ml"], "Ada"),
+    "doc1": (2021, ["bio"], "Bob"),
+    "doc2": (2022, ["ml"], "Cy"),
+}
+
+def fake_vector(text):
+    """Deterministic unit vector, the query "doc1:2" embeds onto chunk 2 of doc1."""
+    seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(DIM)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+def chunk_text(doc_id, chunk_index):
+    return f"chunk {chunk_index} of {doc_id} " * 40
+
+class FakeEmbedder:
+    async def get_embedding(self, text, timeout=None):
+        return fake_vector(text)
+
+class BlockingEmbedder:
+    """Holds every call until released, giving up at the caller's timeout like EmbeddingClient."""
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.calls = 0
+
+    async def get_embedding(self, text, timeout=None):
+        self.calls += 1
+        await asyncio.wait_for(self.release.wait(), timeout)
+        return fake_vector(text)
+
+async def seed_collection(vector_db):
+    await vector_db.ensure_collection("papers", vector_size=DIM)
+    points = []
+    for doc_id, (year, tags, author) in DOCUMENTS.items():
+        for c in range(CHUNKS_PER_DOCUMENT):
+            text = chunk_text(doc_id, c)
+            # The preview the worker stores next to the text
+            points.append(models.PointStruct(
+                id=chunk_point_id(doc_id, c),
+                vector=fake_vector(f"{doc_id}:{c}"),
+                payload={"doc_id": doc_id, "chunk_index": c, "text": text, "preview": text[:api.PREVIEW_CHARS] + "...",
+                         "year": year, "authors": [author], "tags": tags}
+            ))
+    await vector_db.client.upsert(collection_name="papers", points=points)
+
+@pytest_asyncio.fixture
+async def client(tmp_path):
+    db_path = str(tmp_path / "docs.sqlite")
+    write_documents(db_path, [
+        document_record(doc_id, f"Paper {doc_id}", authors=[author], year=year, tags=tags, total_chunks=CHUNKS_PER_DOCUMENT)
+        for doc_id, (year, tags, author) in DOCUMENTS.items()
+    ])
+    vector_db = VectorDB(client=AsyncQdrantClient(location=":memory:"), prefix_dim=0)
+    await seed_collection(vector_db)
+
+    # The lifespan would connect to real services, so resources are wired up directly
+    api.resources.update(
+        embedder=FakeEmbedder(),
+        vector_db=vector_db,
+        doc_store=DocumentStore(db_path),
+        similar_cache=LRUCache(maxsize=16),
+        search_admission=AdmissionController("search", max_concurrency=4, deadline_s=10),
+        search_grouped_admission=AdmissionController("search_grouped", max_concurrency=4, deadline_s=10),
+    )
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://test") as http:
+            yield http
+    finally:
+        api.resources["doc_store"].close()
+        api.resources.clear()
+        await vector_db.client.close()
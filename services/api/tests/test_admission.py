@@ -0,0 +1,131 @@
+import asyncio
+import os
+import sys
+import pytest
+
+# Add the parent directory to sys.path to allow importing from core
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.admission import AdmissionController, Overloaded, DeadlineExceeded
+
+def test_requests_within_concurrency_are_admitted():
+    async def scenario():
+        controller = AdmissionController("test", max_concurrency=2, deadline_s=1.0)
+        async def request():
+            async with controller.admit() as deadline:
+                await asyncio.sleep(0.01)
+                return deadline.remaining()
+        return await asyncio.gather(request(), request(), request())
+
+    assert all(0 < remaining <= 1.0 for remaining in asyncio.run(scenario()))
+
+def test_sheds_when_queue_exceeds_deadline():
+    async def scenario():
+        controller = AdmissionController("test", max_concurrency=1, deadline_s=0.35, initial_service_s=0.2)
+        release = asyncio.Event()
+
+        async def slow():
+            async with controller.admit():
+                await release.wait()
+
+        running = []
+        for _ in range(2):
+            running.append(asyncio.create_task(slow()))
+            await asyncio.sleep(0.01)
+        # One running and one waiting at 0.2s each, the next one could not finish within 0.35s
+        with pytest.raises(Overloaded) as excinfo:
+            async with controller.admit():
+                pass
+        release.set()
+        await asyncio.gather(*running)
+        return excinfo.value
+
+    assert asyncio.run(scenario()).retry_after >= 1
+
+def test_deadline_expires_while_queued():
+    async def scenario():
+        controller = AdmissionController("test", max_concurrency=1, deadline_s=0.05, initial_service_s=0.001)
+        release = asyncio.Event()
+
+        async def hold():
+            async with controller.admit():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        with pytest.raises(DeadlineExceeded):
+            async with controller.admit():
+                pass
+        assert controller.waiting == 0
+        release.set()
+        # The holder itself outlived its deadline, which is only enforced through remaining()
+        await holder
+
+    asyncio.run(scenario())
+
+def test_downstream_timeout_becomes_deadline_exceeded():
+    async def scenario():
+        controller = AdmissionController("test", max_concurrency=1, deadline_s=0.1, initial_service_s=0.001)
+        with pytest.raises(DeadlineExceeded):
+            async with controller.admit() as deadline:
+                await asyncio.wait_for(asyncio.sleep(1), timeout=deadline.remaining())
+        # The slot is released again
+        async with controller.admit():
+            pass
+
+    asyncio.run(scenario())
+
+def test_client_deadline_cannot_exceed_endpoint_deadline():
+    async def scenario():
+        controller = AdmissionController("test", deadline_s=0.5)
+        async with controller.admit(10) as deadline:
+            return deadline.remaining()
+
+    assert asyncio.run(scenario()) <= 0.5
+
+class CancelOnAcquire(asyncio.Semaphore):
+    """Cancels the request the moment it gets its slot, as a client disconnecting would."""
+    request = None
+
+    async def acquire(self):
+        acquired = await super().acquire()
+        if self.request is not None:
+            self.request.cancel()
+        return acquired
+
+def test_request_cancelled_as_it_gets_a_slot_gives_it_back():
+    async def scenario():
+        controller = AdmissionController("test", max_concurrency=1, deadline_s=1.0, initial_service_s=0.001)
+        controller._semaphore = semaphore = CancelOnAcquire(1)
+        holding = asyncio.Event()
+        release = asyncio.Event()
+        ran = []
+
+        async def hold():
+            async with controller.admit():
+                holding.set()
+                await release.wait()
+
+        async def request():
+            async with controller.admit():
+                ran.append(True)
+
+        holder = asyncio.create_task(hold())
+        await holding.wait()
+        # Queued behind the holder, cancelled just as the holder's slot passes to it
+        task = semaphore.request = asyncio.create_task(request())
+        while not semaphore._waiters:
+            await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(holder, task, return_exceptions=True)
+        semaphore.request = None
+        await asyncio.sleep(0)
+        # The cancellation reaches the request instead of being swallowed
+        assert task.cancelled() and not ran
+        assert controller.waiting == 0
+        # The slot is free again
+        async with controller.admit():
+            pass
+        return semaphore.locked()
+
+    assert asyncio.run(scenario()) is False
@@ -0,0 +1,29 @@
+import os
+import sys
+
+# Add the parent directory to sys.path to allow importing from core
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from conftest import document_record, write_documents
+from core.doc_store import DocumentStore
+
+def write_doc(db_path, doc_id, title):
+    write_documents(db_path, [document_record(doc_id, title, authors=["Ada"], year=2020, total_chunks=3)])
+
+def test_missing_database_returns_nothing(tmp_path):
+    store = DocumentStore(str(tmp_path / "docs.sqlite"))
+    assert store.get_documents(["abc"]) == {}
+
+def test_get_documents_caches_and_invalidates(tmp_path):
+    db_path = str(tmp_path / "docs.sqlite")
+    write_doc(db_path, "abc", "First")
+    store = DocumentStore(db_path)
+
+    docs = store.get_documents(["abc", "missing", "abc"])
+    assert list(docs) == ["abc"]
+    assert docs["abc"]["authors"] == ["Ada"]
+    assert len(store.cache) == 1
+
+    # A commit from the worker drops the cache
+    write_doc(db_path, "abc", "Second")
+    assert store.get_document("abc")["title"] == "Second"
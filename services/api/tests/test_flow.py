@@ -17,7 +17,8 @@ async def test_e2e_embedding_and_search():
     # 1. Setup Clients
     # Pointing to localhost ports as exposed by docker-compose
     embedder = EmbeddingClient(base_url="http://localhost:8001")
-    vector_db = VectorDB(host="localhost", port=6333)
+    # Single unnamed vector, the points below are upserted without names
+    vector_db = VectorDB(host="localhost", port=6333, prefix_dim=0)
     
     collection_name = "test_collection"
     
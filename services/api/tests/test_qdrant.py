@@ -0,0 +1,31 @@
+import os
+import sys
+import pytest
+
+# Add the parent directory to sys.path to allow importing from core
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.qdrant import get_client, settings_from_env, close_clients
+
+def test_settings_from_env(monkeypatch):
+    monkeypatch.setenv("QDRANT_HOST", "qdrant.local")
+    monkeypatch.setenv("QDRANT_PREFER_GRPC", "true")
+    monkeypatch.setenv("QDRANT_POOL_SIZE", "8")
+
+    settings = settings_from_env()
+
+    assert settings["host"] == "qdrant.local"
+    assert settings["prefer_grpc"] is True
+    assert settings["grpc_port"] == 6334
+    assert settings["pool_size"] == 8
+
+# Building a client checks the server version, there is no server here
+@pytest.mark.asyncio
+@pytest.mark.filterwarnings("ignore:Failed to obtain server version")
+async def test_client_is_shared_per_settings():
+    try:
+        rest = get_client(host="localhost")
+        assert get_client(host="localhost") is rest
+        assert get_client(host="localhost", prefer_grpc=True) is not rest
+    finally:
+        await close_clients()
@@ -0,0 +1,164 @@
+import asyncio
+import json
+import pytest
+
+from conftest import CHUNKS_PER_DOCUMENT, BlockingEmbedder, chunk_text
+from core.vector_db import chunk_point_id
+from core.admission import AdmissionController
+import app.main as api
+
+pytestmark = pytest.mark.filterwarnings("ignore:Payload indexes")
+
+@pytest.mark.asyncio
+async def test_grouped_search_returns_documents_with_their_best_chunks(client):
+    response = await client.post("/search/grouped", json={"query": "doc1:2", "top_k": 3, "chunks_per_document": 2})
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert sorted(group["document_id"] for group in results) == ["doc0", "doc1", "doc2"]
+    best = results[0]
+    assert best["document_id"] == "doc1"
+    assert best["metadata"]["title"] == "Paper doc1"
+    assert best["metadata"]["authors"] == ["Bob"]
+    assert len(best["chunks"]) == 2
+    assert best["chunks"][0]["chunk_index"] == 2
+    assert best["chunks"][0]["text"] == chunk_text("doc1", 2)
+    assert best["score"] == best["chunks"][0]["score"] >= best["chunks"][1]["score"]
+    assert [group["score"] for group in results] == sorted((group["score"] for group in results), reverse=True)
+
+@pytest.mark.asyncio
+async def test_grouped_search_applies_filters(client):
+    response = await client.post("/search/grouped", json={"query": "doc1:2", "filters": {"tags": ["ml"]}})
+    assert sorted(group["document_id"] for group in response.json()["results"]) == ["doc0", "doc2"]
+
+    response = await client.post("/search/grouped", json={"query": "doc1:2", "filters": {"year_min": 2021, "authors": ["Cy"]}})
+    assert [group["document_id"] for group in response.json()["results"]] == ["doc2"]
+
+@pytest.mark.asyncio
+async def test_search_fetches_only_projected_fields_and_returns_a_preview(client, monkeypatch):
+    vector_db = api.resources["vector_db"]
+    requested = []
+    search = vector_db.search
+    async def recording_search(*args, **kwargs):
+        requested.append(kwargs["with_payload"])
+        return await search(*args, **kwargs)
+    monkeypatch.setattr(vector_db, "search", recording_search)
+
+    response = await client.post("/search", json={"query": "doc1:2", "top_k": 3})
+
+    assert response.status_code == 200
+    assert requested == [api.SEARCH_PAYLOAD_FIELDS]
+    assert "text" not in api.SEARCH_PAYLOAD_FIELDS
+    best = response.json()["results"][0]
+    assert best["id"] == chunk_point_id("doc1", 2)
+    assert best["metadata"]["abstract"] == chunk_text("doc1", 2)[:api.PREVIEW_CHARS] + "..."
+    assert best["metadata"]["title"] == "Paper doc1"
+    assert best["metadata"]["raw_metadata"] is None
+
+@pytest.mark.asyncio
+async def test_search_cuts_a_preview_for_points_stored_without_one(client):
+    vector_db = api.resources["vector_db"]
+    text = chunk_text("doc1", 2)
+    # As ingested before chunks carried a preview
+    await vector_db.client.delete_payload("papers", keys=["preview"], points=[chunk_point_id("doc1", 2)])
+
+    response = await client.post("/search", json={"query": "doc1:2", "top_k": 1})
+
+    assert response.json()["results"][0]["metadata"]["abstract"] == text[:api.PREVIEW_CHARS] + "..."
+
+@pytest.mark.asyncio
+async def test_similar_documents_exclude_the_source_document(client):
+    response = await client.get("/documents/doc1/similar", params={"top_k": 5})
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert sorted(result["document_id"] for result in results) == ["doc0", "doc2"]
+    assert all(result["metadata"]["abstract"].endswith("...") for result in results)
+
+    # A single chunk works as the example too, its own document is still excluded
+    response = await client.get(f"/documents/{chunk_point_id('doc1', 0)}/similar")
+    assert sorted(result["document_id"] for result in response.json()["results"]) == ["doc0", "doc2"]
+
+@pytest.mark.asyncio
+async def test_similar_documents_apply_filters(client):
+    response = await client.get("/documents/doc0/similar", params={"tags": ["ml"]})
+    assert [result["document_id"] for result in response.json()["results"]] == ["doc2"]
+
+    assert (await client.get("/documents/missing/similar")).status_code == 404
+
+@pytest.mark.asyncio
+async def test_similar_documents_use_only_example_chunks_that_exist(client):
+    vector_db = api.resources["vector_db"]
+    # The docs row of doc1 outlived some of its points, then all of them
+    await vector_db.client.delete("papers", points_selector=[chunk_point_id("doc1", c) for c in range(1, CHUNKS_PER_DOCUMENT)])
+
+    response = await client.get("/documents/doc1/similar")
+    assert response.status_code == 200
+    assert sorted(result["document_id"] for result in response.json()["results"]) == ["doc0", "doc2"]
+
+    await vector_db.client.delete("papers", points_selector=[chunk_point_id("doc1", 0)])
+    response = await client.get("/documents/doc1/similar", params={"top_k": 3})
+    assert response.status_code == 404
+
+def ndjson(response):
+    body = response.content
+    assert body.endswith(b"\n")
+    return [json.loads(line) for line in body.split(b"\n")[:-1]]
+
+@pytest.mark.asyncio
+async def test_chunks_stream_as_ndjson_in_order(client):
+    response = await client.get("/documents/doc2/chunks")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["X-Total-Chunks"] == str(CHUNKS_PER_DOCUMENT)
+    lines = ndjson(response)
+    assert [line["chunk_index"] for line in lines] == list(range(CHUNKS_PER_DOCUMENT))
+    assert lines[3] == {"id": chunk_point_id("doc2", 3), "chunk_index": 3, "text": chunk_text("doc2", 3)}
+
+    assert (await client.get("/documents/missing/chunks")).status_code == 404
+
+@pytest.mark.asyncio
+async def test_chunks_resume_from_cursor_across_pages(client, monkeypatch):
+    # Pages of two, so the stream crosses page boundaries keyed on chunk_index
+    monkeypatch.setattr(api, "CHUNK_PAGE_SIZE", 2)
+
+    lines = ndjson(await client.get("/documents/doc1/chunks", params={"cursor": 1}))
+    assert [line["chunk_index"] for line in lines] == [1, 2, 3, 4]
+
+    first = ndjson(await client.get("/documents/doc1/chunks", params={"limit": 3}))
+    rest = ndjson(await client.get("/documents/doc1/chunks", params={"cursor": first[-1]["chunk_index"] + 1, "limit": 3}))
+    assert [line["chunk_index"] for line in first + rest] == list(range(CHUNKS_PER_DOCUMENT))
+
+@pytest.mark.asyncio
+async def test_search_sheds_with_retry_after_when_the_queue_is_too_long(client):
+    embedder = api.resources["embedder"] = BlockingEmbedder()
+    # One slot and 0.4s per request: one running and two queued fit a 1s deadline, a fourth does not
+    api.resources["search_admission"] = AdmissionController("search", max_concurrency=1, deadline_s=1.0, initial_service_s=0.4)
+
+    async def until(condition):
+        while not condition():
+            await asyncio.sleep(0.001)
+
+    admitted = [asyncio.create_task(client.post("/search", json={"query": "doc0:0"}))]
+    await asyncio.wait_for(until(lambda: embedder.calls == 1), 1)
+    admitted += [asyncio.create_task(client.post("/search", json={"query": f"doc0:{i}"})) for i in (1, 2)]
+    await asyncio.wait_for(until(lambda: api.resources["search_admission"].waiting == 2), 1)
+    response = await client.post("/search", json={"query": "doc0:3"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert "Overloaded" in response.json()["detail"]
+    embedder.release.set()
+    assert [r.status_code for r in await asyncio.gather(*admitted)] == [200, 200, 200]
+
+@pytest.mark.asyncio
+async def test_search_times_out_with_504_at_the_client_deadline(client):
+    api.resources["embedder"] = BlockingEmbedder()
+
+    response = await client.post("/search", json={"query": "doc0:0"}, headers={api.DEADLINE_HEADER: "50"})
+    assert response.status_code == 504
+    assert response.json() == {"detail": "Deadline exceeded"}
+
+    response = await client.post("/search/grouped", json={"query": "doc0:0"}, headers={api.DEADLINE_HEADER: "50"})
+    assert response.status_code == 504
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from qdrant_client import AsyncQdrantClient, models
+from core.vector_db import VectorDB, FULL_VECTOR, PREFIX_VECTOR, prefix_vector
+
+DIM = 16
+
+def unit_vectors(count, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((count, DIM))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).tolist()
+
+async def two_stage_db(prefix_dim=4):
+    vector_db = VectorDB(client=AsyncQdrantClient(location=":memory:"), prefix_dim=prefix_dim, two_stage=True, oversampling=4)
+    await vector_db.ensure_collection("papers", vector_size=DIM)
+    return vector_db
+
+def test_prefix_vector_is_renormalized():
+    prefix = prefix_vector([3.0, 4.0, 12.0], 2)
+    assert prefix == pytest.approx([0.6, 0.8])
+
+@pytest.mark.asyncio
+@pytest.mark.filterwarnings("ignore:Payload indexes")
+async def test_ensure_collection_creates_named_vectors():
+    vector_db = await two_stage_db()
+    vectors = (await vector_db.client.get_collection("papers")).config.params.vectors
+    assert vectors[FULL_VECTOR].size == DIM
+    assert vectors[PREFIX_VECTOR].size == 4
+    assert await vector_db.vector_layout("papers") == (FULL_VECTOR, 4)
+
+@pytest.mark.asyncio
+@pytest.mark.filterwarnings("ignore:Payload indexes")
+async def test_two_stage_scores_candidates_on_full_vector():
+    vector_db = await two_stage_db()
+    vectors = unit_vectors(50)
+    await vector_db.client.upsert(collection_name="papers", points=[
+        models.PointStruct(id=i, vector={FULL_VECTOR: v, PREFIX_VECTOR: prefix_vector(v, 4)}, payload={"doc_id": f"doc{i}"})
+        for i, v in enumerate(vectors)
+    ])
+
+    results = await vector_db.search("papers", vectors[7], limit=3)
+    single = await vector_db.search("papers", vectors[7], limit=3, two_stage=False)
+
+    # The query's own point is among the prefix candidates, and its full-vector score is exact
+    assert results[0].id == 7
+    assert results[0].score == pytest.approx(1.0, abs=1e-5)
+    assert single[0].id == 7
+    assert len(results) == 3
+
+@pytest.mark.asyncio
+@pytest.mark.filterwarnings("ignore:Payload indexes")
+async def test_collection_without_prefix_searches_single_stage():
+    vector_db = VectorDB(client=AsyncQdrantClient(location=":memory:"), prefix_dim=0, two_stage=True)
+    await vector_db.ensure_collection("papers", vector_size=DIM)
+    vectors = unit_vectors(10)
+    await vector_db.client.upsert(collection_name="papers", points=[
+        models.PointStruct(id=i, vector=v, payload={"doc_id": f"doc{i}"}) for i, v in enumerate(vectors)
+    ])
+
+    assert await vector_db.vector_layout("papers") == (None, 0)
+    results = await vector_db.search("papers", vectors[2], limit=1)
+    assert results[0].id == 2
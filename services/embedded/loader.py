@@ -0,0 +1,27 @@
+import importlib
+import os
+import sys
+from typing import Dict, List
+
+SERVICES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Top-level packages the services define, api, worker and embeddings all have their own `core`
+SERVICE_PACKAGES = ("app", "core", "models")
+
+def load_service(name: str, module_names: List[str]) -> Dict[str, object]:
+    """
+    Imports modules from services/<name> and returns them by name.
+
+    The service's top-level packages are dropped from sys.modules afterwards, so the
+    next service can import its own `core`. Modules keep the references they bound
+    at import time, which is all the services use.
+    """
+    path = os.path.join(SERVICES_DIR, name)
+    sys.path.insert(0, path)
+    try:
+        return {module_name: importlib.import_module(module_name) for module_name in module_names}
+    finally:
+        sys.path.remove(path)
+        for key in list(sys.modules):
+            if key.split(".")[0] in SERVICE_PACKAGES:
+                del sys.modules[key]
@@ -0,0 +1,26 @@
+import asyncio
+import threading
+from typing import List, Optional
+
+class LocalEmbedder:
+    """
+    In-process replacement for the embeddings service. Implements the API's
+    EmbeddingClient and the worker's EmbedderProto on top of an Embedder.
+    """
+    def __init__(self, embedder):
+        self.embedder = embedder
+        # Search and ingestion share one model, encode one request at a time
+        self._lock = threading.Lock()
+
+    def _encode(self, fn, payload):
+        with self._lock:
+            return fn(payload)
+
+    async def get_embedding(self, text: str, timeout: Optional[float] = None) -> List[float]:
+        # On timeout the caller gives up, the encode itself still runs to completion in its thread
+        vector = await asyncio.wait_for(asyncio.to_thread(self._encode, self.embedder.get_embedding, text), timeout)
+        return vector.tolist()
+
+    async def get_embeddings(self, texts: List[str], timeout: Optional[float] = None) -> List[List[float]]:
+        vectors = await asyncio.wait_for(asyncio.to_thread(self._encode, self.embedder.get_embeddings, texts), timeout)
+        return vectors.tolist()
@@ -0,0 +1,128 @@
+"""
+Embedded deployment: API, worker and embedding model in a single process.
+
+Meant for single-box installs such as the Jetson. The model is called in-process
+and Qdrant runs in qdrant_client's local on-disk mode, so there are no HTTP hops
+between services and only one Python runtime is resident. Enabled with
+`deployment.mode: embedded` in config.yaml; the Docker Compose stack remains the
+default for larger deployments.
+"""
+import asyncio
+import os
+import sys
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from loader import load_service
+from local_embedder import LocalEmbedder
+
+# Config
+CONFIG_PATH = os.getenv("CONFIG_PATH", "/app/config.yaml")
+INBOX_DIR = os.getenv("INBOX_DIR", "/app/inbox")
+PROCESSED_DIR = os.getenv("PROCESSED_DIR", "/app/processed")
+DOCS_DB_PATH = os.getenv("DOCS_DB_PATH", "/app/metadata/docs.sqlite")
+API_HOST = os.getenv("API_HOST", "0.0.0.0")
+API_PORT = int(os.getenv("API_PORT", "8000"))
+
+class LoopPipelineRunner:
+    """
+    Hands watcher events to the server's event loop. The local Qdrant client is
+    not thread-safe, so ingestion and search must share one loop.
+    """
+    def __init__(self, pipeline, loop: asyncio.AbstractEventLoop):
+        self.pipeline = pipeline
+        self.loop = loop
+
+    def on_pdf_created(self, file_path: str):
+        # Blocks the watcher thread, files are processed one at a time like in the worker service
+        future = asyncio.run_coroutine_threadsafe(self.pipeline.process_file(file_path), self.loop)
+        future.result()
+
+def load_config() -> dict:
+    try:
+        with open(CONFIG_PATH, "r") as f:
+            return yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        print("Config file not found, using defaults.")
+        return {}
+
+async def serve(config: dict):
+    import uvicorn
+    from qdrant_client import AsyncQdrantClient
+    from watchdog.observers import Observer
+
+    deployment = config.get("deployment", {})
+    chunking = config.get("chunking", {})
+    embeddings_config = config.get("embeddings", {})
+    retrieval = config.get("retrieval", {})
+
+    # Each service has its own `core` package, so they are imported one at a time
+    embeddings = load_service("embeddings", ["core.embeddings"])
+    worker = load_service("worker", [
+        "core.pipeline", "core.pdf_parser", "core.chunker", "core.store", "core.doc_store", "core.file_watcher", "core.parsed_cache", "core.throttle",
+    ])
+    api = load_service("api", ["app.main", "core.vector_db"])
+
+    # Shared in-process clients
+    embedder = LocalEmbedder(embeddings["core.embeddings"].Embedder(
+        model_name=embeddings_config.get("model_name", "all-MiniLM-L6-v2"),
+        memory_budget_mb=embeddings_config.get("memory_budget_mb", 256),
+        max_batch_size=embeddings_config.get("max_batch_size", 64)
+    ))
+    qdrant_path = deployment.get("qdrant_path", "/app/qdrant_local")
+    os.makedirs(qdrant_path, exist_ok=True)
+    qdrant = AsyncQdrantClient(path=qdrant_path)
+
+    # API, picked up by its lifespan instead of the HTTP clients
+    api_main = api["app.main"]
+    api_main.resources["embedder"] = embedder
+    api_main.resources["vector_db"] = api["core.vector_db"].VectorDB(
+        client=qdrant,
+        prefix_dim=retrieval.get("prefix_dim", 128),
+        two_stage=retrieval.get("two_stage", False),
+        oversampling=retrieval.get("oversampling", 4)
+    )
+
+    # Worker
+    for directory in (INBOX_DIR, PROCESSED_DIR):
+        os.makedirs(directory, exist_ok=True)
+    pipeline = worker["core.pipeline"].WorkerPipeline(
+        worker["core.pdf_parser"].PDFParser(),
+        embedder,
+        worker["core.store"].QdrantStore(client=qdrant),
+        worker["core.chunker"].RecursiveCharacterTextSplitter(
+            chunk_size=chunking.get("chunk_size", 1000),
+            chunk_overlap=chunking.get("chunk_overlap", 200)
+        ),
+        processed_dir=PROCESSED_DIR,
+        doc_store=worker["core.doc_store"].DocumentStore(DOCS_DB_PATH),
+        parsed_cache=worker["core.parsed_cache"].ParsedTextCache(PROCESSED_DIR),
+        # Embeddings run in-process here, so only temperature and load drive it
+        throttle=worker["core.throttle"].throttle_from_config(config.get("throttle", {}))
+    )
+    runner = LoopPipelineRunner(pipeline, asyncio.get_running_loop())
+    observer = Observer()
+    observer.schedule(worker["core.file_watcher"].PDFEventHandler(runner), INBOX_DIR, recursive=False)
+    observer.start()
+    print(f"Watching for PDFs in {INBOX_DIR}...")
+
+    server = uvicorn.Server(uvicorn.Config(api_main.app, host=API_HOST, port=API_PORT))
+    try:
+        await server.serve()
+    finally:
+        observer.stop()
+        observer.join()
+        await qdrant.close()
+
+def main():
+    config = load_config()
+    mode = config.get("deployment", {}).get("mode", "distributed")
+    if mode != "embedded":
+        print(f"deployment.mode is '{mode}', set it to 'embedded' in {CONFIG_PATH} to run the single-process deployment.")
+        sys.exit(1)
+
+    print("Starting embedded deployment (api + worker + embeddings in one process)...")
+    asyncio.run(serve(config))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import os
+import sys
+import pytest
+
+# Add the parent directory to sys.path to allow importing the loader
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from loader import load_service, SERVICES_DIR, SERVICE_PACKAGES
+
+# Modules added late in each service, they must still load side by side. The embeddings
+# model itself (core.embeddings) needs torch, its pool and metrics do not.
+LATE_MODULES = {
+    "worker": ["core.throttle", "core.dedup", "core.instrumentation"],
+    "api": ["core.admission", "core.instrumentation"],
+    "embeddings": ["core.worker_pool", "core.instrumentation"],
+}
+
+@pytest.fixture(scope="module")
+def services():
+    # Loaded once, importing a service's metrics twice in one process would register them twice
+    path_before = list(sys.path)
+    loaded = {name: load_service(name, modules) for name, modules in LATE_MODULES.items()}
+    assert sys.path == path_before
+    return loaded
+
+def test_each_service_loads_its_own_modules(services):
+    for name, modules in services.items():
+        for module_name, module in modules.items():
+            assert module.__file__.startswith(os.path.join(SERVICES_DIR, name, "")), module_name
+
+    assert services["worker"]["core.throttle"].AdaptiveThrottle
+    assert services["worker"]["core.dedup"].NearDuplicateIndex
+    assert services["api"]["core.admission"].AdmissionController
+    assert services["embeddings"]["core.worker_pool"].EmbeddingWorkerPool
+
+def test_shared_package_names_do_not_leak_between_services(services):
+    instrumentation = [modules["core.instrumentation"] for modules in services.values()]
+    assert len({id(module) for module in instrumentation}) == 3
+    # Each copy carries the same trace helpers but its own service's metrics
+    assert all(module.TRACE_HEADER == "X-Trace-Id" for module in instrumentation)
+    assert hasattr(services["worker"]["core.instrumentation"], "THROTTLE_CONCURRENCY")
+    assert hasattr(services["embeddings"]["core.instrumentation"], "IN_FLIGHT")
+    assert not any(key.split(".")[0] in SERVICE_PACKAGES for key in sys.modules)
+    # A late module still sees its own service's siblings, bound at import time
+    assert services["worker"]["core.throttle"].THROTTLE_CONCURRENCY is services["worker"]["core.instrumentation"].THROTTLE_CONCURRENCY
@@ -0,0 +1,42 @@
+from typing import List
+
+# Rough count of float32 activations kept per token per hidden unit during a forward pass
+# (q/k/v, attention output, the 4x feed-forward expansion, residuals and layer norms)
+ACTIVATION_MULTIPLIER = 16
+BYTES_PER_FLOAT = 4
+
+def sequence_memory_bytes(seq_len: int, hidden_size: int, num_heads: int) -> int:
+    """
+    Estimated peak memory of one padded sequence in a transformer layer.
+    Linear in the sequence length for the activations, quadratic for the attention scores.
+    """
+    activations = seq_len * hidden_size * ACTIVATION_MULTIPLIER * BYTES_PER_FLOAT
+    attention = num_heads * seq_len * seq_len * BYTES_PER_FLOAT
+    return activations + attention
+
+def max_batch_size_for(seq_len: int, memory_budget_bytes: int, hidden_size: int, num_heads: int, max_batch_size: int) -> int:
+    """Largest batch of `seq_len`-token sequences that fits the budget, at least 1."""
+    per_sequence = sequence_memory_bytes(seq_len, hidden_size, num_heads)
+    return max(1, min(max_batch_size, memory_budget_bytes // per_sequence))
+
+def plan_batches(lengths: List[int], memory_budget_bytes: int, hidden_size: int, num_heads: int, max_batch_size: int) -> List[List[int]]:
+    """
+    Groups input indices into sub-batches of similar token length.
+
+    Inputs are sorted by length, so each batch pads to a length close to its own
+    members instead of the longest input of the request, and each batch is sized
+    from the memory budget for its longest member. Returns lists of original indices.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches = []
+    current = []
+    for index in order:
+        # Sorted ascending, so the newest member is the longest and sets the padded length
+        limit = max_batch_size_for(max(1, lengths[index]), memory_budget_bytes, hidden_size, num_heads, max_batch_size)
+        if current and len(current) + 1 > limit:
+            batches.append(current)
+            current = []
+        current.append(index)
+    if current:
+        batches.append(current)
+    return batches
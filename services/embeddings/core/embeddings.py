@@ -1,15 +1,43 @@
 from sentence_transformers import SentenceTransformer
+import numpy as np
 import torch
+from core.batching import plan_batches
 
 class Embedder:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", memory_budget_mb: int = 256, max_batch_size: int = 64):
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         print(f"Loading model {model_name} on {self.device}...")
         self.model = SentenceTransformer(model_name, device=self.device)
         print("Model loaded successfully.")
-    
-    def get_embedding(self, text: str):
-        return self.model.encode(text).tolist()
 
-    def get_embeddings(self, texts: list[str]):
-        return self.model.encode(texts).tolist()
+        self.memory_budget_bytes = memory_budget_mb * 1024 * 1024
+        self.max_batch_size = max_batch_size
+        self.dimension = self.model.get_sentence_embedding_dimension()
+        config = getattr(getattr(self.model[0], "auto_model", None), "config", None)
+        self.hidden_size = getattr(config, "hidden_size", self.dimension)
+        self.num_heads = getattr(config, "num_attention_heads", 12)
+
+    def get_embedding(self, text: str) -> np.ndarray:
+        return self.model.encode(text, convert_to_numpy=True).astype(np.float32, copy=False)
+
+    def get_embeddings(self, texts: list[str]) -> np.ndarray:
+        """
+        Encodes `texts` in length-bucketed sub-batches sized from the memory budget.
+        Returns a float32 matrix in the original input order.
+        """
+        output = np.empty((len(texts), self.dimension), dtype=np.float32)
+        if not texts:
+            return output
+
+        for batch in plan_batches(self._token_lengths(texts), self.memory_budget_bytes, self.hidden_size, self.num_heads, self.max_batch_size):
+            vectors = self.model.encode([texts[i] for i in batch], batch_size=len(batch), convert_to_numpy=True)
+            output[batch] = vectors
+        return output
+
+    def _token_lengths(self, texts: list[str]) -> list[int]:
+        tokenizer = getattr(self.model, "tokenizer", None)
+        if tokenizer is None:
+            # Roughly four characters per token for English text
+            return [len(text) // 4 + 2 for text in texts]
+        encoded = tokenizer(texts, add_special_tokens=True, truncation=True, max_length=self.model.max_seq_length)
+        return [len(ids) for ids in encoded["input_ids"]]
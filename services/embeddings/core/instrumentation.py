@@ -0,0 +1,45 @@
+import contextvars
+import uuid
+from prometheus_client import Gauge, Histogram
+
+# --- Tracing ---
+# Each service is its own Docker build context, so this block is copied verbatim into
+# api, embeddings and worker core/instrumentation.py. Keep the three copies identical.
+
+# Header carrying the trace ID between services
+TRACE_HEADER = "X-Trace-Id"
+
+# Trace ID of the request or document being handled, picked up by outgoing HTTP calls
+current_trace_id = contextvars.ContextVar("current_trace_id", default=None)
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+def trace_headers() -> dict:
+    trace_id = current_trace_id.get()
+    return {TRACE_HEADER: trace_id} if trace_id else {}
+
+# --- Metrics ---
+
+ENCODE_SECONDS = Histogram(
+    "embeddings_encode_seconds",
+    "Time spent in model.encode per /embed request",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+BATCH_SIZE = Histogram(
+    "embeddings_batch_size",
+    "Number of texts per /embed request",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024),
+)
+
+QUEUE_DEPTH = Gauge(
+    "embeddings_queue_depth",
+    "/embed requests currently waiting or encoding",
+)
+
+IN_FLIGHT = Gauge(
+    "embeddings_in_flight",
+    "/embed requests currently waiting or encoding, by priority (interactive for search, bulk for ingestion)",
+    ["priority"],
+)
@@ -0,0 +1,197 @@
+import asyncio
+import concurrent.futures
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+from typing import Any, Dict, List
+
+def available_cores() -> int:
+    # Respects CPU pinning and container cpusets where the platform exposes them
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def default_pool_size(cores: int = None) -> Dict[str, int]:
+    """Two intra-op threads per worker, as many workers as that allows."""
+    cores = cores or available_cores()
+    workers = max(1, cores // 2)
+    return {"workers": workers, "threads_per_worker": max(1, cores // workers)}
+
+# Lower runs first on the in-process encoding thread
+INTERACTIVE = 0
+BULK = 1
+
+def _worker_main(embedder, conn, threads: int):
+    """
+    Model worker loop. The embedder was built in the parent before fork, so the
+    weights are shared copy-on-write instead of being loaded again per worker.
+    """
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        request_id, method, payload = message
+        try:
+            conn.send((request_id, getattr(embedder, method)(payload), None))
+        except Exception as e:
+            conn.send((request_id, None, f"{type(e).__name__}: {e}"))
+
+class _Worker:
+    def __init__(self, index: int):
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.in_flight: Dict[int, asyncio.Future] = {}
+        self.send_lock = threading.Lock()
+
+class EmbeddingWorkerPool:
+    """
+    Supervised pool of forked model worker processes behind one endpoint.
+
+    Requests go to the worker with the fewest requests in flight. A reader thread
+    per worker resolves results on the event loop, and restarts the worker if its
+    process dies, failing only the requests that were running on it.
+    """
+    def __init__(self, embedder, num_workers: int, threads_per_worker: int = 1):
+        self.embedder = embedder
+        self.num_workers = num_workers
+        self.threads_per_worker = threads_per_worker
+        self._context = multiprocessing.get_context("fork")
+        self._workers: List[_Worker] = []
+        self._request_ids = itertools.count()
+        self._closing = False
+        self._loop = None
+
+    def start(self, loop: asyncio.AbstractEventLoop = None):
+        self._loop = loop or asyncio.get_event_loop()
+        for index in range(self.num_workers):
+            worker = _Worker(index)
+            self._workers.append(worker)
+            self._spawn(worker)
+        print(f"Started {self.num_workers} embedding workers with {self.threads_per_worker} threads each.")
+
+    def _spawn(self, worker: _Worker):
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(self.embedder, child_conn, self.threads_per_worker),
+            name=f"embedding-worker-{worker.index}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        worker.process = process
+        worker.conn = parent_conn
+        threading.Thread(target=self._read_results, args=(worker, parent_conn), daemon=True).start()
+
+    def _read_results(self, worker: _Worker, conn):
+        while True:
+            try:
+                request_id, result, error = conn.recv()
+            except (EOFError, OSError):
+                break
+            future = worker.in_flight.pop(request_id, None)
+            if future is not None:
+                self._loop.call_soon_threadsafe(self._resolve, future, result, error)
+
+        # The process exited or the pipe broke
+        if self._closing:
+            return
+        print(f"Embedding worker {worker.index} died (exit code {worker.process.exitcode}), restarting.")
+        pending, worker.in_flight = worker.in_flight, {}
+        for future in pending.values():
+            self._loop.call_soon_threadsafe(self._resolve, future, None, "embedding worker died")
+        worker.process.join(timeout=1)
+        conn.close()
+        self._spawn(worker)
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, result: Any, error: str):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(RuntimeError(error))
+        else:
+            future.set_result(result)
+
+    def queue_depths(self) -> List[int]:
+        return [len(worker.in_flight) for worker in self._workers]
+
+    async def submit(self, method: str, payload: Any) -> Any:
+        """Runs `embedder.<method>(payload)` on the least-loaded worker."""
+        worker = min(self._workers, key=lambda w: len(w.in_flight))
+        request_id = next(self._request_ids)
+        future = self._loop.create_future()
+        worker.in_flight[request_id] = future
+        try:
+            with worker.send_lock:
+                worker.conn.send((request_id, method, payload))
+        except (BrokenPipeError, OSError):
+            # The worker died between dispatch and send, the supervisor is restarting it
+            worker.in_flight.pop(request_id, None)
+            raise RuntimeError("embedding worker died")
+        return await future
+
+    def close(self, timeout: float = 5.0):
+        self._closing = True
+        for worker in self._workers:
+            try:
+                worker.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for worker in self._workers:
+            worker.process.join(timeout=timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.conn.close()
+
+class PriorityExecutor:
+    """
+    Single encoding thread for deployments without a worker pool (GPU, or one worker).
+
+    A ThreadPoolExecutor runs its queue in arrival order, so a search would wait behind
+    every ingestion batch queued before it. Here queued interactive requests go first,
+    a search only waits for the batch already encoding.
+    """
+    def __init__(self, thread_name: str = "encode"):
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._thread = threading.Thread(target=self._run, name=thread_name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            _, _, job = self._queue.get()
+            if job is None:
+                return
+            future, fn, args = job
+            # Skips requests whose caller gave up while they were queued
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = fn(*args)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def submit(self, fn, *args, priority: int = BULK) -> concurrent.futures.Future:
+        future = concurrent.futures.Future()
+        # The counter keeps arrival order within a priority and is never equal, so jobs are not compared
+        self._queue.put((priority, next(self._order), (future, fn, args)))
+        return future
+
+    def shutdown(self):
+        # Runs after everything already queued
+        self._queue.put((float("inf"), next(self._order), None))
@@ -1,8 +1,29 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from pydantic import BaseModel
 from typing import List, Union
 from core.embeddings import Embedder
+from core.worker_pool import EmbeddingWorkerPool, PriorityExecutor, default_pool_size, INTERACTIVE, BULK
+from core.instrumentation import TRACE_HEADER, ENCODE_SECONDS, BATCH_SIZE, QUEUE_DEPTH, IN_FLIGHT, current_trace_id, new_trace_id
 from contextlib import asynccontextmanager
+from prometheus_client import make_asgi_app
+import asyncio
+import logging
+import orjson
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Config
+MEMORY_BUDGET_MB = int(os.getenv("EMBED_MEMORY_BUDGET_MB", "256"))
+MAX_BATCH_SIZE = int(os.getenv("EMBED_MAX_BATCH_SIZE", "64"))
+# Model worker processes and torch threads per worker, sized from the available cores by default
+POOL_SIZE = default_pool_size()
+NUM_WORKERS = int(os.getenv("EMBED_WORKERS", str(POOL_SIZE["workers"])))
+THREADS_PER_WORKER = int(os.getenv("EMBED_THREADS_PER_WORKER", str(POOL_SIZE["threads_per_worker"])))
+# Requests without the interactive priority (ingestion) share this many slots, leaving a worker free for search
+BULK_CONCURRENCY = int(os.getenv("EMBED_BULK_CONCURRENCY", str(max(1, NUM_WORKERS - 1))))
+PRIORITY_HEADER = "X-Priority"
 
 # --- Models ---
 class EmbedRequest(BaseModel):
@@ -16,12 +37,48 @@ models = {}
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Load model on startup
-    models["embedder"] = Embedder()
+    # Load model on startup, before forking so the workers share its weights
+    embedder = Embedder(memory_budget_mb=MEMORY_BUDGET_MB, max_batch_size=MAX_BATCH_SIZE)
+    models["embedder"] = embedder
+    models["bulk_slots"] = asyncio.Semaphore(BULK_CONCURRENCY)
+    # A CUDA context does not survive fork, GPU deployments keep encoding in-process
+    if NUM_WORKERS > 1 and embedder.device == "cpu":
+        pool = EmbeddingWorkerPool(embedder, NUM_WORKERS, THREADS_PER_WORKER)
+        pool.start()
+        models["pool"] = pool
+    else:
+        # One encoding thread keeps the model single-threaded like before, while the event
+        # loop stays free to accept requests, so queued ones show up in the queue metrics.
+        # Searches queued there go ahead of ingestion batches
+        models["executor"] = PriorityExecutor(thread_name="encode")
     yield
+    if "pool" in models:
+        models["pool"].close()
+    if "executor" in models:
+        models["executor"].shutdown()
     models.clear()
 
 app = FastAPI(lifespan=lifespan)
+app.mount("/metrics", make_asgi_app())
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    # Reuse the caller's trace ID so one document can be followed from the worker through /embed
+    trace_id = request.headers.get(TRACE_HEADER) or new_trace_id()
+    current_trace_id.set(trace_id)
+    response = await call_next(request)
+    response.headers[TRACE_HEADER] = trace_id
+    return response
+
+async def encode(embedder, text, priority: int = BULK):
+    started = time.perf_counter()
+    method = "get_embedding" if isinstance(text, str) else "get_embeddings"
+    pool = models.get("pool")
+    if pool:
+        vector = await pool.submit(method, text)
+    else:
+        vector = await asyncio.wrap_future(models["executor"].submit(getattr(embedder, method), text, priority=priority))
+    return vector, time.perf_counter() - started
 
 # --- Endpoints ---
 @app.get("/")
@@ -29,14 +86,22 @@ def read_root():
     return {"status": "ok", "service": "embeddings"}
 
 @app.post("/embed", response_model=EmbedResponse)
-async def embed(request: EmbedRequest):
+async def embed(request: EmbedRequest, http_request: Request):
     embedder = models.get("embedder")
     if not embedder:
         raise HTTPException(status_code=503, detail="Model not loaded")
     
-    if isinstance(request.text, str):
-        vector = embedder.get_embedding(request.text)
-        return EmbedResponse(vector=vector)
-    else:
-        vectors = embedder.get_embeddings(request.text)
-        return EmbedResponse(vector=vectors)
+    batch_size = 1 if isinstance(request.text, str) else len(request.text)
+    BATCH_SIZE.observe(batch_size)
+    priority = "interactive" if http_request.headers.get(PRIORITY_HEADER) == "interactive" else "bulk"
+    # Counted from arrival, so requests waiting for a slot or the encoding thread are included
+    with QUEUE_DEPTH.track_inprogress(), IN_FLIGHT.labels(priority=priority).track_inprogress():
+        if priority == "interactive":
+            vector, elapsed = await encode(embedder, request.text, INTERACTIVE)
+        else:
+            async with models["bulk_slots"]:
+                vector, elapsed = await encode(embedder, request.text, BULK)
+    ENCODE_SECONDS.observe(elapsed)
+    logger.debug(f"[trace {current_trace_id.get()}] encoded {batch_size} texts in {elapsed:.3f}s")
+    # float32 arrays are serialized by orjson directly, without building Python lists first
+    return Response(content=orjson.dumps({"vector": vector}, option=orjson.OPT_SERIALIZE_NUMPY), media_type="application/json")
@@ -0,0 +1,28 @@
+from core.batching import plan_batches, max_batch_size_for, sequence_memory_bytes
+
+HIDDEN = 384
+HEADS = 12
+
+def test_batches_cover_every_input_once():
+    lengths = [5, 300, 12, 7, 512, 40, 9, 128]
+    batches = plan_batches(lengths, 64 * 1024 * 1024, HIDDEN, HEADS, max_batch_size=3)
+    flat = [i for batch in batches for i in batch]
+    assert sorted(flat) == list(range(len(lengths)))
+    assert all(len(batch) <= 3 for batch in batches)
+
+def test_batches_are_length_sorted():
+    lengths = [500, 3, 250, 4, 499, 2]
+    batches = plan_batches(lengths, 1024 ** 3, HIDDEN, HEADS, max_batch_size=2)
+    # Short inputs share a batch instead of being padded to the longest one
+    assert batches == [[5, 1], [3, 2], [4, 0]]
+
+def test_long_sequences_get_smaller_batches():
+    budget = 64 * 1024 * 1024
+    short = max_batch_size_for(16, budget, HIDDEN, HEADS, max_batch_size=1024)
+    long = max_batch_size_for(512, budget, HIDDEN, HEADS, max_batch_size=1024)
+    assert short > long >= 1
+    assert long * sequence_memory_bytes(512, HIDDEN, HEADS) <= budget
+
+def test_budget_too_small_still_makes_progress():
+    batches = plan_batches([512, 512], 1, HIDDEN, HEADS, max_batch_size=64)
+    assert batches == [[0], [1]]
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+# The real module imports the model stack at the top, only encode and the tokenizer are faked
+pytest.importorskip("torch")
+pytest.importorskip("sentence_transformers")
+from core.embeddings import Embedder
+
+DIM = 4
+
+class FakeTokenizer:
+    def __call__(self, texts, add_special_tokens=True, truncation=True, max_length=None):
+        return {"input_ids": [[0] * len(text.split()) for text in texts]}
+
+class FakeModel:
+    max_seq_length = 512
+    tokenizer = FakeTokenizer()
+
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts, batch_size=None, convert_to_numpy=True):
+        self.batches.append(list(texts))
+        # Each row encodes its own text's length, so a misplaced row is visible
+        return np.array([[float(len(text.split()))] * DIM for text in texts], dtype=np.float32)
+
+def make_embedder(max_batch_size):
+    embedder = Embedder.__new__(Embedder)
+    embedder.model = FakeModel()
+    embedder.dimension = DIM
+    embedder.hidden_size = 384
+    embedder.num_heads = 12
+    embedder.memory_budget_bytes = 256 * 1024 * 1024
+    embedder.max_batch_size = max_batch_size
+    return embedder
+
+def test_get_embeddings_returns_rows_in_input_order():
+    embedder = make_embedder(max_batch_size=2)
+    texts = [" ".join(["word"] * n) for n in (50, 3, 400, 7, 120, 1, 9)]
+
+    vectors = embedder.get_embeddings(texts)
+
+    # Encoded out of order in length buckets, returned in the caller's order
+    assert len(embedder.model.batches) > 1
+    assert [text for batch in embedder.model.batches for text in batch] != texts
+    assert vectors.dtype == np.float32
+    assert vectors[:, 0].tolist() == [50.0, 3.0, 400.0, 7.0, 120.0, 1.0, 9.0]
+
+def test_get_embeddings_of_nothing_is_an_empty_matrix():
+    assert make_embedder(max_batch_size=2).get_embeddings([]).shape == (0, DIM)
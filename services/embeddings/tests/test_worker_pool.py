@@ -0,0 +1,103 @@
+import asyncio
+import os
+import threading
+import time
+import pytest
+from core.worker_pool import EmbeddingWorkerPool, PriorityExecutor, default_pool_size, INTERACTIVE, BULK
+
+class FakeEmbedder:
+    def get_embedding(self, text):
+        # Long enough that a request is still in flight when the next one is dispatched
+        time.sleep(0.01)
+        return [float(len(text)), float(os.getpid())]
+
+    def get_embeddings(self, texts):
+        return [self.get_embedding(text) for text in texts]
+
+    def crash(self, _):
+        os._exit(1)
+
+def run(coroutine_fn):
+    async def wrapper():
+        pool = EmbeddingWorkerPool(FakeEmbedder(), num_workers=2)
+        pool.start(asyncio.get_running_loop())
+        try:
+            return await coroutine_fn(pool)
+        finally:
+            pool.close()
+    return asyncio.run(wrapper())
+
+def test_default_pool_size():
+    assert default_pool_size(8) == {"workers": 4, "threads_per_worker": 2}
+    assert default_pool_size(1) == {"workers": 1, "threads_per_worker": 1}
+
+def test_requests_are_spread_across_workers():
+    async def scenario(pool):
+        return await asyncio.gather(*(pool.submit("get_embedding", "x" * i) for i in range(20)))
+
+    results = run(scenario)
+    assert [vector[0] for vector in results] == [float(i) for i in range(20)]
+    # Least-loaded dispatch alternates while requests are in flight
+    assert len({vector[1] for vector in results}) == 2
+
+def test_worker_errors_are_raised_to_the_caller():
+    async def scenario(pool):
+        with pytest.raises(RuntimeError, match="AttributeError"):
+            await pool.submit("missing_method", "text")
+        return await pool.submit("get_embeddings", ["a", "bb"])
+
+    assert [vector[0] for vector in run(scenario)] == [1.0, 2.0]
+
+def test_dead_worker_is_restarted():
+    async def scenario(pool):
+        with pytest.raises(RuntimeError, match="died"):
+            await pool.submit("crash", None)
+        # Give the supervisor a moment to fork the replacement
+        await asyncio.sleep(0.2)
+        return await asyncio.gather(*(pool.submit("get_embedding", "abc") for _ in range(4)))
+
+    results = run(scenario)
+    assert all(vector[0] == 3.0 for vector in results)
+
+def test_priority_executor_runs_queued_interactive_requests_first():
+    executor = PriorityExecutor()
+    started = threading.Event()
+    release = threading.Event()
+    order = []
+
+    def encode(name):
+        if name == "running":
+            started.set()
+            release.wait(5)
+        order.append(name)
+        return name
+
+    try:
+        running = executor.submit(encode, "running", priority=BULK)
+        started.wait(5)
+        # Queued while the thread is busy: two ingestion batches, then a search
+        futures = [executor.submit(encode, name, priority=priority)
+                   for name, priority in (("bulk-1", BULK), ("bulk-2", BULK), ("search", INTERACTIVE))]
+        release.set()
+        assert [future.result(5) for future in futures] == ["bulk-1", "bulk-2", "search"]
+        assert running.result(5) == "running"
+    finally:
+        executor.shutdown()
+
+    assert order == ["running", "search", "bulk-1", "bulk-2"]
+
+def test_priority_executor_skips_cancelled_and_raises_errors():
+    executor = PriorityExecutor()
+    release = threading.Event()
+    calls = []
+    try:
+        executor.submit(release.wait, 5)
+        cancelled = executor.submit(calls.append, "cancelled")
+        assert cancelled.cancel()
+        failing = executor.submit(int, "not a number")
+        release.set()
+        with pytest.raises(ValueError):
+            failing.result(5)
+    finally:
+        executor.shutdown()
+    assert calls == []
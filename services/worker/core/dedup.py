@@ -0,0 +1,134 @@
+import hashlib
+import os
+import re
+import sqlite3
+import zlib
+from typing import Optional, Set, Tuple
+import numpy as np
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS minhash_signatures (
+    doc_id TEXT PRIMARY KEY,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS minhash_buckets (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    doc_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS minhash_buckets_lookup ON minhash_buckets (band, bucket);
+"""
+
+# Mersenne prime for the universal hash family, larger than any 32-bit shingle hash
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# Shingles permuted at a time, bounds the num_perm x block uint64 temporaries (8 MB at 128 permutations)
+SIGNATURE_BLOCK = 8192
+_WORD = re.compile(r"\w+")
+
+# Near-duplicate actions: drop the file, or record it in the docs table as a version of the match
+SKIP = "skip"
+LINK = "link"
+
+def shingles(text: str, size: int = 5) -> Set[int]:
+    """
+    Hashed word shingles of the normalized text. Case, punctuation and layout
+    whitespace are dropped, so two extractions of the same paper compare equal.
+    """
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return {zlib.crc32(" ".join(words).encode())} if words else set()
+    return {zlib.crc32(" ".join(words[i:i + size]).encode()) for i in range(len(words) - size + 1)}
+
+def lsh_params(threshold: float, num_perm: int, false_negative_weight: float = 0.9) -> Tuple[int, int]:
+    """
+    Bands and rows per band. Two documents with Jaccard similarity s share a bucket
+    with probability 1 - (1 - s^rows)^bands. Picks the split with the least weighted
+    area of false positives below the threshold and false negatives above it. Misses
+    cost a full embedding while extra candidates only cost a signature comparison,
+    so false negatives weigh more.
+    """
+    steps = [i / 100 for i in range(101)]
+
+    def error(bands: int, rows: int) -> float:
+        collide = [1 - (1 - s ** rows) ** bands for s in steps]
+        false_positives = sum(p for s, p in zip(steps, collide) if s < threshold)
+        false_negatives = sum(1 - p for s, p in zip(steps, collide) if s >= threshold)
+        return (1 - false_negative_weight) * false_positives + false_negative_weight * false_negatives
+
+    candidates = [(num_perm // rows, rows) for rows in range(1, num_perm + 1) if num_perm % rows == 0]
+    return min(candidates, key=lambda br: error(*br))
+
+class NearDuplicateIndex:
+    """
+    MinHash signatures with an LSH band index in SQLite, to find documents whose
+    text is nearly the same as one already ingested (arXiv v1/v2, preprint and
+    published versions). Candidates from the band buckets are confirmed on their
+    estimated Jaccard similarity, so only matches above `threshold` are reported.
+    """
+    def __init__(self, db_path: str, threshold: float = 0.8, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+
+        # Fixed seed, signatures stored in the index must stay comparable across restarts
+        rng = np.random.default_rng(seed)
+        # Coefficients below 2^32 keep a * x + b within uint64 for 32-bit shingle hashes
+        self._a = rng.integers(1, _MAX_HASH, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MAX_HASH, size=num_perm, dtype=np.uint64)
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = np.fromiter(shingles(text, self.shingle_size), dtype=np.uint64)
+        if hashes.size == 0:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        # (a * x + b) mod p for every permutation and shingle, min over shingles one block at a time
+        minimum = np.full(self.num_perm, np.iinfo(np.uint64).max, dtype=np.uint64)
+        for start in range(0, hashes.size, SIGNATURE_BLOCK):
+            block = hashes[start:start + SIGNATURE_BLOCK]
+            permuted = (self._a[:, None] * block[None, :] + self._b[:, None]) % np.uint64(_PRIME)
+            np.minimum(minimum, permuted.min(axis=1), out=minimum)
+        return (minimum & np.uint64(_MAX_HASH)).astype(np.uint32)
+
+    def _buckets(self, signature: np.ndarray):
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            yield band, int.from_bytes(hashlib.blake2b(rows, digest_size=7).digest(), "little")
+
+    def find(self, signature: np.ndarray, exclude: str = None) -> Optional[Tuple[str, float]]:
+        """
+        Best match above the threshold as (doc_id, estimated similarity), or None.
+        `exclude` skips the document itself when a file is re-ingested.
+        """
+        candidates = set()
+        for band, bucket in self._buckets(signature):
+            rows = self.conn.execute("SELECT doc_id FROM minhash_buckets WHERE band = ? AND bucket = ?", (band, bucket))
+            candidates.update(doc_id for (doc_id,) in rows)
+        candidates.discard(exclude)
+
+        best = None
+        for doc_id in candidates:
+            row = self.conn.execute("SELECT signature FROM minhash_signatures WHERE doc_id = ?", (doc_id,)).fetchone()
+            similarity = float(np.mean(np.frombuffer(row[0], dtype=np.uint32) == signature))
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (doc_id, similarity)
+        return best
+
+    def add(self, doc_id: str, signature: np.ndarray) -> None:
+        with self.conn:
+            self.conn.execute("DELETE FROM minhash_buckets WHERE doc_id = ?", (doc_id,))
+            self.conn.execute("INSERT OR REPLACE INTO minhash_signatures (doc_id, signature) VALUES (?, ?)", (doc_id, signature.tobytes()))
+            self.conn.executemany(
+                "INSERT INTO minhash_buckets (band, bucket, doc_id) VALUES (?, ?, ?)",
+                ((band, bucket, doc_id) for band, bucket in self._buckets(signature)),
+            )
+
+    def close(self):
+        self.conn.close()
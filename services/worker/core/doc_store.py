@@ -0,0 +1,115 @@
+import json
+import os
+import re
+import sqlite3
+import time
+from typing import Any, Dict, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    doc_id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    authors TEXT NOT NULL,
+    year INTEGER,
+    tags TEXT NOT NULL,
+    filename TEXT,
+    source_path TEXT,
+    total_chunks INTEGER NOT NULL DEFAULT 0,
+    metadata TEXT NOT NULL,
+    ingested_at REAL NOT NULL,
+    version_of TEXT
+)
+"""
+
+# Columns added after the first release, created on older databases at startup
+MIGRATIONS = {
+    "version_of": "ALTER TABLE docs ADD COLUMN version_of TEXT",
+}
+
+# Document-level fields that are also copied onto every chunk, because Qdrant can only filter on point payloads
+FILTER_FIELDS = ("year", "authors", "tags")
+
+_PDF_DATE_YEAR = re.compile(r"^(?:D:)?(\d{4})")
+
+def document_record_from_parsed(parsed_data: Dict[str, Any], source_path: str = None, total_chunks: int = 0) -> Dict[str, Any]:
+    """
+    Builds the doc-level record for the docs table from the parser output.
+    Title, authors and year are best effort from the PDF info dictionary.
+    """
+    pdf_meta = parsed_data.get("metadata") or {}
+
+    author = pdf_meta.get("Author")
+    authors = [author] if author else []
+
+    year = None
+    match = _PDF_DATE_YEAR.match(pdf_meta.get("CreationDate", ""))
+    if match:
+        year = int(match.group(1))
+
+    return {
+        "doc_id": parsed_data["doc_id"],
+        "title": pdf_meta.get("Title") or parsed_data.get("filename") or "Unknown",
+        "authors": authors,
+        "year": year,
+        "tags": [],
+        "filename": parsed_data.get("filename"),
+        "source_path": source_path,
+        "total_chunks": total_chunks,
+        "metadata": pdf_meta,
+        "version_of": None,
+    }
+
+class DocumentStore:
+    """
+    SQLite table holding doc-level metadata keyed by doc_id.
+    Chunk payloads in Qdrant only reference the doc_id, the API joins against this table.
+    """
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self.conn:
+            self.conn.execute(SCHEMA)
+            columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(docs)")}
+            for column, statement in MIGRATIONS.items():
+                if column not in columns:
+                    self.conn.execute(statement)
+
+    def upsert_document(self, record: Dict[str, Any]) -> None:
+        """Inserts or replaces the doc-level record."""
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT OR REPLACE INTO docs
+                    (doc_id, title, authors, year, tags, filename, source_path, total_chunks, metadata, ingested_at, version_of)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    record["doc_id"],
+                    record["title"],
+                    json.dumps(record.get("authors", [])),
+                    record.get("year"),
+                    json.dumps(record.get("tags", [])),
+                    record.get("filename"),
+                    record.get("source_path"),
+                    record.get("total_chunks", 0),
+                    json.dumps(record.get("metadata", {})),
+                    time.time(),
+                    record.get("version_of"),
+                ),
+            )
+
+    def get_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute("SELECT * FROM docs WHERE doc_id = ?", (doc_id,)).fetchone()
+        if row is None:
+            return None
+        record = dict(row)
+        for key in ("authors", "tags", "metadata"):
+            record[key] = json.loads(record[key])
+        return record
+
+    def close(self):
+        self.conn.close()
@@ -1,5 +1,6 @@
 import httpx
 from typing import List
+from core.instrumentation import trace_headers
 
 class RemoteEmbedder:
     def __init__(self, base_url: str):
@@ -12,8 +13,22 @@ class RemoteEmbedder:
         async with httpx.AsyncClient() as client:
             response = await client.post(
                 f"{self.base_url}/embed",
-                json={"text": text}
+                json={"text": text},
+                headers=trace_headers()
             )
             response.raise_for_status()
             data = response.json()
             return data["vector"]
+
+    async def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeds a batch of texts in one call, the service splits it into sub-batches itself.
+        """
+        async with httpx.AsyncClient(timeout=60) as client:
+            response = await client.post(
+                f"{self.base_url}/embed",
+                json={"text": texts},
+                headers=trace_headers()
+            )
+            response.raise_for_status()
+            return response.json()["vector"]
@@ -0,0 +1,71 @@
+import contextvars
+import uuid
+from prometheus_client import Counter, Gauge, Histogram
+
+# --- Tracing ---
+# Each service is its own Docker build context, so this block is copied verbatim into
+# api, embeddings and worker core/instrumentation.py. Keep the three copies identical.
+
+# Header carrying the trace ID between services
+TRACE_HEADER = "X-Trace-Id"
+
+# Trace ID of the request or document being handled, picked up by outgoing HTTP calls
+current_trace_id = contextvars.ContextVar("current_trace_id", default=None)
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+def trace_headers() -> dict:
+    trace_id = current_trace_id.get()
+    return {TRACE_HEADER: trace_id} if trace_id else {}
+
+# --- Metrics ---
+# Exposed on METRICS_PORT by main.py, chunks/sec is rate(worker_chunks_processed_total[1m])
+
+STAGE_SECONDS = Histogram(
+    "worker_stage_seconds",
+    "Time spent in each ingestion stage, per document (embed and upsert per batch)",
+    ["stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+
+CHUNKS_PROCESSED = Counter(
+    "worker_chunks_processed_total",
+    "Chunks embedded and upserted",
+)
+
+FILES_PROCESSED = Counter(
+    "worker_files_processed_total",
+    "Files that finished the pipeline, by outcome",
+    ["outcome"],
+)
+
+INBOX_DEPTH = Gauge(
+    "worker_inbox_depth",
+    "PDFs waiting in the inbox directory",
+)
+
+FILES_IN_PROGRESS = Gauge(
+    "worker_files_in_progress",
+    "Files currently being processed",
+)
+
+THROTTLE_BATCH_SIZE = Gauge(
+    "worker_throttle_batch_size",
+    "Chunks per embeddings call chosen by the adaptive throttle",
+)
+
+THROTTLE_CONCURRENCY = Gauge(
+    "worker_throttle_concurrency",
+    "Chunk batches embedded at once, chosen by the adaptive throttle",
+)
+
+THROTTLE_PRESSURE = Gauge(
+    "worker_throttle_pressure",
+    "Worst of the thermal, load and embeddings queue signals, 0 (fine) to 1 (at the limit)",
+)
+
+CPU_TEMPERATURE = Gauge(
+    "worker_cpu_temperature_celsius",
+    "Hottest thermal zone read by the throttle",
+)
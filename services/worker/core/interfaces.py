@@ -10,7 +10,20 @@ class EmbedderProto(Protocol):
         """Gets embedding for the given text."""
         ...
 
+    async def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Gets embeddings for a batch of texts, in order."""
+        ...
+
 class DataStoreProto(Protocol):
     async def save_document(self, document: Dict[str, Any]) -> bool:
         """Saves the document to the database."""
         ...
+
+    async def save_documents(self, documents: List[Dict[str, Any]]) -> bool:
+        """Saves a batch of documents in one call."""
+        ...
+
+class DocumentStoreProto(Protocol):
+    def upsert_document(self, record: Dict[str, Any]) -> None:
+        """Saves the doc-level metadata record."""
+        ...
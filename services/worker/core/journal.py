@@ -0,0 +1,143 @@
+import os
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingest_journal (
+    file_path TEXT PRIMARY KEY,
+    doc_id TEXT,
+    status TEXT NOT NULL,
+    total_chunks INTEGER,
+    committed_chunks INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    updated_at REAL NOT NULL
+)
+"""
+
+# Entry states, in_progress entries found at startup belong to a run that crashed
+PENDING = "pending"
+IN_PROGRESS = "in_progress"
+DONE = "done"
+DEAD = "dead"
+
+class IngestJournal:
+    """
+    Write-ahead journal of ingestion progress, one row per inbox file.
+
+    Progress is committed after every chunk batch is upserted, so a file that
+    fails partway resumes from its last committed batch. Chunk point IDs are
+    deterministic, so redoing the one uncommitted batch just overwrites it.
+    Failed files are retried with exponential backoff until `max_attempts`.
+    """
+    def __init__(self, db_path: str, max_attempts: int = 5, backoff_base_s: float = 2.0, backoff_max_s: float = 300.0):
+        self.max_attempts = max_attempts
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self.conn:
+            # WAL keeps each commit durable without rewriting the whole database file
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(SCHEMA)
+
+    def get(self, file_path: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute("SELECT * FROM ingest_journal WHERE file_path = ?", (file_path,)).fetchone()
+        return dict(row) if row else None
+
+    def begin(self, file_path: str) -> Dict[str, Any]:
+        """
+        Marks the file as in progress and returns its entry. A file that finished
+        or was dead-lettered before and shows up in the inbox again starts fresh.
+        """
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO ingest_journal (file_path, status, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(file_path) DO UPDATE SET
+                    attempts = CASE WHEN status IN (?, ?) THEN 0 ELSE attempts END,
+                    committed_chunks = CASE WHEN status IN (?, ?) THEN 0 ELSE committed_chunks END,
+                    status = excluded.status,
+                    updated_at = excluded.updated_at
+                """,
+                (file_path, IN_PROGRESS, time.time(), DONE, DEAD, DONE, DEAD),
+            )
+        return self.get(file_path)
+
+    def resume_from(self, file_path: str, doc_id: str, total_chunks: int) -> int:
+        """
+        Index of the first chunk still to process. Progress only carries over when
+        the file content and its chunking are unchanged, otherwise it starts over.
+        """
+        entry = self.get(file_path)
+        if entry and entry["doc_id"] == doc_id and entry["total_chunks"] == total_chunks:
+            return entry["committed_chunks"]
+        with self.conn:
+            self.conn.execute(
+                "UPDATE ingest_journal SET doc_id = ?, total_chunks = ?, committed_chunks = 0, updated_at = ? WHERE file_path = ?",
+                (doc_id, total_chunks, time.time(), file_path),
+            )
+        return 0
+
+    def commit_batch(self, file_path: str, committed_chunks: int) -> None:
+        with self.conn:
+            self.conn.execute(
+                "UPDATE ingest_journal SET committed_chunks = ?, updated_at = ? WHERE file_path = ?",
+                (committed_chunks, time.time(), file_path),
+            )
+
+    def complete(self, file_path: str) -> None:
+        self._set_status(file_path, DONE)
+
+    def record_failure(self, file_path: str, error: str) -> bool:
+        """
+        Records the failure and schedules the next attempt with exponential backoff.
+        Returns True once the file is out of attempts and should be dead-lettered.
+        """
+        attempts = (self.get(file_path) or {}).get("attempts", 0) + 1
+        delay = min(self.backoff_max_s, self.backoff_base_s * 2 ** (attempts - 1))
+        with self.conn:
+            self.conn.execute(
+                "UPDATE ingest_journal SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, updated_at = ? WHERE file_path = ?",
+                (PENDING, attempts, time.time() + delay, error, time.time(), file_path),
+            )
+        return attempts >= self.max_attempts
+
+    def mark_dead(self, file_path: str, reason: str) -> None:
+        self._set_status(file_path, DEAD, reason)
+
+    def recover(self) -> int:
+        """
+        Called once at startup, before anything is processed. Entries still in
+        progress were interrupted by a crash and are due again right away.
+        """
+        with self.conn:
+            cursor = self.conn.execute(
+                "UPDATE ingest_journal SET status = ?, next_attempt_at = 0, updated_at = ? WHERE status = ?",
+                (PENDING, time.time(), IN_PROGRESS),
+            )
+        return cursor.rowcount
+
+    def due(self, now: float = None) -> List[Dict[str, Any]]:
+        """Pending entries whose backoff has elapsed, oldest first."""
+        now = time.time() if now is None else now
+        rows = self.conn.execute(
+            "SELECT * FROM ingest_journal WHERE status = ? AND next_attempt_at <= ? ORDER BY next_attempt_at",
+            (PENDING, now),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _set_status(self, file_path: str, status: str, error: str = None) -> None:
+        with self.conn:
+            self.conn.execute(
+                "UPDATE ingest_journal SET status = ?, last_error = COALESCE(?, last_error), updated_at = ? WHERE file_path = ?",
+                (status, error, time.time(), file_path),
+            )
+
+    def close(self):
+        self.conn.close()
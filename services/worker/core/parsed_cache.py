@@ -0,0 +1,53 @@
+import gzip
+import json
+import os
+from typing import Any, Dict, Iterator, Optional
+
+SIDECAR_SUFFIX = ".parsed.json.gz"
+
+class ParsedTextCache:
+    """
+    Parser output saved as gzipped JSON sidecars in processed/, one per document,
+    named after the doc_id (the content hash). Lets the library be re-chunked and
+    re-embedded without parsing the PDFs again.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, doc_id: str) -> str:
+        return os.path.join(self.directory, f"{doc_id}{SIDECAR_SUFFIX}")
+
+    def save(self, parsed_data: Dict[str, Any], source_path: str = None) -> str:
+        """Writes the sidecar atomically, a crash never leaves a truncated file behind."""
+        sidecar = {
+            "doc_id": parsed_data["doc_id"],
+            "filename": parsed_data.get("filename"),
+            "source_path": source_path,
+            "metadata": parsed_data.get("metadata", {}),
+            "pages": parsed_data.get("pages") or [parsed_data.get("text", "")],
+        }
+        path = self.path_for(sidecar["doc_id"])
+        tmp_path = path + ".tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(sidecar, f)
+        os.replace(tmp_path, path)
+        return path
+
+    def load(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Returns the parser output for `doc_id`, in the same shape PDFParser.parse returns."""
+        try:
+            return self._read(self.path_for(doc_id))
+        except FileNotFoundError:
+            return None
+
+    def doc_ids(self) -> Iterator[str]:
+        for name in sorted(os.listdir(self.directory)):
+            if name.endswith(SIDECAR_SUFFIX):
+                yield name[:-len(SIDECAR_SUFFIX)]
+
+    def _read(self, path: str) -> Dict[str, Any]:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            sidecar = json.load(f)
+        sidecar["text"] = "".join(sidecar["pages"])
+        return sidecar
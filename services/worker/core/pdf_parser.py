@@ -1,6 +1,18 @@
 from pypdf import PdfReader
+import hashlib
 import os
 
+def content_hash(file_path: str) -> str:
+    """
+    Stable document ID derived from the file bytes, so re-ingesting
+    the same PDF under another name maps to the same document.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
 class PDFParser:
     def parse(self, file_path: str) -> dict:
         """
@@ -11,9 +23,9 @@ class PDFParser:
             
         reader = PdfReader(file_path)
         
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() or ""
+        # Page-separated text is kept for the parsed-text cache
+        pages = [page.extract_text() or "" for page in reader.pages]
+        text = "".join(pages)
             
         metadata = reader.metadata or {}
         
@@ -27,7 +39,12 @@ class PDFParser:
                     clean_metadata[clean_key] = str(value)
 
         return {
+            "doc_id": self._content_hash(file_path),
             "text": text,
+            "pages": pages,
             "metadata": clean_metadata,
             "filename": os.path.basename(file_path)
         }
+
+    def _content_hash(self, file_path: str) -> str:
+        return content_hash(file_path)
@@ -1,19 +1,45 @@
 import logging
 import asyncio
+import json
 import shutil
 import os
-from core.interfaces import ParserProto, EmbedderProto, DataStoreProto
+import threading
+import time
+from core.interfaces import ParserProto, EmbedderProto, DataStoreProto, DocumentStoreProto
+from core.parsed_cache import ParsedTextCache
+from core.journal import IngestJournal, DONE, DEAD
+from core.dedup import NearDuplicateIndex, LINK
+from core.throttle import AdaptiveThrottle
+from core.doc_store import document_record_from_parsed, FILTER_FIELDS
+from core.instrumentation import (
+    STAGE_SECONDS, CHUNKS_PROCESSED, FILES_PROCESSED, FILES_IN_PROGRESS, current_trace_id, new_trace_id
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class WorkerPipeline:
-    def __init__(self, parser: ParserProto, embedder: EmbedderProto, store: DataStoreProto, chunker, processed_dir: str = None):
+    def __init__(self, parser: ParserProto, embedder: EmbedderProto, store: DataStoreProto, chunker, processed_dir: str = None, doc_store: DocumentStoreProto = None, parsed_cache: ParsedTextCache = None,
+                 journal: IngestJournal = None, dead_letter_dir: str = None, batch_size: int = 32,
+                 dedup: NearDuplicateIndex = None, duplicate_action: str = LINK, throttle: AdaptiveThrottle = None):
         self.parser = parser
         self.embedder = embedder
         self.store = store
         self.chunker = chunker
         self.processed_dir = processed_dir
+        self.doc_store = doc_store
+        self.parsed_cache = parsed_cache
+        self.journal = journal
+        self.dead_letter_dir = dead_letter_dir
+        self.batch_size = batch_size
+        self.dedup = dedup
+        self.duplicate_action = duplicate_action
+        # Sets batch size and concurrency per batch when present, otherwise one batch_size batch at a time
+        self.throttle = throttle
+        # The watcher and the retry loop run in different threads, files are processed one at a time
+        self._lock = threading.Lock()
+        # One long-lived loop for every file, the shared Qdrant client's gRPC channel is bound to it
+        self._loop = None
 
     def on_pdf_created(self, file_path: str):
         """
@@ -21,48 +47,226 @@ class WorkerPipeline:
         Since the watcher is synchronous, we create a task.
         """
         logger.info(f"Detected new PDF: {file_path}")
-        asyncio.run(self.process_file(file_path))
+        self._run(file_path)
+
+    def _run(self, file_path: str):
+        with self._lock:
+            # The watcher runs during the startup pass, a file both report is moved by whichever got the lock first
+            if not os.path.exists(file_path):
+                logger.info(f"{file_path} is no longer in the inbox, already processed")
+                return
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.process_file(file_path))
+
+    def recover(self, inbox_dir: str):
+        """
+        Startup pass: resumes runs cut short by a crash and picks up PDFs that
+        arrived while the worker was down, which the watcher never reports.
+        """
+        if self.journal:
+            resumed = self.journal.recover()
+            if resumed:
+                logger.info(f"Resuming {resumed} interrupted file(s) from the journal")
+        for name in sorted(os.listdir(inbox_dir)):
+            if not name.lower().endswith(".pdf"):
+                continue
+            file_path = os.path.join(inbox_dir, name)
+            entry = self.journal.get(file_path) if self.journal else None
+            if entry is None or entry["status"] in (DONE, DEAD):
+                self.on_pdf_created(file_path)
+        self.retry_due()
+
+    def retry_due(self):
+        """
+        Re-runs journaled files whose backoff has elapsed, including runs cut short by a crash.
+        Called from the worker's main loop.
+        """
+        if not self.journal:
+            return
+        for entry in self.journal.due():
+            if not os.path.exists(entry["file_path"]):
+                if self._finished_before_crash(entry):
+                    logger.info(f"{entry['file_path']} was fully ingested before a crash, marking it done")
+                    self.journal.complete(entry["file_path"])
+                    continue
+                # Removed from the inbox by hand, nothing left to retry
+                self.journal.mark_dead(entry["file_path"], "file no longer in inbox")
+                continue
+            logger.info(f"Retrying {entry['file_path']} (attempt {entry['attempts'] + 1}, resuming at chunk {entry['committed_chunks']})")
+            self._run(entry["file_path"])
 
     async def process_file(self, file_path: str):
+        # The trace ID travels with every embeddings call made for this file
+        trace_id = new_trace_id()
+        current_trace_id.set(trace_id)
+        started = time.perf_counter()
+        FILES_IN_PROGRESS.inc()
         try:
+            if self.journal:
+                self.journal.begin(file_path)
+
             # 1. Parse
-            logger.info(f"Parsing {file_path}...")
-            parsed_data = self.parser.parse(file_path)
+            logger.info(f"[trace {trace_id}] Parsing {file_path}...")
+            # Parsing is CPU-bound, run it off the event loop so a shared loop stays responsive
+            with STAGE_SECONDS.labels(stage="parse").time():
+                parsed_data = await asyncio.to_thread(self.parser.parse, file_path)
             
             # 2. Chunk and Embed
             original_text = parsed_data.get("text", "")
             if not original_text:
                 logger.warning(f"No text extracted from {file_path}")
+                FILES_PROCESSED.labels(outcome="empty").inc()
+                # Retrying cannot help, move it out of the inbox right away
+                if self.journal:
+                    self._dead_letter(file_path, "no text extracted", attempts=1)
                 return
 
-            chunks = self.chunker.split_text(original_text)
-            logger.info(f"Split {file_path} into {len(chunks)} chunks.")
+            # Near-duplicates of an ingested paper (v1/v2, preprint/published) are not embedded again
+            signature = None
+            if self.dedup:
+                with STAGE_SECONDS.labels(stage="dedup").time():
+                    signature = self.dedup.signature(original_text)
+                    match = self.dedup.find(signature, exclude=parsed_data["doc_id"])
+                if match:
+                    self._handle_duplicate(file_path, parsed_data, *match)
+                    return
 
-            for i, chunk_text in enumerate(chunks):
-                logger.info(f"Processing chunk {i+1}/{len(chunks)} for {file_path}...")
-                
-                # Embed
-                vector = await self.embedder.get_embedding(chunk_text)
+            with STAGE_SECONDS.labels(stage="chunk").time():
+                chunks = self.chunker.split_text(original_text)
+            logger.info(f"[trace {trace_id}] Split {file_path} into {len(chunks)} chunks.")
+
+            # Doc-level metadata is stored once in the docs table, chunks only keep the fields we filter on
+            record = document_record_from_parsed(parsed_data, source_path=file_path, total_chunks=len(chunks))
+            chunk_fields = {field: record[field] for field in FILTER_FIELDS}
+
+            # Batches committed by an earlier, interrupted attempt are skipped
+            start = self.journal.resume_from(file_path, record["doc_id"], len(chunks)) if self.journal else 0
+            if start:
+                logger.info(f"[trace {trace_id}] Resuming {file_path} at chunk {start}/{len(chunks)}")
+
+            position = start
+            while position < len(chunks):
+                batch_size, concurrency = self.batch_size, 1
+                if self.throttle:
+                    await self.throttle.refresh()
+                    await self.throttle.pause()
+                    batch_size, concurrency = self.throttle.batch_size, self.throttle.concurrency
+                end = min(len(chunks), position + batch_size * concurrency)
+                batches = [(batch_start, chunks[batch_start:batch_start + batch_size]) for batch_start in range(position, end, batch_size)]
+                logger.info(f"Processing chunks {position + 1}-{end}/{len(chunks)} for {file_path}...")
                 
-                # 3. Save
-                document = parsed_data.copy()
-                document["text"] = chunk_text # Store only the chunk text
-                document["vector"] = vector
-                document["chunk_index"] = i
-                document["total_chunks"] = len(chunks)
-                # Ideally generate a parent_id, but filename acts as one for now
+                # Embed, concurrent batches go out together
+                with STAGE_SECONDS.labels(stage="embed").time():
+                    results = await asyncio.gather(*(self.embedder.get_embeddings(batch) for _, batch in batches))
                 
-                await self.store.save_document(document)
+                # 3. Save, in order so the journal only ever commits a contiguous prefix
+                for (batch_start, batch), vectors in zip(batches, results):
+                    documents = [
+                        {
+                            "doc_id": record["doc_id"],
+                            "chunk_index": batch_start + i,
+                            "text": chunk_text, # Store only the chunk text
+                            **chunk_fields,
+                            "vector": vector,
+                        }
+                        for i, (chunk_text, vector) in enumerate(zip(batch, vectors))
+                    ]
+                    
+                    with STAGE_SECONDS.labels(stage="upsert").time():
+                        await self.store.save_documents(documents)
+                    CHUNKS_PROCESSED.inc(len(documents))
+                    if self.journal:
+                        self.journal.commit_batch(file_path, batch_start + len(batch))
+                position = end
             
-            logger.info(f"Successfully processed {file_path} ({len(chunks)} chunks)")
-
-            # 4. Move to processed
-            if self.processed_dir:
-                filename = os.path.basename(file_path)
-                dest_path = os.path.join(self.processed_dir, filename)
-                logger.info(f"Moving {file_path} to {dest_path}")
-                shutil.move(file_path, dest_path)
+            # Written once every chunk is in Qdrant, the API reads total_chunks as the number of stored
+            # points and a new docs row as the signal that the collection changed
+            if self.doc_store:
+                self.doc_store.upsert_document(record)
+
+            STAGE_SECONDS.labels(stage="total").observe(time.perf_counter() - started)
+            FILES_PROCESSED.labels(outcome="success").inc()
+            logger.info(f"[trace {trace_id}] Successfully processed {file_path} ({len(chunks)} chunks)")
+
+            # Only fully ingested documents become duplicate candidates
+            if self.dedup:
+                self.dedup.add(record["doc_id"], signature)
+
+            # 4. Move to processed, with the parsed text next to it for rebuilds
+            dest_path = self._move_to_processed(file_path)
+            if dest_path and self.parsed_cache:
+                self.parsed_cache.save(parsed_data, source_path=dest_path)
+            if self.journal:
+                self.journal.complete(file_path)
             
         except Exception as e:
-            logger.error(f"Error processing {file_path}: {e}")
+            FILES_PROCESSED.labels(outcome="error").inc()
+            logger.error(f"[trace {trace_id}] Error processing {file_path}: {e}")
+            if self.journal:
+                reason = f"{type(e).__name__}: {e}"
+                if self.journal.record_failure(file_path, reason):
+                    self._dead_letter(file_path, reason, attempts=self.journal.get(file_path)["attempts"])
+        finally:
+            FILES_IN_PROGRESS.dec()
+
+    def _finished_before_crash(self, entry: dict) -> bool:
+        """
+        A crash between the move to processed/ and journal.complete leaves a pending
+        entry whose file is gone from the inbox. It is done if the file reached
+        processed/ with every chunk committed. The sidecar written after the move
+        may be missing too, so it is written again.
+        """
+        if not self.processed_dir:
+            return False
+        dest_path = os.path.join(self.processed_dir, os.path.basename(entry["file_path"]))
+        if not os.path.exists(dest_path):
+            return False
+        if entry["total_chunks"] is not None and entry["committed_chunks"] < entry["total_chunks"]:
+            return False
+        if self.parsed_cache and entry["doc_id"] and not os.path.exists(self.parsed_cache.path_for(entry["doc_id"])):
+            self.parsed_cache.save(self.parser.parse(dest_path), source_path=dest_path)
+        return True
 
+    def _move_to_processed(self, file_path: str):
+        if not self.processed_dir:
+            return None
+        filename = os.path.basename(file_path)
+        dest_path = os.path.join(self.processed_dir, filename)
+        logger.info(f"Moving {file_path} to {dest_path}")
+        shutil.move(file_path, dest_path)
+        return dest_path
+
+    def _handle_duplicate(self, file_path: str, parsed_data: dict, original_doc_id: str, similarity: float):
+        """
+        Skips a near-duplicate, or with the link action records it in the docs table
+        as a version of the original without chunks of its own. No parsed-text
+        sidecar is written, so rebuilds do not embed it either.
+        """
+        logger.info(f"{file_path} is a near-duplicate of {original_doc_id} (similarity {similarity:.2f}), action: {self.duplicate_action}")
+        FILES_PROCESSED.labels(outcome="duplicate").inc()
+        dest_path = self._move_to_processed(file_path)
+        if self.duplicate_action == LINK and self.doc_store:
+            record = document_record_from_parsed(parsed_data, source_path=dest_path or file_path, total_chunks=0)
+            record["version_of"] = original_doc_id
+            self.doc_store.upsert_document(record)
+        if self.journal:
+            self.journal.complete(file_path)
+
+    def _dead_letter(self, file_path: str, reason: str, attempts: int):
+        """
+        Moves a file that keeps failing out of the inbox, with a JSON note on why.
+        """
+        FILES_PROCESSED.labels(outcome="dead_letter").inc()
+        self.journal.mark_dead(file_path, reason)
+        if not self.dead_letter_dir:
+            logger.error(f"Giving up on {file_path}: {reason}")
+            return
+        os.makedirs(self.dead_letter_dir, exist_ok=True)
+        filename = os.path.basename(file_path)
+        dest_path = os.path.join(self.dead_letter_dir, filename)
+        logger.error(f"Giving up on {file_path} after {attempts} attempts, moving it to {dest_path}: {reason}")
+        if os.path.exists(file_path):
+            shutil.move(file_path, dest_path)
+        with open(dest_path + ".reason.json", "w") as f:
+            json.dump({"file": filename, "reason": reason, "attempts": attempts, "failed_at": time.time()}, f, indent=2)
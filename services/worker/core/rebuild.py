@@ -0,0 +1,223 @@
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Set
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http import models
+from core.parsed_cache import ParsedTextCache
+from core.pdf_parser import content_hash
+from core.doc_store import document_record_from_parsed, FILTER_FIELDS
+from core.store import QdrantStore, PAYLOAD_INDEXES, vectors_config
+from core.throttle import AdaptiveThrottle
+
+logger = logging.getLogger(__name__)
+
+class RebuildAborted(Exception):
+    """The rebuild stopped before the swap, the live collection is untouched."""
+
+class CollectionRebuilder:
+    """
+    Re-chunks and re-embeds the whole library from the parsed-text cache into a
+    new collection, then points the `alias` collection alias at it in one atomic
+    alias update. Search and ingestion keep using the old collection through the
+    alias until the swap, so the library stays online while the job runs.
+    With `prefix_dim` the new collection also stores the truncated prefix of
+    every embedding as a second named vector, for two-stage search. With a
+    `throttle` the job waits for an idle window before it starts, then follows
+    the throttle's batch size and cool-down pauses like ingestion does.
+
+    Documents ingested before sidecars existed are backfilled by parsing their
+    PDF in processed/ again when a `parser` is given. Only documents with chunks
+    in the live collection are backfilled, near-duplicates the worker moved to
+    processed/ without embedding them stay that way. The swap is refused while
+    the live collection still has documents that could not be rebuilt, so a
+    rebuild never publishes a collection that lost papers.
+    """
+    def __init__(self, client: AsyncQdrantClient, cache: ParsedTextCache, embedder, chunker, doc_store=None, alias: str = "papers", batch_size: int = 64, prefix_dim: int = 0,
+                 throttle: AdaptiveThrottle = None, parser=None):
+        self.client = client
+        self.cache = cache
+        self.embedder = embedder
+        self.chunker = chunker
+        self.doc_store = doc_store
+        self.alias = alias
+        self.batch_size = batch_size
+        self.prefix_dim = prefix_dim
+        self.throttle = throttle
+        self.parser = parser
+
+    async def run(self, drop_old: bool = False, target: str = None) -> str:
+        previous = await self.alias_target()
+        if previous is None and await self._collection_exists(self.alias) and not drop_old:
+            # Only an alias can be swapped atomically. Replacing the concrete collection
+            # means deleting it first, which the caller has to ask for.
+            raise RebuildAborted(
+                f"'{self.alias}' is a collection, not an alias. The first rebuild has to delete it before the "
+                f"alias can take its name, and search is unavailable for that moment. Run again with drop_old "
+                f"(rebuild.py --drop-old) to allow this."
+            )
+        if self.throttle:
+            logger.info("Waiting for an idle window before rebuilding")
+            await self.throttle.wait_for_idle()
+        if self.parser:
+            self.backfill_sidecars(await self._live_doc_ids())
+        target = target or f"{self.alias}_{time.strftime('%Y%m%d%H%M%S')}"
+        await self._create_collection(target)
+        store = QdrantStore(client=self.client, collection_name=target)
+
+        # Documents ingested while the job runs land in the old collection and get a
+        # sidecar, so keep going until no sidecar is left that has not been rebuilt
+        records = {}
+        await self._rebuild_pending(records, store)
+
+        missing = await self._live_doc_ids() - set(records)
+        if missing:
+            await self.client.delete_collection(collection_name=target)
+            raise RebuildAborted(
+                f"{len(missing)} document(s) in '{self.alias}' have no parsed-text sidecar and no PDF in "
+                f"{self.cache.directory} to parse again, e.g. {sorted(missing)[:3]}. Rebuilding would drop them, "
+                f"'{self.alias}' was left as it is."
+            )
+
+        previous = await self.swap_alias(target, drop_concrete=drop_old)
+        logger.info(f"Alias '{self.alias}' now points to '{target}' (was '{previous}')")
+
+        # A document whose sidecar appeared between the last scan and the swap only
+        # made it into the old collection, the new one is live now so add it there
+        await self._rebuild_pending(records, store)
+
+        # total_chunks changes with the chunking, only safe to publish once the new collection is live
+        if self.doc_store:
+            for record in records.values():
+                existing = self.doc_store.get_document(record["doc_id"])
+                if existing:
+                    record["version_of"] = existing.get("version_of")
+                self.doc_store.upsert_document(record)
+
+        if drop_old and previous and previous != target:
+            await self.client.delete_collection(collection_name=previous)
+            logger.info(f"Dropped old collection '{previous}'")
+        return target
+
+    def backfill_sidecars(self, live_doc_ids: Set[str]) -> int:
+        """
+        Parses the PDFs in processed/ that have chunks in `live_doc_ids` but no
+        sidecar yet, i.e. everything ingested before the cache existed. PDFs that
+        were never embedded, like linked near-duplicates, are left alone. Returns
+        the number of sidecars written.
+        """
+        written = 0
+        known = set(self.cache.doc_ids())
+        for name in sorted(os.listdir(self.cache.directory)):
+            if not name.lower().endswith(".pdf"):
+                continue
+            path = os.path.join(self.cache.directory, name)
+            doc_id = content_hash(path)
+            if doc_id in known or doc_id not in live_doc_ids:
+                continue
+            parsed_data = self.parser.parse(path)
+            self.cache.save(parsed_data, source_path=path)
+            known.add(parsed_data["doc_id"])
+            written += 1
+        if written:
+            logger.info(f"Backfilled {written} parsed-text sidecar(s) from {self.cache.directory}")
+        return written
+
+    async def _rebuild_pending(self, records: Dict[str, Dict[str, Any]], store: QdrantStore) -> None:
+        skipped = set()
+        while True:
+            pending = [doc_id for doc_id in self.cache.doc_ids() if doc_id not in records and doc_id not in skipped]
+            if not pending:
+                return
+            for doc_id in pending:
+                if self._is_linked_version(doc_id):
+                    # A sidecar written for a linked near-duplicate, e.g. by an older backfill
+                    logger.info(f"Skipping {doc_id}, it is linked as a version of another document")
+                    skipped.add(doc_id)
+                    continue
+                records[doc_id] = await self._rebuild_document(doc_id, store)
+                logger.info(f"Rebuilt {doc_id} ({records[doc_id]['total_chunks']} chunks), {len(records)} documents done")
+
+    def _is_linked_version(self, doc_id: str) -> bool:
+        existing = self.doc_store.get_document(doc_id) if self.doc_store else None
+        return bool(existing and existing.get("version_of"))
+
+    async def _live_doc_ids(self, page_size: int = 1024) -> Set[str]:
+        """doc_ids with chunks in the collection the alias (or concrete collection) serves now."""
+        if not await self._collection_exists(self.alias) and await self.alias_target() is None:
+            return set()
+        doc_ids = set()
+        offset = None
+        while True:
+            points, offset = await self.client.scroll(
+                collection_name=self.alias, limit=page_size, offset=offset, with_payload=["doc_id"], with_vectors=False
+            )
+            doc_ids.update(point.payload["doc_id"] for point in points if point.payload and "doc_id" in point.payload)
+            if offset is None:
+                return doc_ids
+
+    async def _create_collection(self, collection_name: str):
+        vector_size = len(await self.embedder.get_embedding("vector size probe"))
+        await self.client.create_collection(
+            collection_name=collection_name,
+            vectors_config=vectors_config(vector_size, self.prefix_dim)
+        )
+        for field_name, field_schema in PAYLOAD_INDEXES.items():
+            await self.client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=field_schema
+            )
+
+    async def _rebuild_document(self, doc_id: str, store: QdrantStore) -> Dict[str, Any]:
+        parsed_data = self.cache.load(doc_id)
+        chunks = self.chunker.split_text(parsed_data["text"]) if parsed_data["text"] else []
+        record = document_record_from_parsed(parsed_data, source_path=parsed_data.get("source_path"), total_chunks=len(chunks))
+        chunk_fields = {field: record[field] for field in FILTER_FIELDS}
+
+        start = 0
+        while start < len(chunks):
+            batch_size = self.batch_size
+            if self.throttle:
+                await self.throttle.refresh()
+                await self.throttle.pause()
+                batch_size = self.throttle.batch_size
+            batch = chunks[start:start + batch_size]
+            vectors = await self.embedder.get_embeddings(batch)
+            await store.save_documents([
+                {"doc_id": doc_id, "chunk_index": start + i, "text": text, **chunk_fields, "vector": vector}
+                for i, (text, vector) in enumerate(zip(batch, vectors))
+            ])
+            start += len(batch)
+        return record
+
+    async def alias_target(self) -> Optional[str]:
+        aliases = (await self.client.get_aliases()).aliases
+        return next((a.collection_name for a in aliases if a.alias_name == self.alias), None)
+
+    async def swap_alias(self, target: str, drop_concrete: bool = False) -> Optional[str]:
+        """
+        Points the alias at `target` and returns the collection it pointed to before.
+        A concrete collection under the alias name is only deleted with `drop_concrete`.
+        """
+        previous = await self.alias_target()
+
+        actions: List[Any] = []
+        if previous:
+            actions.append(models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=self.alias)))
+        elif await self._collection_exists(self.alias):
+            if not drop_concrete:
+                raise RebuildAborted(f"'{self.alias}' is a collection, not an alias, and drop_concrete is not set")
+            # Deployments from before the rebuild job have a concrete collection under the
+            # alias name, it has to go first. Searches fail for the moment in between.
+            logger.warning(f"Replacing concrete collection '{self.alias}' with an alias, this happens once")
+            await self.client.delete_collection(collection_name=self.alias)
+        actions.append(models.CreateAliasOperation(create_alias=models.CreateAlias(collection_name=target, alias_name=self.alias)))
+
+        # Both operations are applied together, there is no moment without the alias
+        await self.client.update_collection_aliases(change_aliases_operations=actions)
+        return previous
+
+    async def _collection_exists(self, collection_name: str) -> bool:
+        collections = (await self.client.get_collections()).collections
+        return any(collection.name == collection_name for collection in collections)
@@ -0,0 +1,220 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http import models
+from core.store import PAYLOAD_INDEXES
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+PAYLOADS_FILE = "payloads.parquet"
+
+# Typed columns for the chunk payload fields, anything else (legacy payloads) goes to `extra` as JSON
+PAYLOAD_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("doc_id", pa.string()),
+    ("chunk_index", pa.int64()),
+    ("text", pa.string()),
+    ("year", pa.int64()),
+    ("authors", pa.list_(pa.string())),
+    ("tags", pa.list_(pa.string())),
+    ("extra", pa.string()),
+])
+PAYLOAD_FIELDS = [field.name for field in PAYLOAD_SCHEMA if field.name not in ("id", "extra")]
+
+def vectors_file(name: str) -> str:
+    # Unnamed vectors go to vectors.npy, named ones to vectors.<name>.npy
+    return f"vectors.{name}.npy" if name else "vectors.npy"
+
+def missing_file(name: str) -> str:
+    return f"vectors.{name}.missing.npy"
+
+def _vector_params(collection_info) -> Dict[str, models.VectorParams]:
+    vectors = collection_info.config.params.vectors
+    if isinstance(vectors, models.VectorParams):
+        return {"": vectors}
+    return dict(vectors)
+
+def _payload_row(point_id, payload: Dict[str, Any]) -> Dict[str, Any]:
+    row = {"id": str(point_id)}
+    for field in PAYLOAD_FIELDS:
+        row[field] = payload.get(field)
+    extra = {key: value for key, value in payload.items() if key not in PAYLOAD_FIELDS}
+    row["extra"] = json.dumps(extra) if extra else None
+    return row
+
+def _payload_from_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    payload = {field: row[field] for field in PAYLOAD_FIELDS if row[field] is not None}
+    if row["extra"]:
+        payload.update(json.loads(row["extra"]))
+    return payload
+
+def _point_id(value: str):
+    return int(value) if value.isdigit() else str(uuid.UUID(value))
+
+async def export_collection(client: AsyncQdrantClient, collection_name: str, out_dir: str, batch_size: int = 1024) -> Dict[str, Any]:
+    """
+    Writes every point of the collection to `out_dir`: vectors as float32 .npy
+    matrices written through a memory map (one per named vector), payloads as
+    Parquet keyed by point ID in the same row order, plus a manifest. Points added while
+    the export runs may be missed, pause ingestion for a consistent snapshot.
+
+    Points without one of the named vectors, e.g. written before the collection
+    had it, get a zero row in its matrix. Those rows are flagged in a boolean
+    mask next to it and counted in the manifest.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    info = await client.get_collection(collection_name=collection_name)
+    params = _vector_params(info)
+    count = (await client.count(collection_name=collection_name, exact=True)).count
+
+    matrices = {
+        name: np.lib.format.open_memmap(os.path.join(out_dir, vectors_file(name)), mode="w+", dtype=np.float32, shape=(count, p.size))
+        for name, p in params.items()
+    }
+    missing = {name: np.zeros(count, dtype=bool) for name in params if name}
+    writer = pq.ParquetWriter(os.path.join(out_dir, PAYLOADS_FILE), PAYLOAD_SCHEMA)
+
+    rows = 0
+    offset = None
+    started = time.perf_counter()
+    try:
+        while rows < count:
+            points, offset = await client.scroll(
+                collection_name=collection_name,
+                limit=min(batch_size, count - rows),
+                offset=offset,
+                with_payload=True,
+                with_vectors=True
+            )
+            if not points:
+                break
+            for name, matrix in matrices.items():
+                if not name:
+                    matrix[rows:rows + len(points)] = [point.vector for point in points]
+                    continue
+                block = np.zeros((len(points), matrix.shape[1]), dtype=np.float32)
+                for i, point in enumerate(points):
+                    vector = (point.vector or {}).get(name)
+                    if vector is None:
+                        missing[name][rows + i] = True
+                    else:
+                        block[i] = vector
+                matrix[rows:rows + len(points)] = block
+            writer.write_table(pa.Table.from_pylist([_payload_row(point.id, point.payload or {}) for point in points], schema=PAYLOAD_SCHEMA))
+            rows += len(points)
+            logger.info(f"Exported {rows}/{count} points")
+            if offset is None:
+                break
+    finally:
+        writer.close()
+        for matrix in matrices.values():
+            matrix.flush()
+
+    vector_specs = {}
+    for name, p in params.items():
+        spec = {"file": vectors_file(name), "size": p.size, "distance": p.distance.value if hasattr(p.distance, "value") else p.distance}
+        mask = missing.get(name)
+        if mask is not None and mask[:rows].any():
+            np.save(os.path.join(out_dir, missing_file(name)), mask[:rows])
+            spec.update(missing=int(mask[:rows].sum()), missing_file=missing_file(name))
+            logger.warning(f"{spec['missing']} points have no '{name}' vector, exported as zero rows")
+        vector_specs[name] = spec
+
+    manifest = {
+        "collection": collection_name,
+        "points": rows,
+        "vectors": vector_specs,
+        "payloads": PAYLOADS_FILE,
+        "exported_at": time.time(),
+    }
+    with open(os.path.join(out_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+    logger.info(f"Exported {rows} points in {time.perf_counter() - started:.1f}s to {out_dir}")
+    return manifest
+
+def load_vectors(export_dir: str, name: str = "") -> np.ndarray:
+    """
+    Memory-maps an exported vector matrix for offline analysis, rows are in the same order as the Parquet file.
+    Rows of points without the vector are zero, see load_missing.
+    """
+    with open(os.path.join(export_dir, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    matrix = np.load(os.path.join(export_dir, manifest["vectors"][name]["file"]), mmap_mode="r")
+    return matrix[:manifest["points"]]
+
+def load_missing(export_dir: str, name: str = "") -> np.ndarray:
+    """Boolean mask of the rows whose point had no `name` vector, all False when none were missing."""
+    with open(os.path.join(export_dir, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    spec = manifest["vectors"][name]
+    if "missing_file" not in spec:
+        return np.zeros(manifest["points"], dtype=bool)
+    return np.load(os.path.join(export_dir, spec["missing_file"]))
+
+async def import_collection(client: AsyncQdrantClient, export_dir: str, collection_name: Optional[str] = None, batch_size: int = 1024, parallel: int = 4) -> int:
+    """
+    Bulk-loads an export into `collection_name` (default: the exported name),
+    creating it if needed. Batches are upserted `parallel` at a time.
+    """
+    with open(os.path.join(export_dir, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    collection_name = collection_name or manifest["collection"]
+    vectors = manifest["vectors"]
+
+    if not await _collection_exists(client, collection_name):
+        config = {
+            name: models.VectorParams(size=spec["size"], distance=models.Distance(spec["distance"]))
+            for name, spec in vectors.items()
+        }
+        await client.create_collection(collection_name=collection_name, vectors_config=config[""] if "" in config else config)
+        for field_name, field_schema in PAYLOAD_INDEXES.items():
+            await client.create_payload_index(collection_name=collection_name, field_name=field_name, field_schema=field_schema)
+
+    matrices = {name: np.load(os.path.join(export_dir, spec["file"]), mmap_mode="r") for name, spec in vectors.items()}
+    # Points exported without a named vector are restored without it, not with the zero row
+    masks = {name: load_missing(export_dir, name) for name, spec in vectors.items() if "missing_file" in spec}
+    semaphore = asyncio.Semaphore(parallel)
+    tasks: List[asyncio.Task] = []
+    started = time.perf_counter()
+
+    async def upsert(points):
+        try:
+            await client.upsert(collection_name=collection_name, points=points, wait=True)
+        finally:
+            semaphore.release()
+
+    row = 0
+    payloads = pq.ParquetFile(os.path.join(export_dir, manifest["payloads"]))
+    for batch in payloads.iter_batches(batch_size=batch_size):
+        points = []
+        for record in batch.to_pylist():
+            vector = {name: matrix[row].tolist() for name, matrix in matrices.items() if not (name in masks and masks[name][row])}
+            points.append(models.PointStruct(
+                id=_point_id(record["id"]),
+                vector=vector[""] if "" in vector else vector,
+                payload=_payload_from_row(record)
+            ))
+            row += 1
+        # Reading the next batch overlaps with the upserts already in flight
+        await semaphore.acquire()
+        tasks.append(asyncio.create_task(upsert(points)))
+    await asyncio.gather(*tasks)
+
+    logger.info(f"Imported {row} points into '{collection_name}' in {time.perf_counter() - started:.1f}s")
+    return row
+
+async def _collection_exists(client: AsyncQdrantClient, collection_name: str) -> bool:
+    collections = (await client.get_collections()).collections
+    if any(collection.name == collection_name for collection in collections):
+        return True
+    aliases = (await client.get_aliases()).aliases
+    return any(alias.alias_name == collection_name for alias in aliases)
@@ -1,15 +1,93 @@
 from qdrant_client import AsyncQdrantClient
 from qdrant_client.http import models
+import math
 import uuid
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 logger = logging.getLogger(__name__)
 
+def chunk_point_id(doc_id: str, chunk_index: int) -> str:
+    """
+    Deterministic point ID for a chunk, so re-ingesting a document overwrites its points.
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{doc_id}:{chunk_index}"))
+
+# Payload indexes of a chunk collection, keep in sync with the API's VectorDB
+PAYLOAD_INDEXES = {
+    "doc_id": models.PayloadSchemaType.KEYWORD,
+    "chunk_index": models.PayloadSchemaType.INTEGER,
+    "year": models.PayloadSchemaType.INTEGER,
+    "authors": models.PayloadSchemaType.KEYWORD,
+    "tags": models.PayloadSchemaType.KEYWORD,
+}
+
+# Named vectors of a two-stage collection, keep in sync with the API's VectorDB.
+# Collections created before have a single unnamed vector and no prefix.
+FULL_VECTOR = "full"
+PREFIX_VECTOR = "prefix"
+
+# Characters of the chunk text stored as its `preview` payload field, so search can show
+# a snippet without fetching the whole chunk. Keep in sync with the API.
+PREVIEW_CHARS = 300
+
+def preview_of(text: str) -> str:
+    return text[:PREVIEW_CHARS] + "..." if len(text) > PREVIEW_CHARS else text
+
+def prefix_vector(vector: List[float], dim: int) -> List[float]:
+    """
+    First `dim` components of the embedding, scaled back to unit length so
+    cosine scores on the prefix stay comparable between points.
+    """
+    prefix = vector[:dim]
+    norm = math.sqrt(sum(x * x for x in prefix))
+    return [x / norm for x in prefix] if norm else list(prefix)
+
+def vectors_config(vector_size: int, prefix_dim: int = 0):
+    """
+    Vector config of a new chunk collection. With `prefix_dim` the collection
+    gets the full embedding plus its truncated prefix as named vectors.
+    """
+    if not prefix_dim:
+        return models.VectorParams(size=vector_size, distance=models.Distance.COSINE)
+    return {
+        FULL_VECTOR: models.VectorParams(size=vector_size, distance=models.Distance.COSINE),
+        PREFIX_VECTOR: models.VectorParams(size=min(prefix_dim, vector_size), distance=models.Distance.COSINE),
+    }
+
+def to_point(document: Dict[str, Any], prefix_dim: int = 0) -> models.PointStruct:
+    # Derive the point ID from the document and chunk, fall back to a random UUID
+    if "doc_id" in document and "chunk_index" in document:
+        point_id = chunk_point_id(document["doc_id"], document["chunk_index"])
+    else:
+        point_id = str(uuid.uuid4())
+    payload = dict(document)
+    vector = payload.pop("vector")
+    if isinstance(payload.get("text"), str):
+        payload["preview"] = preview_of(payload["text"])
+    if prefix_dim:
+        vector = {FULL_VECTOR: vector, PREFIX_VECTOR: prefix_vector(vector, prefix_dim)}
+    return models.PointStruct(id=point_id, vector=vector, payload=payload)
+
 class QdrantStore:
-    def __init__(self, host: str, port: int, collection_name: str = "papers"):
-        self.client = AsyncQdrantClient(host=host, port=port)
+    def __init__(self, host: str = None, port: int = None, collection_name: str = "papers", client: AsyncQdrantClient = None):
+        # An existing client can be passed in, e.g. an in-memory one for benchmarks
+        self.client = client or AsyncQdrantClient(host=host, port=port)
         self.collection_name = collection_name
+        # Size of the collection's prefix vector, 0 for a single unnamed vector
+        self._prefix_dim: Optional[int] = None
+
+    async def prefix_dim(self) -> int:
+        """
+        Looked up from the collection on first write, so the worker writes whatever
+        layout the collection was created with. A failed upsert clears it, so after
+        a rebuild swaps the alias to another layout the retry looks it up again.
+        """
+        if self._prefix_dim is None:
+            info = await self.client.get_collection(collection_name=self.collection_name)
+            vectors = info.config.params.vectors
+            self._prefix_dim = vectors[PREFIX_VECTOR].size if isinstance(vectors, dict) and PREFIX_VECTOR in vectors else 0
+        return self._prefix_dim
 
     async def save_document(self, document: Dict[str, Any]) -> bool:
         """
@@ -20,23 +98,30 @@ class QdrantStore:
             # For simplicity, we assume it's created or we try to create?
             # Better to assume creation is handled or just try upsert.
             
-            # Generate a UUID if not present
-            doc_id = str(uuid.uuid4())
-            
-            vector = document.pop("vector")
-            
             # Upsert
+            prefix_dim = await self.prefix_dim()
+            await self.client.upsert(
+                collection_name=self.collection_name,
+                points=[to_point(document, prefix_dim)]
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Failed to save to Qdrant: {e}")
+            self._prefix_dim = None
+            raise e
+
+    async def save_documents(self, documents: List[Dict[str, Any]]) -> bool:
+        """
+        Saves a batch of chunks in one upsert.
+        """
+        try:
+            prefix_dim = await self.prefix_dim()
             await self.client.upsert(
                 collection_name=self.collection_name,
-                points=[
-                    models.PointStruct(
-                        id=doc_id,
-                        vector=vector,
-                        payload=document
-                    )
-                ]
+                points=[to_point(document, prefix_dim) for document in documents]
             )
             return True
         except Exception as e:
             logger.error(f"Failed to save to Qdrant: {e}")
+            self._prefix_dim = None
             raise e
@@ -0,0 +1,201 @@
+import asyncio
+import glob
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional
+import httpx
+from core.instrumentation import THROTTLE_BATCH_SIZE, THROTTLE_CONCURRENCY, THROTTLE_PRESSURE, CPU_TEMPERATURE
+
+logger = logging.getLogger(__name__)
+
+# Search requests waiting or encoding at the embeddings service. The worker's own
+# requests are counted under priority="bulk", so they never throttle it.
+QUEUE_DEPTH_METRIC = 'embeddings_in_flight{priority="interactive"}'
+
+@dataclass
+class SystemReading:
+    temperature_c: Optional[float]
+    load_per_core: Optional[float]
+    queue_depth: Optional[float]
+
+class SystemProbe:
+    """
+    Reads the hottest thermal zone and the 1-minute load average from sysfs and
+    procfs, and the search requests in flight at the embeddings service from its
+    /metrics. Paths are
+    configurable so tests can point them at plain files. Anything unreadable is
+    reported as None and ignored, e.g. thermal zones on a dev machine.
+    """
+    def __init__(self, thermal_zones: str = "/sys/class/thermal/thermal_zone*/temp", loadavg_path: str = "/proc/loadavg",
+                 metrics_url: str = None, cores: int = None):
+        self.thermal_zones = thermal_zones
+        self.loadavg_path = loadavg_path
+        self.metrics_url = metrics_url
+        self.cores = cores or os.cpu_count() or 1
+
+    def temperature_c(self) -> Optional[float]:
+        readings = []
+        for path in glob.glob(self.thermal_zones):
+            try:
+                with open(path) as f:
+                    # sysfs reports millidegrees Celsius
+                    readings.append(int(f.read().strip()) / 1000)
+            except (OSError, ValueError):
+                continue
+        return max(readings) if readings else None
+
+    def load_per_core(self) -> Optional[float]:
+        try:
+            with open(self.loadavg_path) as f:
+                return float(f.read().split()[0]) / self.cores
+        except (OSError, ValueError, IndexError):
+            return None
+
+    async def queue_depth(self) -> Optional[float]:
+        if not self.metrics_url:
+            return None
+        try:
+            async with httpx.AsyncClient(timeout=1.0) as client:
+                response = await client.get(self.metrics_url)
+                response.raise_for_status()
+        except httpx.HTTPError:
+            return None
+        for line in response.text.splitlines():
+            if line.startswith(QUEUE_DEPTH_METRIC + " "):
+                return float(line.split()[1])
+        return None
+
+    async def read(self) -> SystemReading:
+        return SystemReading(self.temperature_c(), self.load_per_core(), await self.queue_depth())
+
+class AdaptiveThrottle:
+    """
+    Sets the ingest concurrency (chunk batches embedded at once) and the embed
+    batch size from how hot and busy the box is.
+
+    Pressure is the worst of three signals, each 0 when fine and 1 at the limit:
+    temperature between `temp_soft_c` and `temp_hard_c`, load per core above
+    `max_load_per_core`, and search requests waiting or encoding at the embeddings
+    service up to `max_queue_depth`. Above half pressure both settings are halved, at zero they
+    grow by one step per interval (AIMD), so the worker settles just below the
+    point where the SoC would throttle itself instead of running into it. At the
+    hard temperature limit it also pauses between batches to let the board cool.
+    """
+    def __init__(self, probe: SystemProbe, batch_size: int = 32, min_batch_size: int = 4, max_batch_size: int = 64,
+                 max_concurrency: int = 4, temp_soft_c: float = 65.0, temp_hard_c: float = 80.0, max_load_per_core: float = 1.0,
+                 max_queue_depth: float = 2.0, interval_s: float = 5.0, cooldown_s: float = 5.0,
+                 idle_load_per_core: float = 0.5, idle_window_s: float = 60.0):
+        self.probe = probe
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.max_concurrency = max_concurrency
+        self.temp_soft_c = temp_soft_c
+        self.temp_hard_c = temp_hard_c
+        self.max_load_per_core = max_load_per_core
+        self.max_queue_depth = max_queue_depth
+        self.interval_s = interval_s
+        self.cooldown_s = cooldown_s
+        self.idle_load_per_core = idle_load_per_core
+        self.idle_window_s = idle_window_s
+
+        self.batch_size = max(min_batch_size, min(batch_size, max_batch_size))
+        self.batch_step = max(1, self.batch_size // 4)
+        self.concurrency = 1
+        self.pause_s = 0.0
+        self.pressure = 0.0
+        self._updated_at = None
+        self._idle_since = None
+
+    def pressure_of(self, reading: SystemReading) -> float:
+        signals = [0.0]
+        if reading.temperature_c is not None:
+            signals.append((reading.temperature_c - self.temp_soft_c) / (self.temp_hard_c - self.temp_soft_c))
+        if reading.load_per_core is not None:
+            signals.append((reading.load_per_core - self.max_load_per_core) / self.max_load_per_core)
+        if reading.queue_depth is not None:
+            signals.append(reading.queue_depth / self.max_queue_depth)
+        return max(0.0, min(1.0, max(signals)))
+
+    def adjust(self, reading: SystemReading, now: float = None) -> None:
+        now = time.monotonic() if now is None else now
+        self.pressure = self.pressure_of(reading)
+        if self.pressure > 0.5:
+            self.concurrency = max(1, self.concurrency // 2)
+            self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+        elif self.pressure == 0:
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+            self.batch_size = min(self.max_batch_size, self.batch_size + self.batch_step)
+        hot = reading.temperature_c is not None and reading.temperature_c >= self.temp_hard_c
+        self.pause_s = self.cooldown_s if hot else 0.0
+
+        quiet = (
+            (reading.temperature_c is None or reading.temperature_c < self.temp_soft_c)
+            and (reading.load_per_core is None or reading.load_per_core <= self.idle_load_per_core)
+            and not reading.queue_depth
+        )
+        if not quiet:
+            self._idle_since = None
+        elif self._idle_since is None:
+            self._idle_since = now
+        self._updated_at = now
+
+        THROTTLE_BATCH_SIZE.set(self.batch_size)
+        THROTTLE_CONCURRENCY.set(self.concurrency)
+        THROTTLE_PRESSURE.set(self.pressure)
+        if reading.temperature_c is not None:
+            CPU_TEMPERATURE.set(reading.temperature_c)
+
+    async def refresh(self) -> None:
+        """Re-reads the probe once `interval_s` has passed, cheap to call before every batch."""
+        now = time.monotonic()
+        if self._updated_at is not None and now - self._updated_at < self.interval_s:
+            return
+        previous = (self.concurrency, self.batch_size)
+        self.adjust(await self.probe.read(), now)
+        if (self.concurrency, self.batch_size) != previous:
+            logger.info(f"Throttle: pressure {self.pressure:.2f}, concurrency {self.concurrency}, batch size {self.batch_size}")
+
+    async def pause(self) -> None:
+        if self.pause_s:
+            logger.info(f"Throttle: at {self.temp_hard_c}C, pausing {self.pause_s}s")
+            await asyncio.sleep(self.pause_s)
+
+    def idle(self, now: float = None) -> bool:
+        """True once the box has been cool and quiet for `idle_window_s`."""
+        now = time.monotonic() if now is None else now
+        return self._idle_since is not None and now - self._idle_since >= self.idle_window_s
+
+    async def wait_for_idle(self) -> None:
+        """Blocks heavy offline jobs until an idle window, re-reading the probe every interval."""
+        while True:
+            await self.refresh()
+            if self.idle():
+                return
+            await asyncio.sleep(self.interval_s)
+
+def throttle_from_config(config: dict, batch_size: int = 32, metrics_url: str = None) -> Optional[AdaptiveThrottle]:
+    """Builds the throttle from the `throttle` section of config.yaml, None when disabled."""
+    if not config.get("enabled", True):
+        return None
+    probe = SystemProbe(
+        thermal_zones=config.get("thermal_zones", "/sys/class/thermal/thermal_zone*/temp"),
+        loadavg_path=config.get("loadavg_path", "/proc/loadavg"),
+        metrics_url=config.get("embeddings_metrics_url", metrics_url),
+    )
+    return AdaptiveThrottle(
+        probe,
+        batch_size=batch_size,
+        min_batch_size=config.get("min_batch_size", 4),
+        max_batch_size=config.get("max_batch_size", 64),
+        max_concurrency=config.get("max_concurrency", 4),
+        temp_soft_c=config.get("temp_soft_c", 65.0),
+        temp_hard_c=config.get("temp_hard_c", 80.0),
+        max_load_per_core=config.get("max_load_per_core", 1.0),
+        max_queue_depth=config.get("max_queue_depth", 2),
+        interval_s=config.get("interval_s", 5.0),
+        cooldown_s=config.get("cooldown_s", 5.0),
+        idle_load_per_core=config.get("idle_load_per_core", 0.5),
+        idle_window_s=config.get("idle_window_s", 60.0),
+    )
@@ -8,15 +8,26 @@ from core.pipeline import WorkerPipeline
 from core.pdf_parser import PDFParser
 from core.embedder import RemoteEmbedder
 from core.store import QdrantStore
+from core.qdrant import get_client, settings_from_env
 from core.chunker import RecursiveCharacterTextSplitter
+from core.doc_store import DocumentStore
+from core.parsed_cache import ParsedTextCache
+from core.journal import IngestJournal
+from core.dedup import NearDuplicateIndex
+from core.throttle import throttle_from_config
+from core.instrumentation import INBOX_DEPTH
+from prometheus_client import start_http_server
 import yaml
 
 # Config
 INBOX_DIR = os.getenv("INBOX_DIR", "/app/inbox")
 PROCESSED_DIR = os.getenv("PROCESSED_DIR", "/app/processed")
 EMBEDDING_SERVICE_URL = os.getenv("EMBEDDING_SERVICE_URL", "http://embeddings:8001")
-QDRANT_HOST = os.getenv("QDRANT_HOST", "qdrant")
-QDRANT_PORT = int(os.getenv("QDRANT_PORT", "6333"))
+DOCS_DB_PATH = os.getenv("DOCS_DB_PATH", "/app/metadata/docs.sqlite")
+JOURNAL_DB_PATH = os.getenv("JOURNAL_DB_PATH", "/app/metadata/journal.sqlite")
+DEDUP_DB_PATH = os.getenv("DEDUP_DB_PATH", "/app/metadata/dedup.sqlite")
+DEAD_LETTER_DIR = os.getenv("DEAD_LETTER_DIR", "/app/dead_letter")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
 
 def main():
     print("Starting Worker Service...")
@@ -37,28 +48,70 @@ def main():
             chunking_config = config.get("chunking", {})
             chunk_size = chunking_config.get("chunk_size", 1000)
             chunk_overlap = chunking_config.get("chunk_overlap", 200)
+            ingest_config = config.get("ingest", {})
+            dedup_config = config.get("dedup", {})
+            throttle_config = config.get("throttle", {})
             print(f"Loaded config: chunk_size={chunk_size}, chunk_overlap={chunk_overlap}")
     except FileNotFoundError:
         print("Config file not found, using defaults.")
         chunk_size = 1000
         chunk_overlap = 200
+        ingest_config = {}
+        dedup_config = {}
+        throttle_config = {}
 
     # Initialize Components
     parser = PDFParser()
     embedder = RemoteEmbedder(EMBEDDING_SERVICE_URL)
-    store = QdrantStore(QDRANT_HOST, QDRANT_PORT)
+    store = QdrantStore(client=get_client(**settings_from_env()))
     chunker = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    doc_store = DocumentStore(DOCS_DB_PATH)
+    parsed_cache = ParsedTextCache(PROCESSED_DIR)
+    journal = IngestJournal(
+        JOURNAL_DB_PATH,
+        max_attempts=ingest_config.get("max_attempts", 5),
+        backoff_base_s=ingest_config.get("backoff_base_s", 2.0),
+        backoff_max_s=ingest_config.get("backoff_max_s", 300.0)
+    )
+    dedup = None
+    if dedup_config.get("enabled", True):
+        dedup = NearDuplicateIndex(
+            DEDUP_DB_PATH,
+            threshold=dedup_config.get("threshold", 0.8),
+            num_perm=dedup_config.get("num_perm", 128),
+            shingle_size=dedup_config.get("shingle_size", 5)
+        )
     
-    pipeline = WorkerPipeline(parser, embedder, store, chunker, processed_dir=PROCESSED_DIR)
+    pipeline = WorkerPipeline(
+        parser, embedder, store, chunker,
+        processed_dir=PROCESSED_DIR,
+        doc_store=doc_store,
+        parsed_cache=parsed_cache,
+        journal=journal,
+        dead_letter_dir=DEAD_LETTER_DIR,
+        batch_size=ingest_config.get("batch_size", 32),
+        dedup=dedup,
+        duplicate_action=dedup_config.get("action", "link"),
+        throttle=throttle_from_config(throttle_config, ingest_config.get("batch_size", 32), f"{EMBEDDING_SERVICE_URL}/metrics")
+    )
     event_handler = PDFEventHandler(pipeline)
     
+    start_http_server(METRICS_PORT)
+    print(f"Serving metrics on port {METRICS_PORT}")
+    
     observer = Observer()
     observer.schedule(event_handler, INBOX_DIR, recursive=False)
     observer.start()
     print(f"Watching for PDFs in {INBOX_DIR}...")
     
+    # Resume interrupted files and pick up PDFs dropped while the worker was down. The observer
+    # is already running so PDFs dropped meanwhile are queued on the pipeline lock, not missed
+    pipeline.recover(INBOX_DIR)
+    
     try:
         while True:
+            INBOX_DEPTH.set(sum(1 for name in os.listdir(INBOX_DIR) if name.lower().endswith(".pdf")))
+            pipeline.retry_due()
             time.sleep(1)
     except KeyboardInterrupt:
         observer.stop()
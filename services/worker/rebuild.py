@@ -0,0 +1,74 @@
+"""
+Re-chunks and re-embeds the library from the parsed-text sidecars in processed/
+into a new collection, then swaps the `papers` alias over to it.
+
+Run after changing chunking or retrieval.prefix_dim in config.yaml, or the embedding model:
+    docker compose run --rm worker python rebuild.py [--drop-old]
+"""
+import argparse
+import asyncio
+import os
+import sys
+from core.chunker import RecursiveCharacterTextSplitter
+from core.doc_store import DocumentStore
+from core.embedder import RemoteEmbedder
+from core.parsed_cache import ParsedTextCache
+from core.pdf_parser import PDFParser
+from core.qdrant import get_client, settings_from_env
+from core.rebuild import CollectionRebuilder, RebuildAborted
+from core.throttle import throttle_from_config
+import yaml
+
+# Config
+PROCESSED_DIR = os.getenv("PROCESSED_DIR", "/app/processed")
+EMBEDDING_SERVICE_URL = os.getenv("EMBEDDING_SERVICE_URL", "http://embeddings:8001")
+DOCS_DB_PATH = os.getenv("DOCS_DB_PATH", "/app/metadata/docs.sqlite")
+
+def load_config() -> dict:
+    try:
+        with open("/app/config.yaml", "r") as f:
+            return yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        print("Config file not found, using defaults.")
+        return {}
+
+async def rebuild(args):
+    config = load_config()
+    chunking = config.get("chunking", {})
+    chunk_size = chunking.get("chunk_size", 1000)
+    chunk_overlap = chunking.get("chunk_overlap", 200)
+    prefix_dim = config.get("retrieval", {}).get("prefix_dim", 128)
+    print(f"Rebuilding with chunk_size={chunk_size}, chunk_overlap={chunk_overlap}, prefix_dim={prefix_dim}")
+
+    client = get_client(**settings_from_env())
+    doc_store = DocumentStore(DOCS_DB_PATH)
+    rebuilder = CollectionRebuilder(
+        client,
+        ParsedTextCache(PROCESSED_DIR),
+        RemoteEmbedder(EMBEDDING_SERVICE_URL),
+        RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap),
+        doc_store=doc_store,
+        batch_size=args.batch_size,
+        prefix_dim=prefix_dim,
+        throttle=throttle_from_config(config.get("throttle", {}), args.batch_size, f"{EMBEDDING_SERVICE_URL}/metrics") if args.wait_idle else None,
+        parser=PDFParser()
+    )
+    try:
+        target = await rebuilder.run(drop_old=args.drop_old)
+        print(f"Rebuild complete, 'papers' now points to '{target}'")
+    except RebuildAborted as e:
+        print(f"Rebuild aborted: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        doc_store.close()
+        await client.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=64, help="chunks per embeddings call and upsert")
+    parser.add_argument("--drop-old", action="store_true", help="delete the previous collection after the swap, required once to replace a concrete 'papers' collection")
+    parser.add_argument("--wait-idle", action="store_true", help="start in an idle window and follow the thermal/load throttle")
+    asyncio.run(rebuild(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Exports the `papers` collection to a directory of memory-mapped float32 .npy
+vectors and Parquet payloads, or bulk-loads such an export back.
+
+    docker compose run --rm worker python snapshot.py export /app/exports/<name>
+    docker compose run --rm worker python snapshot.py import /app/exports/<name> [--collection papers_restored]
+"""
+import argparse
+import asyncio
+from core.qdrant import get_client, settings_from_env
+from core.snapshot import export_collection, import_collection
+
+async def run(args):
+    client = get_client(**settings_from_env())
+    try:
+        if args.command == "export":
+            manifest = await export_collection(client, args.collection, args.path, batch_size=args.batch_size)
+            print(f"Exported {manifest['points']} points from '{args.collection}' to {args.path}")
+        else:
+            count = await import_collection(client, args.path, collection_name=args.collection, batch_size=args.batch_size, parallel=args.parallel)
+            print(f"Imported {count} points from {args.path}")
+    finally:
+        await client.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("path", help="export directory")
+    parser.add_argument("--collection", default=None, help="collection or alias, defaults to 'papers' on export and the exported name on import")
+    parser.add_argument("--batch-size", type=int, default=1024, help="points per scroll page or upsert")
+    parser.add_argument("--parallel", type=int, default=4, help="upserts in flight during import")
+    args = parser.parse_args()
+    if args.command == "export":
+        args.collection = args.collection or "papers"
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -47,3 +47,33 @@ async def test_qdrant_store():
         await store.save_document(doc)
         
         mock_instance.upsert.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_remote_embedder_forwards_trace_id():
+    from core.instrumentation import current_trace_id, TRACE_HEADER
+
+    with patch('core.embedder.httpx.AsyncClient') as mock_client:
+        mock_instance = AsyncMock()
+        mock_client.return_value.__aenter__.return_value = mock_instance
+        mock_response = MagicMock()
+        mock_response.json.return_value = {"vector": [0.1]}
+        mock_instance.post.return_value = mock_response
+
+        token = current_trace_id.set("abc123")
+        try:
+            await RemoteEmbedder("http://localhost:8001").get_embedding("hello")
+        finally:
+            current_trace_id.reset(token)
+
+        assert mock_instance.post.call_args.kwargs["headers"] == {TRACE_HEADER: "abc123"}
+
+
+def test_to_point_stores_a_preview_of_the_text():
+    from core.store import to_point, PREVIEW_CHARS
+
+    point = to_point({"doc_id": "d", "chunk_index": 0, "text": "x" * (PREVIEW_CHARS + 50), "vector": [0.1]})
+
+    assert point.payload["preview"] == "x" * PREVIEW_CHARS + "..."
+    assert len(point.payload["text"]) == PREVIEW_CHARS + 50
+    assert to_point({"doc_id": "d", "chunk_index": 1, "text": "short", "vector": [0.1]}).payload["preview"] == "short"
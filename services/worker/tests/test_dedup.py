@@ -0,0 +1,60 @@
+import random
+from core import dedup
+from core.dedup import NearDuplicateIndex, lsh_params, shingles
+
+def make_text(seed, words=3000):
+    rng = random.Random(seed)
+    return " ".join(f"word{rng.randint(0, 5000)}" for _ in range(words))
+
+def revise(text, every=100):
+    words = text.split()
+    for i in range(0, len(words), every):
+        words[i] = "revised"
+    return " ".join(words)
+
+def test_shingles_ignore_case_and_layout():
+    assert shingles("The  quick brown\nfox jumps over", 3) == shingles("the quick, brown fox JUMPS over", 3)
+
+def test_lsh_params_cover_signature():
+    bands, rows = lsh_params(0.8, 128)
+    assert bands * rows == 128
+
+def test_finds_revised_version(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "dedup.sqlite"), threshold=0.8)
+    original = make_text(1)
+    index.add("v1", index.signature(original))
+
+    match = index.find(index.signature(revise(original)))
+
+    assert match is not None
+    assert match[0] == "v1"
+    assert match[1] >= 0.8
+
+def test_ignores_unrelated_and_self(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "dedup.sqlite"), threshold=0.8)
+    original = make_text(1)
+    signature = index.signature(original)
+    index.add("v1", signature)
+
+    assert index.find(index.signature(make_text(2))) is None
+    # Re-ingesting the same file is not a duplicate of itself
+    assert index.find(signature, exclude="v1") is None
+
+def test_signatures_survive_restart(tmp_path):
+    db_path = str(tmp_path / "dedup.sqlite")
+    original = make_text(3)
+    first = NearDuplicateIndex(db_path)
+    first.add("v1", first.signature(original))
+    first.close()
+
+    second = NearDuplicateIndex(db_path)
+    assert second.find(second.signature(revise(original)))[0] == "v1"
+
+def test_signature_is_the_same_computed_in_blocks(tmp_path, monkeypatch):
+    index = NearDuplicateIndex(str(tmp_path / "dedup.sqlite"))
+    text = make_text(4)
+    whole = index.signature(text)
+
+    # A long paper is permuted a block of shingles at a time, the minimum carries across blocks
+    monkeypatch.setattr(dedup, "SIGNATURE_BLOCK", 7)
+    assert (index.signature(text) == whole).all()
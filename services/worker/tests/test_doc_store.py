@@ -0,0 +1,52 @@
+from core.doc_store import DocumentStore, document_record_from_parsed
+
+def test_record_from_parsed_best_effort():
+    parsed = {
+        "doc_id": "abc",
+        "text": "ignored",
+        "metadata": {"Title": "Attention", "Author": "Vaswani", "CreationDate": "D:20170612000000Z"},
+        "filename": "attention.pdf"
+    }
+    record = document_record_from_parsed(parsed, source_path="/app/inbox/attention.pdf", total_chunks=4)
+    assert record["title"] == "Attention"
+    assert record["authors"] == ["Vaswani"]
+    assert record["year"] == 2017
+    assert record["total_chunks"] == 4
+
+def test_record_falls_back_to_filename():
+    record = document_record_from_parsed({"doc_id": "abc", "metadata": {}, "filename": "notes.pdf"})
+    assert record["title"] == "notes.pdf"
+    assert record["authors"] == []
+    assert record["year"] is None
+
+def test_upsert_and_get(tmp_path):
+    store = DocumentStore(str(tmp_path / "meta" / "docs.sqlite"))
+    record = document_record_from_parsed(
+        {"doc_id": "abc", "metadata": {"Title": "First"}, "filename": "a.pdf"}, total_chunks=2
+    )
+    store.upsert_document(record)
+    record["title"] = "Second"
+    store.upsert_document(record)
+
+    saved = store.get_document("abc")
+    assert saved["title"] == "Second"
+    assert saved["metadata"] == {"Title": "First"}
+    assert store.get_document("missing") is None
+
+def test_adds_version_of_to_older_tables(tmp_path):
+    import sqlite3
+    db_path = str(tmp_path / "docs.sqlite")
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE docs (doc_id TEXT PRIMARY KEY, title TEXT NOT NULL, authors TEXT NOT NULL, year INTEGER, tags TEXT NOT NULL, "
+        "filename TEXT, source_path TEXT, total_chunks INTEGER NOT NULL DEFAULT 0, metadata TEXT NOT NULL, ingested_at REAL NOT NULL)"
+    )
+    conn.commit()
+    conn.close()
+
+    store = DocumentStore(db_path)
+    record = document_record_from_parsed({"doc_id": "v2", "metadata": {}, "filename": "v2.pdf"})
+    record["version_of"] = "v1"
+    store.upsert_document(record)
+
+    assert store.get_document("v2")["version_of"] == "v1"
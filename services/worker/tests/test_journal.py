@@ -0,0 +1,61 @@
+import time
+from core.journal import IngestJournal, PENDING, DONE, DEAD
+
+def test_progress_resumes_only_for_same_document(tmp_path):
+    journal = IngestJournal(str(tmp_path / "journal.sqlite"))
+    journal.begin("/inbox/a.pdf")
+    assert journal.resume_from("/inbox/a.pdf", "hash-a", 10) == 0
+    journal.commit_batch("/inbox/a.pdf", 4)
+
+    assert journal.resume_from("/inbox/a.pdf", "hash-a", 10) == 4
+    # Different content or chunking starts over
+    assert journal.resume_from("/inbox/a.pdf", "hash-a", 12) == 0
+
+def test_failures_back_off_exponentially_until_dead(tmp_path):
+    journal = IngestJournal(str(tmp_path / "journal.sqlite"), max_attempts=3, backoff_base_s=10, backoff_max_s=25)
+    journal.begin("/inbox/a.pdf")
+
+    before = time.time()
+    assert not journal.record_failure("/inbox/a.pdf", "ConnectError")
+    first = journal.get("/inbox/a.pdf")["next_attempt_at"] - before
+    assert not journal.record_failure("/inbox/a.pdf", "ConnectError")
+    second = journal.get("/inbox/a.pdf")["next_attempt_at"] - before
+    assert 10 <= first < 11
+    assert 20 <= second < 21
+    assert journal.get("/inbox/a.pdf")["status"] == PENDING
+
+    assert journal.record_failure("/inbox/a.pdf", "ConnectError")
+    assert journal.get("/inbox/a.pdf")["next_attempt_at"] - before < 26
+
+def test_due_respects_backoff(tmp_path):
+    journal = IngestJournal(str(tmp_path / "journal.sqlite"), backoff_base_s=60)
+    journal.begin("/inbox/a.pdf")
+    journal.record_failure("/inbox/a.pdf", "timeout")
+
+    assert journal.due() == []
+    assert [entry["file_path"] for entry in journal.due(now=time.time() + 61)] == ["/inbox/a.pdf"]
+
+def test_recover_makes_interrupted_runs_due(tmp_path):
+    path = str(tmp_path / "journal.sqlite")
+    journal = IngestJournal(path)
+    journal.begin("/inbox/a.pdf")
+    journal.begin("/inbox/b.pdf")
+    journal.complete("/inbox/b.pdf")
+    journal.close()
+
+    # A new process after a crash
+    journal = IngestJournal(path)
+    assert journal.recover() == 1
+    assert [entry["file_path"] for entry in journal.due()] == ["/inbox/a.pdf"]
+    assert journal.get("/inbox/b.pdf")["status"] == DONE
+
+def test_reingesting_finished_file_starts_fresh(tmp_path):
+    journal = IngestJournal(str(tmp_path / "journal.sqlite"), max_attempts=1)
+    journal.begin("/inbox/a.pdf")
+    journal.record_failure("/inbox/a.pdf", "bad pdf")
+    journal.mark_dead("/inbox/a.pdf", "bad pdf")
+    assert journal.get("/inbox/a.pdf")["status"] == DEAD
+
+    entry = journal.begin("/inbox/a.pdf")
+    assert entry["attempts"] == 0
+    assert entry["committed_chunks"] == 0
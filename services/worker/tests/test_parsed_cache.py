@@ -0,0 +1,24 @@
+from core.parsed_cache import ParsedTextCache
+
+def test_sidecar_round_trip(tmp_path):
+    cache = ParsedTextCache(str(tmp_path))
+    parsed = {
+        "doc_id": "abc123",
+        "text": "page one page two",
+        "pages": ["page one ", "page two"],
+        "metadata": {"Title": "Test"},
+        "filename": "test.pdf"
+    }
+
+    path = cache.save(parsed, source_path="/app/processed/test.pdf")
+
+    assert path.endswith("abc123.parsed.json.gz")
+    loaded = cache.load("abc123")
+    assert loaded["pages"] == ["page one ", "page two"]
+    assert loaded["text"] == parsed["text"]
+    assert loaded["metadata"] == {"Title": "Test"}
+    assert loaded["source_path"] == "/app/processed/test.pdf"
+    assert list(cache.doc_ids()) == ["abc123"]
+
+def test_missing_sidecar(tmp_path):
+    assert ParsedTextCache(str(tmp_path)).load("missing") is None
@@ -33,3 +33,13 @@ def test_parse_metadata(sample_pdf):
     parser = PDFParser()
     result = parser.parse(sample_pdf)
     assert isinstance(result['metadata'], dict)
+
+def test_parse_doc_id_is_stable(sample_pdf, tmp_path):
+    parser = PDFParser()
+    copy_path = tmp_path / "renamed.pdf"
+    copy_path.write_bytes(open(sample_pdf, "rb").read())
+
+    first = parser.parse(sample_pdf)
+    second = parser.parse(str(copy_path))
+    assert first["doc_id"] == second["doc_id"]
+    assert len(first["doc_id"]) == 64
@@ -1,24 +1,28 @@
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 from core.pipeline import WorkerPipeline
-from core.interfaces import ParserProto, EmbedderProto, DataStoreProto
+from core.chunker import RecursiveCharacterTextSplitter
+from core.interfaces import ParserProto, EmbedderProto, DataStoreProto, DocumentStoreProto
 
 @pytest.mark.asyncio
 async def test_pipeline_flow():
     # Mocks
     mock_parser = MagicMock(spec=ParserProto)
     mock_parser.parse.return_value = {
+        "doc_id": "abc123",
         "text": "test content",
-        "metadata": {"title": "Test PDF"},
+        "metadata": {"Title": "Test PDF", "Author": "Ada", "CreationDate": "D:20210101000000"},
         "filename": "test.pdf"
     }
     
     mock_embedder = AsyncMock(spec=EmbedderProto)
-    mock_embedder.get_embedding.return_value = [0.1, 0.2, 0.3]
+    mock_embedder.get_embeddings.return_value = [[0.1, 0.2, 0.3]]
     
     mock_store = AsyncMock(spec=DataStoreProto)
-    mock_store.save_document.return_value = True
+    mock_store.save_documents.return_value = True
     
+    mock_doc_store = MagicMock(spec=DocumentStoreProto)
+
     # Patch shutil.move
     with patch('shutil.move') as mock_move:
         # Init Pipeline
@@ -26,7 +30,9 @@ async def test_pipeline_flow():
             parser=mock_parser,
             embedder=mock_embedder,
             store=mock_store,
-            processed_dir="/app/processed"
+            chunker=RecursiveCharacterTextSplitter(),
+            processed_dir="/app/processed",
+            doc_store=mock_doc_store
         )
         
         # Trigger
@@ -36,16 +42,26 @@ async def test_pipeline_flow():
         
         # Verify
         mock_parser.parse.assert_called_once_with("/path/to/test.pdf")
-        mock_embedder.get_embedding.assert_awaited_once_with("test content")
+        mock_embedder.get_embeddings.assert_awaited_once_with(["test content"])
         
-        # Check what was saved
+        # Doc-level metadata goes to the docs table once
+        record = mock_doc_store.upsert_document.call_args.args[0]
+        assert record["doc_id"] == "abc123"
+        assert record["title"] == "Test PDF"
+        assert record["total_chunks"] == 1
+        assert record["metadata"]["Author"] == "Ada"
+
+        # Chunks only carry the slim payload
         expected_doc = {
+            "doc_id": "abc123",
+            "chunk_index": 0,
             "text": "test content",
-            "metadata": {"title": "Test PDF"},
-            "filename": "test.pdf",
+            "year": 2021,
+            "authors": ["Ada"],
+            "tags": [],
             "vector": [0.1, 0.2, 0.3]
         }
-        mock_store.save_document.assert_awaited_once_with(expected_doc)
+        mock_store.save_documents.assert_awaited_once_with([expected_doc])
         
         # Verify move
         mock_move.assert_called_once_with("/path/to/test.pdf", "/app/processed/test.pdf")
@@ -61,6 +77,7 @@ async def test_pipeline_handles_errors():
             parser=mock_parser,
             embedder=AsyncMock(),
             store=AsyncMock(),
+            chunker=RecursiveCharacterTextSplitter(),
             processed_dir="/app/processed"
         )
         
@@ -68,8 +85,180 @@ async def test_pipeline_handles_errors():
         await pipeline.process_file("bad.pdf")
         
         # Verify execution stopped
-        pipeline.embedder.get_embedding.assert_not_called()
+        pipeline.embedder.get_embeddings.assert_not_called()
         
         # Verify NO move
         mock_move.assert_not_called()
 
+
+
+def make_parser(text):
+    parser = MagicMock(spec=ParserProto)
+    parser.parse.return_value = {"doc_id": "abc123", "text": text, "metadata": {}, "filename": "test.pdf"}
+    return parser
+
+def make_embedder():
+    embedder = AsyncMock(spec=EmbedderProto)
+    embedder.get_embeddings.side_effect = lambda texts: [[0.1, 0.2, 0.3] for _ in texts]
+    return embedder
+
+@pytest.mark.asyncio
+async def test_pipeline_resumes_from_last_committed_batch(tmp_path):
+    from core.journal import IngestJournal
+
+    inbox_file = tmp_path / "test.pdf"
+    inbox_file.write_bytes(b"%PDF")
+    journal = IngestJournal(str(tmp_path / "journal.sqlite"), backoff_base_s=0)
+    store = AsyncMock(spec=DataStoreProto)
+    # The second batch fails, like a Qdrant outage
+    store.save_documents.side_effect = [True, Exception("Qdrant unavailable"), True, True]
+    doc_store = MagicMock(spec=DocumentStoreProto)
+
+    pipeline = WorkerPipeline(
+        parser=make_parser("a" * 10 + " " + "b" * 10 + " " + "c" * 10),
+        embedder=make_embedder(),
+        store=store,
+        chunker=RecursiveCharacterTextSplitter(chunk_size=10, chunk_overlap=0),
+        processed_dir=str(tmp_path / "processed"),
+        doc_store=doc_store,
+        journal=journal,
+        batch_size=1
+    )
+    (tmp_path / "processed").mkdir()
+
+    await pipeline.process_file(str(inbox_file))
+    entry = journal.get(str(inbox_file))
+    assert entry["committed_chunks"] == 1
+    assert entry["attempts"] == 1
+    assert inbox_file.exists()
+    # The docs row promises total_chunks points, it is not written while some are missing
+    doc_store.upsert_document.assert_not_called()
+
+    await pipeline.process_file(str(inbox_file))
+
+    # Chunk 0 is not redone, chunk 1 is retried, chunk 2 follows
+    indexes = [call.args[0][0]["chunk_index"] for call in store.save_documents.await_args_list]
+    assert indexes == [0, 1, 1, 2]
+    doc_store.upsert_document.assert_called_once()
+    assert doc_store.upsert_document.call_args.args[0]["total_chunks"] == 3
+    assert journal.get(str(inbox_file))["status"] == "done"
+    assert (tmp_path / "processed" / "test.pdf").exists()
+
+def test_file_reported_by_recovery_and_watcher_is_processed_once(tmp_path):
+    from core.journal import IngestJournal
+
+    inbox_dir = tmp_path / "inbox"
+    inbox_dir.mkdir()
+    (tmp_path / "processed").mkdir()
+    inbox_file = inbox_dir / "test.pdf"
+    inbox_file.write_bytes(b"%PDF")
+    parser = make_parser("a" * 10)
+    pipeline = WorkerPipeline(
+        parser=parser,
+        embedder=make_embedder(),
+        store=AsyncMock(spec=DataStoreProto),
+        chunker=RecursiveCharacterTextSplitter(chunk_size=10, chunk_overlap=0),
+        processed_dir=str(tmp_path / "processed"),
+        journal=IngestJournal(str(tmp_path / "journal.sqlite"))
+    )
+
+    # Dropped while the startup pass ran, the watcher's event waited on the lock
+    pipeline.recover(str(inbox_dir))
+    pipeline.on_pdf_created(str(inbox_file))
+
+    parser.parse.assert_called_once_with(str(inbox_file))
+    assert (tmp_path / "processed" / "test.pdf").exists()
+
+@pytest.mark.asyncio
+async def test_crash_after_move_to_processed_is_marked_done(tmp_path):
+    from core.journal import IngestJournal
+    from core.parsed_cache import ParsedTextCache
+
+    inbox_file = tmp_path / "inbox" / "test.pdf"
+    inbox_file.parent.mkdir()
+    inbox_file.write_bytes(b"%PDF")
+    processed_dir = tmp_path / "processed"
+    journal = IngestJournal(str(tmp_path / "journal.sqlite"), backoff_base_s=0)
+    cache = ParsedTextCache(str(processed_dir))
+    cache.save = MagicMock(side_effect=[RuntimeError("killed"), None])
+
+    pipeline = WorkerPipeline(
+        parser=make_parser("a" * 10 + " " + "b" * 10),
+        embedder=make_embedder(),
+        store=AsyncMock(spec=DataStoreProto),
+        chunker=RecursiveCharacterTextSplitter(chunk_size=10, chunk_overlap=0),
+        processed_dir=str(processed_dir),
+        parsed_cache=cache,
+        journal=journal
+    )
+
+    # Dies right after the move, before the sidecar and journal.complete
+    await pipeline.process_file(str(inbox_file))
+    assert not inbox_file.exists()
+    assert journal.get(str(inbox_file))["status"] == "pending"
+
+    pipeline.retry_due()
+
+    entry = journal.get(str(inbox_file))
+    assert entry["status"] == "done"
+    assert entry["committed_chunks"] == entry["total_chunks"] == 2
+    # The sidecar lost in the crash is written from the processed file
+    assert cache.save.call_args.kwargs["source_path"] == str(processed_dir / "test.pdf")
+
+@pytest.mark.asyncio
+async def test_pipeline_dead_letters_after_max_attempts(tmp_path):
+    import json
+    from core.journal import IngestJournal
+
+    inbox_file = tmp_path / "poison.pdf"
+    inbox_file.write_bytes(b"%PDF")
+    parser = MagicMock(spec=ParserProto)
+    parser.parse.side_effect = ValueError("EOF marker not found")
+    dead_letter_dir = tmp_path / "dead_letter"
+
+    pipeline = WorkerPipeline(
+        parser=parser,
+        embedder=make_embedder(),
+        store=AsyncMock(spec=DataStoreProto),
+        chunker=RecursiveCharacterTextSplitter(),
+        journal=IngestJournal(str(tmp_path / "journal.sqlite"), max_attempts=2, backoff_base_s=0),
+        dead_letter_dir=str(dead_letter_dir)
+    )
+
+    await pipeline.process_file(str(inbox_file))
+    assert inbox_file.exists()
+    await pipeline.process_file(str(inbox_file))
+
+    assert not inbox_file.exists()
+    assert (dead_letter_dir / "poison.pdf").exists()
+    reason = json.loads((dead_letter_dir / "poison.pdf.reason.json").read_text())
+    assert reason["attempts"] == 2
+    assert "EOF marker not found" in reason["reason"]
+
+@pytest.mark.asyncio
+async def test_pipeline_links_near_duplicates_without_embedding(tmp_path):
+    from core.dedup import NearDuplicateIndex
+
+    text = " ".join(f"word{i % 997} token{i % 389}" for i in range(2000))
+    dedup = NearDuplicateIndex(str(tmp_path / "dedup.sqlite"))
+    dedup.add("original", dedup.signature(text))
+
+    embedder = make_embedder()
+    doc_store = MagicMock(spec=DocumentStoreProto)
+    with patch('shutil.move'):
+        pipeline = WorkerPipeline(
+            parser=make_parser(text.replace("word5 ", "word6 ", 3)),
+            embedder=embedder,
+            store=AsyncMock(spec=DataStoreProto),
+            chunker=RecursiveCharacterTextSplitter(),
+            processed_dir="/app/processed",
+            doc_store=doc_store,
+            dedup=dedup
+        )
+        await pipeline.process_file("/path/to/test.pdf")
+
+    embedder.get_embeddings.assert_not_called()
+    record = doc_store.upsert_document.call_args.args[0]
+    assert record["doc_id"] == "abc123"
+    assert record["version_of"] == "original"
+    assert record["total_chunks"] == 0
@@ -0,0 +1,200 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http import models
+from core.chunker import RecursiveCharacterTextSplitter
+from core.doc_store import DocumentStore, document_record_from_parsed
+from core.parsed_cache import ParsedTextCache
+from core.pdf_parser import content_hash
+from core.rebuild import CollectionRebuilder, RebuildAborted
+from core.store import prefix_vector
+
+class FakeEmbedder:
+    async def get_embedding(self, text):
+        return [1.0, float(len(text)), 0.5]
+
+    async def get_embeddings(self, texts):
+        return [await self.get_embedding(text) for text in texts]
+
+def write_sidecars(directory):
+    cache = ParsedTextCache(str(directory))
+    for doc_id in ("doc-a", "doc-b"):
+        cache.save({
+            "doc_id": doc_id,
+            "pages": ["alpha beta gamma " * 20, "delta epsilon " * 20],
+            "metadata": {"Title": doc_id},
+            "filename": f"{doc_id}.pdf"
+        })
+    return cache
+
+async def alias_target(client, alias):
+    aliases = (await client.get_aliases()).aliases
+    return next((a.collection_name for a in aliases if a.alias_name == alias), None)
+
+@pytest.mark.asyncio
+@pytest.mark.filterwarnings("ignore:Payload indexes")
+async def test_rebuild_replaces_concrete_collection_with_alias(tmp_path):
+    client = AsyncQdrantClient(location=":memory:")
+    await client.create_collection(
+        collection_name="papers",
+        vectors_config=models.VectorParams(size=3, distance=models.Distance.COSINE)
+    )
+    rebuilder = CollectionRebuilder(
+        client, write_sidecars(tmp_path), FakeEmbedder(),
+        RecursiveCharacterTextSplitter(chunk_size=100, chunk_overlap=0), batch_size=4
+    )
+
+    target = await rebuilder.run(drop_old=True)
+
+    assert await alias_target(client, "papers") == target
+    points, _ = await client.scroll(collection_name="papers", limit=1000)
+    assert {point.payload["doc_id"] for point in points} == {"doc-a", "doc-b"}
+    assert sorted(p.payload["chunk_index"] for p in points if p.payload["doc_id"] == "doc-a") == list(range(len(points) // 2))
+
+@pytest.mark.asyncio
+@pytest.mark.filterwarnings("ignore:Payload indexes")
+async def test_second_rebuild_swaps_alias_and_drops_old(tmp_path):
+    client = AsyncQdrantClient(location=":memory:")
+    cache = write_sidecars(tmp_path)
+    first = CollectionRebuilder(client, cache, FakeEmbedder(), RecursiveCharacterTextSplitter(chunk_size=100, chunk_overlap=0))
+    old_target = await first.run()
+
+    second = CollectionRebuilder(client, cache, FakeEmbedder(), RecursiveCharacterTextSplitter(chunk_size=300, chunk_overlap=0))
+    new_target = await second.run(drop_old=True, target="papers_next")
+
+    assert await alias_target(client, "papers") == new_target
+    collections = {c.name for c in (await client.get_collections()).collections}
+    assert old_target not in collections
+
+@pytest.mark.asyncio
+@pytest.mark.filterwarnings("ignore:Payload indexes")
+async def test_rebuild_with_prefix_dim_stores_prefix_vectors(tmp_path):
+    client = AsyncQdrantClient(location=":memory:")
+    rebuilder = CollectionRebuilder(
+        client, write_sidecars(tmp_path), FakeEmbedder(),
+        RecursiveCharacterTextSplitter(chunk_size=100, chunk_overlap=0), prefix_dim=2
+    )
+
+    await rebuilder.run()
+
+    points, _ = await client.scroll(collection_name="papers", limit=1, with_vectors=True)
+    assert len(points[0].vector["full"]) == 3
+    assert points[0].vector["prefix"] == pytest.approx(prefix_vector(points[0].vector["full"], 2))
+    assert sum(x * x for x in points[0].vector["prefix"]) == pytest.approx(1.0)
+
+async def concrete_papers_with(client, doc_ids):
+    await client.create_collection(
+        collection_name="papers",
+        vectors_config=models.VectorParams(size=3, distance=models.Distance.COSINE)
+    )
+    await client.upsert(collection_name="papers", points=[
+        models.PointStruct(id=i, vector=[1.0, 0.0, 0.0], payload={"doc_id": doc_id, "chunk_index": 0})
+        for i, doc_id in enumerate(doc_ids)
+    ])
+
+@pytest.mark.asyncio
+@pytest.mark.filterwarnings("ignore:Payload indexes")
+async def test_concrete_collection_is_not_replaced_without_drop_old(tmp_path):
+    client = AsyncQdrantClient(location=":memory:")
+    await concrete_papers_with(client, ["doc-a"])
+    embedder = FakeEmbedder()
+    embedder.get_embeddings = AsyncMock(side_effect=embedder.get_embeddings)
+    rebuilder = CollectionRebuilder(client, write_sidecars(tmp_path), embedder, RecursiveCharacterTextSplitter(chunk_size=100, chunk_overlap=0))
+
+    with pytest.raises(RebuildAborted, match="--drop-old"):
+        await rebuilder.run()
+
+    # Refused before any work, the old collection still serves search
+    embedder.get_embeddings.assert_not_awaited()
+    assert (await client.count(collection_name="papers")).count == 1
+
+@pytest.mark.asyncio
+@pytest.mark.filterwarnings("ignore:Payload indexes")
+async def test_swap_refused_when_live_documents_have_no_sidecar(tmp_path):
+    client = AsyncQdrantClient(location=":memory:")
+    await concrete_papers_with(client, ["doc-a", "doc-old"])
+    rebuilder = CollectionRebuilder(client, write_sidecars(tmp_path), FakeEmbedder(), RecursiveCharacterTextSplitter(chunk_size=100, chunk_overlap=0))
+
+    with pytest.raises(RebuildAborted, match="doc-old"):
+        await rebuilder.run(drop_old=True, target="papers_next")
+
+    collections = {c.name for c in (await client.get_collections()).collections}
+    assert collections == {"papers"}
+    assert (await client.count(collection_name="papers")).count == 2
+
+@pytest.mark.asyncio
+@pytest.mark.filterwarnings("ignore:Payload indexes")
+async def test_backfills_sidecars_from_processed_pdfs(tmp_path):
+    client = AsyncQdrantClient(location=":memory:")
+    cache = write_sidecars(tmp_path)
+    pdf_path = tmp_path / "old.pdf"
+    pdf_path.write_bytes(b"%PDF old paper")
+    old_doc_id = content_hash(str(pdf_path))
+    await concrete_papers_with(client, ["doc-a", "doc-b", old_doc_id])
+
+    parser = MagicMock()
+    parser.parse.return_value = {"doc_id": old_doc_id, "pages": ["old paper text " * 10], "metadata": {}, "filename": "old.pdf"}
+    rebuilder = CollectionRebuilder(client, cache, FakeEmbedder(), RecursiveCharacterTextSplitter(chunk_size=100, chunk_overlap=0), parser=parser)
+
+    await rebuilder.run(drop_old=True)
+
+    parser.parse.assert_called_once_with(str(pdf_path))
+    points, _ = await client.scroll(collection_name="papers", limit=1000)
+    assert {point.payload["doc_id"] for point in points} == {"doc-a", "doc-b", old_doc_id}
+
+    # Sidecars exist now, a second rebuild parses nothing
+    parser.parse.reset_mock()
+    await CollectionRebuilder(client, cache, FakeEmbedder(), RecursiveCharacterTextSplitter(chunk_size=100, chunk_overlap=0), parser=parser).run(target="papers_next")
+    parser.parse.assert_not_called()
+
+@pytest.mark.asyncio
+@pytest.mark.filterwarnings("ignore:Payload indexes")
+async def test_linked_duplicates_are_not_backfilled_or_rebuilt(tmp_path):
+    client = AsyncQdrantClient(location=":memory:")
+    cache = write_sidecars(tmp_path)
+    await concrete_papers_with(client, ["doc-a", "doc-b"])
+    doc_store = DocumentStore(str(tmp_path / "docs.sqlite"))
+    for doc_id in ("doc-a", "doc-b"):
+        doc_store.upsert_document(document_record_from_parsed({"doc_id": doc_id, "metadata": {}, "filename": f"{doc_id}.pdf"}, total_chunks=1))
+
+    # v2 of doc-a was moved to processed/ without chunks or a sidecar, as the worker's link action does
+    duplicate_path = tmp_path / "doc-a-v2.pdf"
+    duplicate_path.write_bytes(b"%PDF doc-a, second version")
+    duplicate = document_record_from_parsed({"doc_id": content_hash(str(duplicate_path)), "metadata": {}, "filename": "doc-a-v2.pdf"})
+    duplicate["version_of"] = "doc-a"
+    doc_store.upsert_document(duplicate)
+    # Another linked version that an older rebuild backfilled a sidecar for
+    cache.save({"doc_id": "doc-b-v2", "pages": ["doc b again " * 20], "metadata": {}, "filename": "doc-b-v2.pdf"})
+    stale = document_record_from_parsed({"doc_id": "doc-b-v2", "metadata": {}, "filename": "doc-b-v2.pdf"})
+    stale["version_of"] = "doc-b"
+    doc_store.upsert_document(stale)
+
+    parser = MagicMock()
+    rebuilder = CollectionRebuilder(client, cache, FakeEmbedder(), RecursiveCharacterTextSplitter(chunk_size=100, chunk_overlap=0),
+                                    doc_store=doc_store, parser=parser)
+    await rebuilder.run(drop_old=True)
+
+    parser.parse.assert_not_called()
+    points, _ = await client.scroll(collection_name="papers", limit=1000)
+    assert {point.payload["doc_id"] for point in points} == {"doc-a", "doc-b"}
+    assert doc_store.get_document(duplicate["doc_id"])["version_of"] == "doc-a"
+    assert doc_store.get_document(duplicate["doc_id"])["total_chunks"] == 0
+    assert doc_store.get_document("doc-b-v2")["version_of"] == "doc-b"
+    assert doc_store.get_document("doc-a")["total_chunks"] > 1
+
+@pytest.mark.asyncio
+@pytest.mark.filterwarnings("ignore:Payload indexes")
+async def test_document_ingested_during_swap_is_rebuilt(tmp_path):
+    client = AsyncQdrantClient(location=":memory:")
+    cache = write_sidecars(tmp_path)
+
+    class LateIngestRebuilder(CollectionRebuilder):
+        async def swap_alias(self, target, drop_concrete=False):
+            # The worker finishes a file after the last scan, right before the swap
+            cache.save({"doc_id": "doc-late", "pages": ["late arrival " * 20], "metadata": {}, "filename": "late.pdf"})
+            return await super().swap_alias(target, drop_concrete)
+
+    await LateIngestRebuilder(client, cache, FakeEmbedder(), RecursiveCharacterTextSplitter(chunk_size=100, chunk_overlap=0)).run()
+
+    points, _ = await client.scroll(collection_name="papers", limit=1000)
+    assert "doc-late" in {point.payload["doc_id"] for point in points}
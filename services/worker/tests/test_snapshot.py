@@ -0,0 +1,100 @@
+import uuid
+import numpy as np
+import pyarrow.parquet as pq
+import pytest
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http import models
+from core.snapshot import export_collection, import_collection, load_vectors, load_missing
+
+def make_points(count):
+    points = []
+    for i in range(count):
+        payload = {"doc_id": f"doc{i // 3}", "chunk_index": i % 3, "text": f"chunk {i}", "year": 2020 + i % 4, "authors": ["A. Author"], "tags": []}
+        if i == 0:
+            # Legacy payload key without a typed column
+            payload["metadata"] = {"Title": "Old paper"}
+        points.append(models.PointStruct(id=str(uuid.uuid5(uuid.NAMESPACE_URL, str(i))), vector=[float(i), 1.0, 0.5, -1.0], payload=payload))
+    return points
+
+@pytest.mark.asyncio
+@pytest.mark.filterwarnings("ignore:Payload indexes")
+async def test_export_then_import_round_trips_points(tmp_path):
+    client = AsyncQdrantClient(location=":memory:")
+    await client.create_collection(
+        collection_name="papers",
+        vectors_config=models.VectorParams(size=4, distance=models.Distance.DOT)
+    )
+    points = make_points(10)
+    await client.upsert(collection_name="papers", points=points)
+
+    manifest = await export_collection(client, "papers", str(tmp_path), batch_size=4)
+    assert manifest["points"] == 10
+    vectors = load_vectors(str(tmp_path))
+    assert vectors.dtype == np.float32 and vectors.shape == (10, 4)
+
+    count = await import_collection(client, str(tmp_path), collection_name="restored", batch_size=3, parallel=2)
+    assert count == 10
+
+    info = await client.get_collection("restored")
+    assert info.config.params.vectors.size == 4
+    assert info.config.params.vectors.distance == models.Distance.DOT
+    restored = await client.retrieve("restored", ids=[p.id for p in points], with_vectors=True)
+    by_id = {point.id: point for point in restored}
+    for point in points:
+        assert by_id[point.id].payload == point.payload
+        assert by_id[point.id].vector == pytest.approx(point.vector)
+
+@pytest.mark.asyncio
+async def test_named_vectors_export_one_matrix_each(tmp_path):
+    client = AsyncQdrantClient(location=":memory:")
+    await client.create_collection(
+        collection_name="papers",
+        vectors_config={
+            "full": models.VectorParams(size=4, distance=models.Distance.COSINE),
+            "prefix": models.VectorParams(size=2, distance=models.Distance.COSINE),
+        }
+    )
+    await client.upsert(collection_name="papers", points=[
+        models.PointStruct(id=i, vector={"full": [1.0, 0.0, 0.0, float(i)], "prefix": [1.0, float(i)]}, payload={"doc_id": "d"})
+        for i in range(5)
+    ])
+
+    await export_collection(client, "papers", str(tmp_path))
+
+    assert load_vectors(str(tmp_path), "full").shape == (5, 4)
+    assert load_vectors(str(tmp_path), "prefix").shape == (5, 2)
+    assert (tmp_path / "vectors.prefix.npy").exists()
+
+@pytest.mark.asyncio
+async def test_points_without_a_named_vector_export_as_masked_zero_rows(tmp_path):
+    client = AsyncQdrantClient(location=":memory:")
+    await client.create_collection(
+        collection_name="papers",
+        vectors_config={
+            "full": models.VectorParams(size=4, distance=models.Distance.COSINE),
+            "prefix": models.VectorParams(size=2, distance=models.Distance.COSINE),
+        }
+    )
+    # Points 1 and 3 were written before the collection had a prefix vector
+    points = []
+    for i in range(5):
+        vector = {"full": [1.0, 0.0, 0.0, float(i)]}
+        if i % 2 == 0:
+            vector["prefix"] = [1.0, float(i)]
+        points.append(models.PointStruct(id=i, vector=vector, payload={"doc_id": "d"}))
+    await client.upsert(collection_name="papers", points=points)
+
+    manifest = await export_collection(client, "papers", str(tmp_path), batch_size=2)
+
+    assert manifest["vectors"]["prefix"]["missing"] == 2
+    assert "missing" not in manifest["vectors"]["full"]
+    ids = [int(i) for i in pq.read_table(str(tmp_path / "payloads.parquet")).column("id").to_pylist()]
+    missing = load_missing(str(tmp_path), "prefix")
+    assert [i for i, flag in zip(ids, missing) if flag] == [1, 3]
+    assert not load_vectors(str(tmp_path), "prefix")[missing].any()
+    assert not load_missing(str(tmp_path), "full").any()
+
+    await import_collection(client, str(tmp_path), collection_name="restored")
+    restored = {point.id: point.vector for point in await client.retrieve("restored", ids=list(range(5)), with_vectors=True)}
+    assert set(restored[1]) == {"full"}
+    assert set(restored[2]) == {"full", "prefix"}
@@ -0,0 +1,118 @@
+import httpx
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from core.throttle import SystemProbe, SystemReading, AdaptiveThrottle
+from core.pipeline import WorkerPipeline
+from core.interfaces import ParserProto, DataStoreProto
+
+def fake_sysfs(tmp_path, temperatures_c, load):
+    for i, temperature in enumerate(temperatures_c):
+        zone = tmp_path / f"thermal_zone{i}"
+        zone.mkdir()
+        (zone / "temp").write_text(f"{int(temperature * 1000)}\n")
+    (tmp_path / "loadavg").write_text(f"{load} 1.00 0.50 2/345 6789\n")
+    return SystemProbe(thermal_zones=str(tmp_path / "thermal_zone*" / "temp"), loadavg_path=str(tmp_path / "loadavg"), cores=4)
+
+class StaticProbe:
+    def __init__(self, reading):
+        self.reading = reading
+
+    async def read(self):
+        return self.reading
+
+@pytest.mark.asyncio
+async def test_probe_reads_hottest_zone_and_load_per_core(tmp_path):
+    probe = fake_sysfs(tmp_path, [41.5, 67.0], load=6.0)
+
+    reading = await probe.read()
+
+    assert reading.temperature_c == 67.0
+    assert reading.load_per_core == 1.5
+    assert reading.queue_depth is None
+
+@pytest.mark.asyncio
+async def test_probe_ignores_missing_files(tmp_path):
+    probe = SystemProbe(thermal_zones=str(tmp_path / "none*"), loadavg_path=str(tmp_path / "missing"))
+    assert await probe.read() == SystemReading(None, None, None)
+
+def test_backs_off_when_hot_and_grows_when_cool():
+    throttle = AdaptiveThrottle(StaticProbe(None), batch_size=32, min_batch_size=4, max_batch_size=64, max_concurrency=4,
+                                temp_soft_c=65, temp_hard_c=80, cooldown_s=2)
+    cool = SystemReading(temperature_c=50, load_per_core=0.2, queue_depth=0)
+    for _ in range(10):
+        throttle.adjust(cool)
+    assert (throttle.concurrency, throttle.batch_size, throttle.pause_s) == (4, 64, 0.0)
+
+    throttle.adjust(SystemReading(temperature_c=78, load_per_core=0.2, queue_depth=0))
+    assert (throttle.concurrency, throttle.batch_size) == (2, 32)
+
+    # Between the soft and hard limit with little pressure, settings hold
+    throttle.adjust(SystemReading(temperature_c=70, load_per_core=0.2, queue_depth=0))
+    assert (throttle.concurrency, throttle.batch_size) == (2, 32)
+
+    throttle.adjust(SystemReading(temperature_c=85, load_per_core=0.2, queue_depth=0))
+    assert (throttle.concurrency, throttle.batch_size, throttle.pause_s) == (1, 16, 2)
+
+def test_search_queue_depth_counts_as_pressure():
+    throttle = AdaptiveThrottle(StaticProbe(None), batch_size=32, max_queue_depth=4)
+    assert throttle.pressure_of(SystemReading(None, None, queue_depth=3)) == 0.75
+    assert throttle.pressure_of(SystemReading(None, None, queue_depth=10)) == 1.0
+
+def embeddings_metrics(interactive, bulk):
+    text = (
+        "# TYPE embeddings_queue_depth gauge\n"
+        f"embeddings_queue_depth {float(interactive + bulk)}\n"
+        "# TYPE embeddings_in_flight gauge\n"
+        f'embeddings_in_flight{{priority="bulk"}} {float(bulk)}\n'
+        f'embeddings_in_flight{{priority="interactive"}} {float(interactive)}\n'
+    )
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, text=text))
+    client = httpx.AsyncClient
+    return patch("core.throttle.httpx.AsyncClient", lambda **kwargs: client(transport=transport, **kwargs))
+
+@pytest.mark.asyncio
+async def test_search_load_reduces_concurrency_but_own_requests_do_not(tmp_path):
+    probe = SystemProbe(thermal_zones=str(tmp_path / "none*"), loadavg_path=str(tmp_path / "missing"), metrics_url="http://embeddings/metrics")
+    throttle = AdaptiveThrottle(probe, batch_size=32, max_concurrency=4, interval_s=0)
+
+    # The worker's own batches fill the embeddings service, which is not a reason to back off
+    with embeddings_metrics(interactive=0, bulk=8):
+        for _ in range(4):
+            await throttle.refresh()
+    assert (throttle.concurrency, throttle.batch_size) == (4, 64)
+
+    with embeddings_metrics(interactive=2, bulk=8):
+        await throttle.refresh()
+    assert throttle.pressure == 1.0
+    assert (throttle.concurrency, throttle.batch_size) == (2, 32)
+
+def test_idle_after_quiet_window():
+    throttle = AdaptiveThrottle(StaticProbe(None), idle_window_s=60)
+    quiet = SystemReading(temperature_c=45, load_per_core=0.1, queue_depth=0)
+
+    throttle.adjust(quiet, now=0)
+    assert not throttle.idle(now=30)
+    throttle.adjust(SystemReading(temperature_c=45, load_per_core=0.1, queue_depth=2), now=40)
+    throttle.adjust(quiet, now=50)
+    assert not throttle.idle(now=100)
+    assert throttle.idle(now=110)
+
+@pytest.mark.asyncio
+async def test_pipeline_embeds_concurrent_batches_and_saves_in_order():
+    parser = MagicMock(spec=ParserProto)
+    parser.parse.return_value = {"doc_id": "abc", "text": "x", "metadata": {}, "filename": "a.pdf"}
+    chunker = MagicMock()
+    chunker.split_text.return_value = [f"chunk {i}" for i in range(10)]
+    embedder = AsyncMock()
+    embedder.get_embeddings.side_effect = lambda texts: [[float(len(t))] for t in texts]
+    store = AsyncMock(spec=DataStoreProto)
+
+    throttle = AdaptiveThrottle(StaticProbe(SystemReading(None, None, None)), batch_size=3, min_batch_size=3, max_batch_size=3, max_concurrency=2)
+    pipeline = WorkerPipeline(parser, embedder, store, chunker, throttle=throttle)
+    with patch("shutil.move"):
+        await pipeline.process_file("/inbox/a.pdf")
+
+    # The probe is only re-read after interval_s, so concurrency grew once, to 2
+    assert [len(call.args[0]) for call in embedder.get_embeddings.await_args_list] == [3, 3, 3, 1]
+    saved = [doc["chunk_index"] for call in store.save_documents.await_args_list for doc in call.args[0]]
+    assert saved == list(range(10))